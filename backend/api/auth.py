@@ -2,11 +2,12 @@ from __future__ import annotations
 
 from typing import Any
 
+from . import nav
 from .client import BiliApiClient, BiliApiError
+from .nav import NAV_URL as NAV_URL
 
 GENERATE_QRCODE_URL = "https://passport.bilibili.com/x/passport-login/web/qrcode/generate"
 POLL_QRCODE_URL = "https://passport.bilibili.com/x/passport-login/web/qrcode/poll"
-NAV_URL = "https://api.bilibili.com/x/web-interface/nav"
 
 
 class AuthApi:
@@ -31,7 +32,8 @@ class AuthApi:
 
     async def get_self_info(self) -> dict[str, Any]:
         """Return ``{isLogin, mid, uname, face, vipStatus, level_info, ...}``
-        for the currently authenticated session."""
-        payload = await self._client.get(NAV_URL)
-        data = payload.get("data") if isinstance(payload, dict) else None
-        return data if isinstance(data, dict) else {}
+        for the currently authenticated session.
+
+        Served from the shared nav cache for up to a minute; raises
+        ``SessionExpiredError`` for a logged-out session."""
+        return await nav.require_session(self._client)
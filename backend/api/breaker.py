@@ -0,0 +1,232 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+import weakref
+from dataclasses import dataclass
+from typing import Any
+
+from .client import BiliApiError
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class RiskCooldownError(BiliApiError):
+    """A request gave up waiting for a risk-control cooldown to end."""
+
+
+@dataclass(eq=False)
+class Permit:
+    """Leave to send one request; ``probe`` marks the half-open probe."""
+
+    waited: float
+    probe: bool = False
+
+
+@dataclass(frozen=True)
+class BreakerConfig:
+    """Tunables for :class:`RiskBreaker`.
+
+    ``threshold`` consecutive risk-control responses open the breaker for
+    ``cooldown`` seconds (or the upstream ``Retry-After``); each failed probe
+    doubles the cooldown up to ``max_cooldown``. A single background or
+    destructive request waits at most ``max_pause`` seconds in total before
+    giving up; interactive ones do not wait at all (see ``RiskBreaker``).
+    """
+
+    threshold: int = 3
+    cooldown: float = 30.0
+    max_cooldown: float = 600.0
+    max_pause: float = 900.0
+
+    def __post_init__(self) -> None:
+        if self.threshold < 1:
+            raise ValueError("threshold must be >= 1")
+        if self.cooldown <= 0 or self.max_cooldown < self.cooldown:
+            raise ValueError("need 0 < cooldown <= max_cooldown")
+
+
+class RiskBreaker:
+    """Shared risk-control circuit breaker for one account.
+
+    Retrying each request on its own meant that once B 站 started answering
+    -352, every concurrent task and UI request kept hammering it, which only
+    prolongs the block. Once ``threshold`` risk responses arrive in a row the
+    breaker opens and every outbound call for the owner waits out the
+    cooldown. Then a single half-open probe is let through: success closes
+    the breaker, another risk response re-opens it with a longer cooldown.
+
+    Only the caller holding the probe's :class:`Permit` decides its outcome:
+    requests already in flight when the breaker opened may still fail or be
+    cancelled while the probe is pending, and must not let a second probe out.
+    """
+
+    def __init__(self, config: BreakerConfig, *, owner: str = "") -> None:
+        self._config = config
+        self._owner = owner
+        self._state = CLOSED
+        self._failures = 0
+        self._open_until = 0.0
+        self._cooldown = config.cooldown
+        self._probe: Permit | None = None
+        self._changed = asyncio.Event()
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    @property
+    def max_pause(self) -> float:
+        return self._config.max_pause
+
+    @property
+    def is_closed(self) -> bool:
+        return self._state == CLOSED
+
+    def remaining(self) -> float:
+        if self._state != OPEN:
+            return 0.0
+        return max(0.0, self._open_until - time.monotonic())
+
+    async def before_request(self, *, max_wait: float | None = None) -> Permit:
+        """Wait until a request may go out.
+
+        The returned permit says how long the caller waited and whether it is
+        the half-open probe; hand it back to ``record_*`` / ``release``.
+        Raises :class:`RiskCooldownError` rather than wait beyond ``max_wait``.
+        """
+        started = time.monotonic()
+        while True:
+            if self._state == CLOSED:
+                return Permit(time.monotonic() - started)
+            now = time.monotonic()
+            if self._state == OPEN and now >= self._open_until:
+                self._transition(HALF_OPEN)
+            if self._state == HALF_OPEN and self._probe is None:
+                self._probe = Permit(time.monotonic() - started, probe=True)
+                return self._probe
+            timeout = self._open_until - now if self._state == OPEN else None
+            waited = now - started
+            if max_wait is not None:
+                budget = max_wait - waited
+                if budget <= 0 or (timeout is not None and timeout > budget):
+                    # Half-open: the probe's verdict is usually a request away.
+                    remaining = round(self.remaining(), 1) if self._state == OPEN else 1.0
+                    raise RiskCooldownError(
+                        "Paused for risk control; try again later",
+                        status_code=429,
+                        data={"retry_after": remaining},
+                        retry_after=remaining,
+                    )
+                timeout = budget if timeout is None else timeout
+            event = self._changed
+            try:
+                await asyncio.wait_for(event.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def record_success(self, permit: Permit | None = None) -> None:
+        """The upstream answered without risk control."""
+        self._failures = 0
+        self._probe = None
+        if self._state != CLOSED:
+            self._cooldown = self._config.cooldown
+            self._transition(CLOSED)
+
+    def record_risk(self, retry_after: float | None = None, permit: Permit | None = None) -> None:
+        cooldown = retry_after if retry_after else None
+        if self._state == HALF_OPEN:
+            if permit is None or permit is not self._probe:
+                # Sent before the breaker opened; only the probe's answer counts.
+                return
+            self._failures += 1
+            self._cooldown = min(self._config.max_cooldown, self._cooldown * 2)
+            self._open(cooldown or self._cooldown)
+            return
+        self._failures += 1
+        if self._state == CLOSED and self._failures >= self._config.threshold:
+            self._open(cooldown or self._cooldown)
+        elif self._state == OPEN and cooldown:
+            self._open_until = max(self._open_until, time.monotonic() + cooldown)
+
+    def release(self, permit: Permit | None) -> None:
+        """A request failed without telling us anything (e.g. a timeout).
+
+        Only frees the probe slot when ``permit`` is the probe's own.
+        """
+        if permit is not None and permit is self._probe:
+            self._probe = None
+            self._notify()
+
+    def _open(self, cooldown: float) -> None:
+        cooldown = min(cooldown, self._config.max_cooldown)
+        self._probe = None
+        self._open_until = time.monotonic() + cooldown
+        logger.warning(
+            "Risk control for owner %s: pausing outbound requests for %.0fs",
+            self._owner[:8] or "anonymous",
+            cooldown,
+        )
+        self._transition(OPEN)
+
+    def _transition(self, state: str) -> None:
+        if state == self._state:
+            return
+        if state == CLOSED:
+            logger.info("Risk control for owner %s cleared", self._owner[:8] or "anonymous")
+        self._state = state
+        self._notify()
+
+    def _notify(self) -> None:
+        # Wake every waiter and start a fresh event for the next transition.
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def to_dict(self) -> dict[str, Any]:
+        return {"state": self._state, "retry_after": round(self.remaining(), 1)}
+
+
+_breakers: weakref.WeakKeyDictionary[
+    asyncio.AbstractEventLoop, dict[tuple[BreakerConfig, str], RiskBreaker]
+] = weakref.WeakKeyDictionary()
+
+
+def get_breaker(config: BreakerConfig, owner: str = "") -> RiskBreaker:
+    """Return the breaker for ``owner`` shared by clients on the running loop."""
+    loop = asyncio.get_running_loop()
+    breakers = _breakers.get(loop)
+    if breakers is None:
+        breakers = {}
+        _breakers[loop] = breakers
+    key = (config, owner)
+    breaker = breakers.get(key)
+    if breaker is None:
+        breaker = RiskBreaker(config, owner=owner)
+        breakers[key] = breaker
+    return breaker
+
+
+def open_breakers() -> dict[str, RiskBreaker]:
+    """Breakers on the running loop that are currently pausing an owner.
+
+    Safe to call outside a loop (returns nothing), so task status can be
+    rendered from anywhere.
+    """
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return {}
+    return {
+        owner: breaker
+        for (_, owner), breaker in _breakers.get(loop, {}).items()
+        if not breaker.is_closed
+    }
+
+
+def is_paused(owner: str) -> bool:
+    return owner in open_breakers()
@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+import asyncio
+import copy
+import logging
+import time
+import weakref
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Mapping
+from dataclasses import dataclass
+from typing import Any
+
+from .client import BiliApiClient
+from .coalesce import normalize_params
+
+logger = logging.getLogger(__name__)
+
+_CacheKey = tuple[str, str, tuple[tuple[str, str], ...]]
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    """How long a cached response is served.
+
+    Within ``ttl`` seconds it is served as is. For ``stale`` seconds after
+    that it is still served, but a background request replaces it.
+    """
+
+    ttl: float
+    stale: float = 0.0
+
+
+@dataclass
+class _Entry:
+    value: Any
+    stored_at: float
+    refreshing: bool = False
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    stale_hits: int = 0
+    misses: int = 0
+    invalidations: int = 0
+    evictions: int = 0
+
+    def to_dict(self) -> dict[str, int]:
+        return {
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "evictions": self.evictions,
+        }
+
+
+class ResponseCache:
+    """Owner-scoped LRU cache of upstream GET responses.
+
+    The UI re-requests the same pages as users paginate back and forth, and
+    each of those used to spend rate budget. Entries are keyed by owner, URL
+    and parameters, so one account never sees another's data. Writes call
+    :meth:`invalidate`; a fetch that was in flight when its owner's entries
+    were invalidated is not stored, since it may predate the write.
+    """
+
+    def __init__(self, max_entries: int = 2048) -> None:
+        if max_entries < 1:
+            raise ValueError("max_entries must be >= 1")
+        self._max_entries = max_entries
+        self._entries: OrderedDict[_CacheKey, _Entry] = OrderedDict()
+        self._generations: dict[str, int] = {}
+        self._refreshes: set[asyncio.Task[None]] = set()
+        self.stats = CacheStats()
+
+    async def get_or_fetch(
+        self,
+        owner: str,
+        url: str,
+        params: Mapping[str, Any],
+        policy: CachePolicy,
+        fetch: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        key = (owner, url, normalize_params(params))
+        entry = self._entries.get(key)
+        if entry is not None:
+            age = time.monotonic() - entry.stored_at
+            if age <= policy.ttl:
+                self.stats.hits += 1
+                self._entries.move_to_end(key)
+                return copy.deepcopy(entry.value)
+            if age <= policy.ttl + policy.stale:
+                self.stats.stale_hits += 1
+                self._entries.move_to_end(key)
+                if not entry.refreshing:
+                    entry.refreshing = True
+                    self._revalidate(key, fetch)
+                return copy.deepcopy(entry.value)
+            del self._entries[key]
+        self.stats.misses += 1
+        generation = self._generations.get(owner, 0)
+        value = await fetch()
+        self._store(key, value, generation)
+        return value
+
+    def _store(self, key: _CacheKey, value: Any, generation: int) -> None:
+        if self._generations.get(key[0], 0) != generation:
+            return
+        self._entries[key] = _Entry(copy.deepcopy(value), time.monotonic())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+            self.stats.evictions += 1
+
+    def _revalidate(self, key: _CacheKey, fetch: Callable[[], Awaitable[Any]]) -> None:
+        generation = self._generations.get(key[0], 0)
+
+        async def refresh() -> None:
+            try:
+                value = await fetch()
+            except Exception as exc:  # served stale already; try again next time
+                entry = self._entries.get(key)
+                if entry is not None:
+                    entry.refreshing = False
+                logger.debug("Revalidating %s failed: %s", key[1], exc)
+                return
+            self._store(key, value, generation)
+
+        task = asyncio.create_task(refresh())
+        self._refreshes.add(task)
+        task.add_done_callback(self._refreshes.discard)
+
+    def invalidate(self, owner: str, url: str, **match: Any) -> int:
+        """Drop ``owner``'s entries for ``url`` whose params include ``match``."""
+        self._generations[owner] = self._generations.get(owner, 0) + 1
+        wanted = {str(k): str(v) for k, v in match.items()}
+        doomed = [
+            key
+            for key in self._entries
+            if key[0] == owner
+            and key[1] == url
+            and all(dict(key[2]).get(k) == v for k, v in wanted.items())
+        ]
+        for key in doomed:
+            del self._entries[key]
+        self.stats.invalidations += len(doomed)
+        return len(doomed)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def to_dict(self) -> dict[str, Any]:
+        return {"entries": len(self._entries), **self.stats.to_dict()}
+
+
+async def cached_get(
+    client: BiliApiClient,
+    url: str,
+    params: Mapping[str, Any],
+    policy: CachePolicy,
+    fetch: Callable[[], Awaitable[Any]],
+) -> Any:
+    """``fetch()`` through the client's response cache, if it has one."""
+    cache = client.response_cache
+    if cache is None:
+        return await fetch()
+    return await cache.get_or_fetch(client.owner, url, params, policy, fetch)
+
+
+def invalidate(client: BiliApiClient, url: str, **match: Any) -> None:
+    cache = client.response_cache
+    if cache is not None:
+        cache.invalidate(client.owner, url, **match)
+
+
+_caches: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, ResponseCache] = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_response_cache(max_entries: int = 2048) -> ResponseCache:
+    """Return the response cache shared by clients on the running loop."""
+    loop = asyncio.get_running_loop()
+    cache = _caches.get(loop)
+    if cache is None:
+        cache = ResponseCache(max_entries=max_entries)
+        _caches[loop] = cache
+    return cache
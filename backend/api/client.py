@@ -1,11 +1,32 @@
 from __future__ import annotations
 
 import asyncio
+import hashlib
+import logging
+import time
+import weakref
+from collections import OrderedDict
 from collections.abc import Mapping
-from typing import Any
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import TYPE_CHECKING, Any
 
 import httpx
 
+from .ratelimit import (
+    INTERACTIVE,
+    AdaptiveBounds,
+    RateLimiter,
+    get_shared_limiter,
+    request_priority,
+)
+
+if TYPE_CHECKING:
+    from .breaker import BreakerConfig, Permit, RiskBreaker
+    from .cache import ResponseCache
+
+logger = logging.getLogger(__name__)
+
 DEFAULT_USER_AGENT = (
     "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
     "AppleWebKit/537.36 (KHTML, like Gecko) "
@@ -13,6 +34,20 @@ DEFAULT_USER_AGENT = (
 )
 DEFAULT_REFERER = "https://www.bilibili.com/"
 
+# Origins worth a TLS handshake before the first user request arrives.
+PREWARM_URLS: tuple[str, ...] = ("https://api.bilibili.com/",)
+
+
+def owner_key(sessdata: str) -> str:
+    """Derive a stable, non-reversible owner id from a session cookie.
+
+    Tasks, pooled clients and rate-limit state are keyed by this instead of the
+    raw ``SESSDATA`` so nothing long-lived holds a usable credential as a key,
+    and so an owner can be compared without the value ever appearing in logs
+    or API responses.
+    """
+    return hashlib.sha256(sessdata.encode("utf-8")).hexdigest()
+
 
 class BiliApiError(RuntimeError):
     def __init__(
@@ -21,11 +56,28 @@ class BiliApiError(RuntimeError):
         code: int | None = None,
         data: Any | None = None,
         status_code: int | None = None,
+        retry_after: float | None = None,
     ) -> None:
         super().__init__(message)
         self.code = code
         self.data = data
         self.status_code = status_code
+        self.retry_after = retry_after
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Seconds from a ``Retry-After`` header (delta-seconds or HTTP-date)."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
 
 
 class BiliApiClient:
@@ -37,49 +89,61 @@ class BiliApiClient:
         referer: str | None = None,
         timeout: float | httpx.Timeout = 10.0,
         qps: float | None = None,
+        global_qps: float | None = None,
+        adaptive: AdaptiveBounds | None = None,
+        breaker: BreakerConfig | None = None,
+        response_cache: ResponseCache | None = None,
+        coalesce: bool = True,
         max_retries: int = 3,
         retry_base_delay: float = 1.0,
+        http_client: httpx.AsyncClient | None = None,
     ) -> None:
         if qps is not None and qps <= 0:
             raise ValueError("qps must be positive")
+        if global_qps is not None and global_qps <= 0:
+            raise ValueError("global_qps must be positive")
         if max_retries < 0:
             raise ValueError("max_retries must be >= 0")
 
-        headers = {
-            "User-Agent": user_agent or DEFAULT_USER_AGENT,
-            "Referer": referer or DEFAULT_REFERER,
-        }
-        cookies: dict[str, str] = {}
-        if sessdata:
-            cookies["SESSDATA"] = sessdata
-        if bili_jct:
-            cookies["bili_jct"] = bili_jct
-        self._client = httpx.AsyncClient(headers=headers, cookies=cookies, timeout=timeout)
+        if http_client is not None:
+            # Borrowed from a ``ClientPool``: the pool set the cookies and owns
+            # the connections, so ``close()`` must leave it open. Other
+            # callers share it, so the timeout goes with each request instead.
+            self._client = http_client
+            self._owns_client = False
+        else:
+            self._client = _new_http_client(
+                sessdata, bili_jct, user_agent=user_agent, referer=referer, timeout=timeout
+            )
+            self._owns_client = True
+        self._timeout = timeout
         self._qps = qps
+        self._global_qps = global_qps
+        self._adaptive = adaptive
+        self._breaker_config = breaker
+        self._response_cache = response_cache
+        self._coalesce = coalesce
+        # Rate limits are per account; anonymous clients share one bucket.
+        self._owner = owner_key(sessdata) if sessdata else ""
         self._max_retries = max_retries
         self._retry_base_delay = retry_base_delay
         self._wbi_keys: tuple[str, str] | None = None
-        self._wbi_lock = asyncio.Lock()
 
-    async def get_wbi_keys(self) -> tuple[str, str]:
-        if self._wbi_keys is not None:
-            return self._wbi_keys
+    @property
+    def owner(self) -> str:
+        """``owner_key`` of the session, or "" for an anonymous client."""
+        return self._owner
 
-        from . import wbi
+    @property
+    def response_cache(self) -> ResponseCache | None:
+        return self._response_cache
 
-        shared = wbi.cached_keys()
-        if shared is not None:
-            self._wbi_keys = shared
-            return shared
+    async def get_wbi_keys(self) -> tuple[str, str]:
+        if self._wbi_keys is None:
+            from . import wbi
 
-        async with self._wbi_lock:
-            if self._wbi_keys is None:
-                shared = wbi.cached_keys()
-                if shared is None:
-                    shared = await wbi.fetch_wbi_keys(self)
-                    wbi.store_keys(shared)
-                self._wbi_keys = shared
-            return self._wbi_keys
+            self._wbi_keys = await wbi.get_keys()
+        return self._wbi_keys
 
     def invalidate_wbi_keys(self) -> None:
         from . import wbi
@@ -122,25 +186,100 @@ class BiliApiClient:
         json: Any | None = None,
         headers: Mapping[str, str] | None = None,
     ) -> dict[str, Any]:
+        if not self._coalesce or method.upper() != "GET":
+            return await self._send(
+                method, url, params=params, data=data, json=json, headers=headers
+            )
+        from .coalesce import get_coalescer, request_key
+
+        # Identical GETs in flight for the same account share one upstream call.
+        key = request_key(self._owner, method, url, params)
+        return await get_coalescer().run(
+            key, lambda: self._send(method, url, params=params, headers=headers)
+        )
+
+    async def _send(
+        self,
+        method: str,
+        url: str,
+        *,
+        params: Mapping[str, Any] | None = None,
+        data: Mapping[str, Any] | None = None,
+        json: Any | None = None,
+        headers: Mapping[str, str] | None = None,
+    ) -> dict[str, Any]:
+        from . import nav
         from .retry import is_risk_control_error, sleep_backoff
 
-        last_exc: BiliApiError | None = None
-        for attempt in range(self._max_retries + 1):
-            if self._qps is not None:
-                from .ratelimit import get_shared_bucket
+        if url != nav.NAV_URL and nav.known_expired(self._owner):
+            # /nav said logged out moments ago; asking again only burns budget.
+            raise nav.SessionExpiredError()
 
-                await get_shared_bucket(self._qps).acquire()
+        limiter = self._limiter()
+        breaker = self._breaker()
+        priority = request_priority(method)
+        attempt = 0
+        paused = 0.0
+        permit: Permit | None = None
+        while True:
+            if breaker is not None:
+                # Someone is looking at the UI: answer 429 + Retry-After now
+                # rather than hold the page for a cooldown of up to minutes.
+                # Tasks and deletes are nobody's page load, so they wait.
+                max_wait = 0.0 if priority == INTERACTIVE else breaker.max_pause - paused
+                permit = await breaker.before_request(max_wait=max_wait)
+                paused += permit.waited
             try:
-                return await self._request_once(
+                # Inside the try: a request cancelled while it queues for a
+                # token must still hand back a probe permit it holds.
+                if limiter is not None:
+                    await limiter.acquire(self._owner, priority=priority)
+                payload = await self._request_once(
                     method, url, params=params, data=data, json=json, headers=headers
                 )
             except BiliApiError as exc:
-                if attempt >= self._max_retries or not is_risk_control_error(exc):
+                risk = is_risk_control_error(exc)
+                if risk and limiter is not None:
+                    limiter.record_risk(self._owner)
+                if breaker is not None:
+                    if risk:
+                        breaker.record_risk(exc.retry_after, permit)
+                    elif exc.code is not None or exc.status_code is not None:
+                        breaker.record_success(permit)
+                    else:
+                        breaker.release(permit)
+                if not risk:
+                    raise
+                if breaker is not None and not breaker.is_closed:
+                    # The shared cooldown replaces per-request backoff and does
+                    # not spend a retry; ``max_pause`` bounds the total wait.
+                    continue
+                if attempt >= self._max_retries:
                     raise
-                last_exc = exc
                 await sleep_backoff(attempt, self._retry_base_delay)
-        assert last_exc is not None
-        raise last_exc
+                attempt += 1
+                continue
+            except BaseException:
+                if breaker is not None:
+                    breaker.release(permit)
+                raise
+            if limiter is not None:
+                limiter.record_success(self._owner)
+            if breaker is not None:
+                breaker.record_success(permit)
+            return payload
+
+    def _limiter(self) -> RateLimiter | None:
+        if self._qps is None:
+            return None
+        return get_shared_limiter(self._qps, self._global_qps, adaptive=self._adaptive)
+
+    def _breaker(self) -> RiskBreaker | None:
+        if self._breaker_config is None:
+            return None
+        from .breaker import get_breaker
+
+        return get_breaker(self._breaker_config, self._owner)
 
     async def _request_once(
         self,
@@ -160,6 +299,7 @@ class BiliApiClient:
                 data=data,
                 json=json,
                 headers=headers,
+                timeout=self._timeout,
             )
             response.raise_for_status()
         except httpx.HTTPStatusError as exc:
@@ -167,6 +307,7 @@ class BiliApiClient:
                 f"HTTP error {exc.response.status_code}",
                 status_code=exc.response.status_code,
                 data=exc.response.text,
+                retry_after=parse_retry_after(exc.response.headers.get("Retry-After")),
             ) from exc
         except httpx.HTTPError as exc:
             raise BiliApiError(f"HTTP request failed: {exc!s}") from exc
@@ -215,4 +356,229 @@ class BiliApiClient:
         )
 
     async def close(self) -> None:
-        await self._client.aclose()
+        if self._owns_client:
+            await self._client.aclose()
+
+
+def _new_http_client(
+    sessdata: str | None,
+    bili_jct: str | None,
+    *,
+    user_agent: str | None = None,
+    referer: str | None = None,
+    timeout: float | httpx.Timeout = 10.0,
+    transport: httpx.AsyncBaseTransport | None = None,
+) -> httpx.AsyncClient:
+    headers = {
+        "User-Agent": user_agent or DEFAULT_USER_AGENT,
+        "Referer": referer or DEFAULT_REFERER,
+    }
+    cookies: dict[str, str] = {}
+    if sessdata:
+        cookies["SESSDATA"] = sessdata
+    if bili_jct:
+        cookies["bili_jct"] = bili_jct
+    return httpx.AsyncClient(
+        headers=headers, cookies=cookies, timeout=timeout, transport=transport
+    )
+
+
+@dataclass
+class PoolStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    requests: int = 0
+    connections_opened: int = 0
+
+    def to_dict(self) -> dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "requests": self.requests,
+            "connections_opened": self.connections_opened,
+            "connections_reused": max(0, self.requests - self.connections_opened),
+        }
+
+
+class _SharedTransport(httpx.AsyncBaseTransport):
+    """Routes one owner's client through the pool's connection pool.
+
+    ``aclose`` is deliberately a no-op: evicting or closing one owner's client
+    must not tear down keep-alive connections other owners are using.
+    """
+
+    def __init__(self, pool: ClientPool) -> None:
+        self._pool = pool
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await self._pool._handle(request)
+
+    async def aclose(self) -> None:
+        return None
+
+
+@dataclass
+class _PoolEntry:
+    client: httpx.AsyncClient
+    last_used: float
+
+
+class ClientPool:
+    """Long-lived upstream HTTP clients, one per credential owner.
+
+    Building a fresh ``httpx.AsyncClient`` per HTTP request meant a new TLS
+    handshake and cold connection pool on nearly every call. Here each owner
+    (``owner_key(sessdata)``) gets its own client — so cookies never leak
+    between accounts — while all of them share one keep-alive connection pool,
+    optionally over HTTP/2. Owners idle for ``idle_timeout`` seconds, or beyond
+    ``max_clients`` in LRU order, are dropped.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_clients: int = 64,
+        idle_timeout: float = 300.0,
+        max_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+        http2: bool = False,
+    ) -> None:
+        if max_clients < 1:
+            raise ValueError("max_clients must be >= 1")
+        self._max_clients = max_clients
+        self._idle_timeout = idle_timeout
+        self._limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self._http2 = http2
+        self._transport: httpx.AsyncHTTPTransport | None = None
+        self._clients: OrderedDict[str, _PoolEntry] = OrderedDict()
+        self.stats = PoolStats()
+
+    @property
+    def transport(self) -> httpx.AsyncHTTPTransport:
+        if self._transport is None:
+            try:
+                self._transport = httpx.AsyncHTTPTransport(limits=self._limits, http2=self._http2)
+            except ImportError:
+                logger.warning("HTTP/2 requested but httpx[http2] is not installed; using HTTP/1.1")
+                self._http2 = False
+                self._transport = httpx.AsyncHTTPTransport(limits=self._limits)
+        return self._transport
+
+    def client_for(
+        self,
+        sessdata: str | None,
+        bili_jct: str | None = None,
+        *,
+        timeout: float | httpx.Timeout = 10.0,
+    ) -> httpx.AsyncClient:
+        """Return the pooled client for this session, creating it if needed.
+
+        Anonymous callers (the QR login flow) get a fresh, uncached client on
+        the shared connections: a login response sets ``SESSDATA`` on whatever
+        cookie jar receives it, and that jar must not be handed to the next
+        anonymous caller.
+
+        A pooled client is shared by every concurrent caller with the same
+        credentials, so it is never mutated after creation: entries are keyed
+        on the CSRF token as well, and ``timeout`` is only the default for a
+        new client (``BiliApiClient`` passes its own with each request).
+        """
+        if not sessdata:
+            return _new_http_client(None, None, timeout=timeout, transport=_SharedTransport(self))
+
+        now = time.monotonic()
+        self._evict_idle(now)
+        key = f"{owner_key(sessdata)}:{owner_key(bili_jct)[:16] if bili_jct else ''}"
+        entry = self._clients.get(key)
+        if entry is not None:
+            self.stats.hits += 1
+            self._clients.move_to_end(key)
+            entry.last_used = now
+            return entry.client
+
+        self.stats.misses += 1
+        client = _new_http_client(
+            sessdata, bili_jct, timeout=timeout, transport=_SharedTransport(self)
+        )
+        self._clients[key] = _PoolEntry(client=client, last_used=now)
+        while len(self._clients) > self._max_clients:
+            self._clients.popitem(last=False)
+            self.stats.evictions += 1
+        return client
+
+    def _evict_idle(self, now: float) -> None:
+        # Entries are in LRU order, so the idle ones are all at the front. A
+        # dropped client may still be in use by a running task; that is fine,
+        # since it holds no connections of its own.
+        while self._clients:
+            key, entry = next(iter(self._clients.items()))
+            if now - entry.last_used <= self._idle_timeout:
+                break
+            del self._clients[key]
+            self.stats.evictions += 1
+
+    async def _handle(self, request: httpx.Request) -> httpx.Response:
+        self.stats.requests += 1
+
+        async def trace(event_name: str, info: Mapping[str, Any]) -> None:
+            if event_name == "connection.connect_tcp.complete":
+                self.stats.connections_opened += 1
+
+        request.extensions = {**request.extensions, "trace": trace}
+        return await self.transport.handle_async_request(request)
+
+    async def prewarm(self, urls: tuple[str, ...] = PREWARM_URLS) -> int:
+        """Open keep-alive connections ahead of the first real request.
+
+        Uses a bare ``HEAD`` on the origin, which is not an API endpoint and
+        so costs nothing against risk control. Failures are logged and
+        ignored; the first real request will simply connect on its own.
+        """
+        warmed = 0
+        async with httpx.AsyncClient(
+            transport=_SharedTransport(self),
+            timeout=5.0,
+            headers={"User-Agent": DEFAULT_USER_AGENT},
+        ) as client:
+            for url in urls:
+                try:
+                    await client.head(url)
+                    warmed += 1
+                except httpx.HTTPError as exc:
+                    logger.info("Connection pre-warm to %s failed: %s", url, exc)
+        return warmed
+
+    def to_dict(self) -> dict[str, Any]:
+        return {"clients": len(self._clients), "http2": self._http2, **self.stats.to_dict()}
+
+    async def aclose(self) -> None:
+        self._clients.clear()
+        if self._transport is not None:
+            await self._transport.aclose()
+            self._transport = None
+
+
+_pools: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, ClientPool] = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_client_pool(**config: Any) -> ClientPool:
+    """Return the pool for the running event loop, creating it with ``config``.
+
+    Connections belong to the loop that opened them, so — like the shared
+    rate-limit buckets — there is one pool per loop rather than per process.
+    ``config`` is only used on first creation.
+    """
+    loop = asyncio.get_running_loop()
+    pool = _pools.get(loop)
+    if pool is None:
+        pool = ClientPool(**config)
+        _pools[loop] = pool
+    return pool
@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import asyncio
+import copy
+import weakref
+from collections.abc import Awaitable, Callable, Mapping
+from dataclasses import dataclass, field
+from typing import Any
+
+# Signature parameters differ on every call (``wts`` is a timestamp) without
+# changing what is being asked for.
+_VOLATILE_PARAMS = frozenset({"wts", "w_rid"})
+
+RequestKey = tuple[str, str, str, tuple[tuple[str, str], ...]]
+
+
+def normalize_params(params: Mapping[str, Any] | None) -> tuple[tuple[str, str], ...]:
+    """Order-independent, hashable form of query parameters."""
+    if not params:
+        return ()
+    return tuple(
+        sorted((str(k), str(v)) for k, v in params.items() if k not in _VOLATILE_PARAMS)
+    )
+
+
+def request_key(
+    owner: str, method: str, url: str, params: Mapping[str, Any] | None
+) -> RequestKey:
+    return owner, method.upper(), url, normalize_params(params)
+
+
+@dataclass
+class CoalesceStats:
+    upstream: int = 0
+    coalesced: int = 0
+
+    def to_dict(self) -> dict[str, int]:
+        return {"upstream": self.upstream, "coalesced": self.coalesced}
+
+
+@dataclass(eq=False)
+class _Flight:
+    task: asyncio.Task[Any]
+    waiters: int = field(default=0)
+
+
+class RequestCoalescer:
+    """Share one in-flight upstream call between identical concurrent requests.
+
+    Two tabs enriching the same followings, or a UI poll racing a task, used
+    to send the same GET twice and pay for it twice in rate budget. The first
+    caller's request runs as a task; callers arriving with the same key while
+    it is in flight await that task instead. The call is only cancelled once
+    every waiter has gone, so one impatient caller cannot fail the others.
+    """
+
+    def __init__(self) -> None:
+        self._flights: dict[RequestKey, _Flight] = {}
+        self.stats = CoalesceStats()
+
+    def in_flight(self) -> int:
+        return len(self._flights)
+
+    async def run(self, key: RequestKey, call: Callable[[], Awaitable[Any]]) -> Any:
+        flight = self._flights.get(key)
+        leader = flight is None
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(call()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _: self._land(key, flight))
+            self.stats.upstream += 1
+        else:
+            self.stats.coalesced += 1
+        flight.waiters += 1
+        try:
+            result = await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            if not flight.task.done():
+                flight.waiters -= 1
+                if flight.waiters == 0:
+                    # Unlist first so a newcomer starts afresh instead of
+                    # joining a call that is being cancelled.
+                    self._land(key, flight)
+                    flight.task.cancel()
+            raise
+        # Followers get their own copy: callers are free to mutate responses.
+        return result if leader else copy.deepcopy(result)
+
+    def _land(self, key: RequestKey, flight: _Flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    def to_dict(self) -> dict[str, int]:
+        return {"in_flight": self.in_flight(), **self.stats.to_dict()}
+
+
+_coalescers: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, RequestCoalescer] = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_coalescer() -> RequestCoalescer:
+    """Return the coalescer shared by clients on the running loop."""
+    loop = asyncio.get_running_loop()
+    coalescer = _coalescers.get(loop)
+    if coalescer is None:
+        coalescer = RequestCoalescer()
+        _coalescers[loop] = coalescer
+    return coalescer
@@ -0,0 +1,181 @@
+"""Per-owner index of page cursors for the cursor-only feeds.
+
+Watch history (``cursor.max`` / ``view_at``) and dynamics (``offset``) can
+only be read page after page, so jumping to page 20 in the UI used to replay
+19 upstream requests every time. Every page fetched through :func:`seek`
+records the cursor that starts the next one, keyed by owner and feed, and a
+later request for page N resumes from the nearest page it knows.
+
+Deletes shift every later page boundary, so they drop the owner's entries
+for that kind of feed (:func:`invalidate`). New activity shifts them too,
+which is what the TTL is for: a resumed page may be off by whatever arrived
+since it was recorded, never by more than ``ttl`` seconds' worth.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import copy
+import time
+import weakref
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Hashable
+from dataclasses import dataclass
+from typing import Any
+
+from .client import BiliApiClient
+
+# (kind, *shape): e.g. ("history", "all", 20) or ("dynamics", mid).
+FeedKey = tuple[Hashable, ...]
+_Key = tuple[str, FeedKey]
+
+# Fetch the page a cursor points at (None: the first page). Returns the page
+# and the cursor of the page after it, or None at the end of the feed.
+PageFetch = Callable[[Any | None], Awaitable[tuple[Any, Any | None]]]
+
+
+@dataclass
+class _Feed:
+    cursors: dict[int, Any]
+    touched_at: float
+
+
+@dataclass
+class CursorIndexStats:
+    hits: int = 0
+    misses: int = 0
+    replayed: int = 0
+    invalidations: int = 0
+
+    def to_dict(self) -> dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "replayed": self.replayed,
+            "invalidations": self.invalidations,
+        }
+
+
+class CursorIndex:
+    """Start cursors of numbered pages, per owner and feed.
+
+    A feed that has not been touched for ``ttl`` seconds is forgotten; at
+    most ``max_feeds`` feeds and ``max_pages`` pages per feed are kept.
+    """
+
+    def __init__(
+        self, *, ttl: float = 300.0, max_feeds: int = 1024, max_pages: int = 1000
+    ) -> None:
+        self._ttl = ttl
+        self._max_feeds = max_feeds
+        self._max_pages = max_pages
+        self._feeds: OrderedDict[_Key, _Feed] = OrderedDict()
+        self.stats = CursorIndexStats()
+
+    def _feed(self, owner: str, feed: FeedKey) -> _Feed | None:
+        key = (owner, feed)
+        entry = self._feeds.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() - entry.touched_at > self._ttl:
+            del self._feeds[key]
+            return None
+        return entry
+
+    def nearest(self, owner: str, feed: FeedKey, page: int) -> tuple[int, Any | None]:
+        """The highest known page ``<= page`` and its cursor; ``(1, None)`` if none."""
+        entry = self._feed(owner, feed)
+        known = [p for p in entry.cursors if p <= page] if entry is not None else []
+        if not known:
+            if page > 1:
+                self.stats.misses += 1
+            return 1, None
+        best = max(known)
+        self.stats.hits += 1
+        return best, copy.deepcopy(entry.cursors[best])
+
+    def record(self, owner: str, feed: FeedKey, page: int, cursor: Any) -> None:
+        """Remember that ``cursor`` fetches ``page`` (2 or more)."""
+        if page < 2:
+            return
+        key = (owner, feed)
+        entry = self._feed(owner, feed)
+        if entry is None:
+            entry = _Feed({}, time.monotonic())
+            self._feeds[key] = entry
+        if page not in entry.cursors and len(entry.cursors) >= self._max_pages:
+            return
+        entry.cursors[page] = copy.deepcopy(cursor)
+        entry.touched_at = time.monotonic()
+        self._feeds.move_to_end(key)
+        while len(self._feeds) > self._max_feeds:
+            self._feeds.popitem(last=False)
+
+    def invalidate(self, owner: str, kind: str) -> int:
+        """Forget ``owner``'s cursors for every feed of ``kind``."""
+        doomed = [key for key in self._feeds if key[0] == owner and key[1][0] == kind]
+        for key in doomed:
+            del self._feeds[key]
+        self.stats.invalidations += len(doomed)
+        return len(doomed)
+
+    def known_pages(self, owner: str, feed: FeedKey) -> int:
+        entry = self._feed(owner, feed)
+        return max(entry.cursors, default=1) if entry is not None else 1
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "feeds": len(self._feeds),
+            "pages": sum(len(entry.cursors) for entry in self._feeds.values()),
+            **self.stats.to_dict(),
+        }
+
+
+_indexes: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, CursorIndex] = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_cursor_index() -> CursorIndex:
+    """Return the cursor index shared by clients on the running loop."""
+    loop = asyncio.get_running_loop()
+    index = _indexes.get(loop)
+    if index is None:
+        index = CursorIndex()
+        _indexes[loop] = index
+    return index
+
+
+def invalidate(client: BiliApiClient, kind: str) -> None:
+    get_cursor_index().invalidate(client.owner, kind)
+
+
+async def seek(
+    client: BiliApiClient,
+    feed: FeedKey,
+    page: int,
+    fetch: PageFetch,
+    *,
+    on_page: Callable[[int], None] | None = None,
+) -> Any | None:
+    """Fetch page ``page`` of ``feed``, resuming from the nearest known cursor.
+
+    Every page walked through records its successor's cursor. Returns None
+    if the feed ends before ``page``. ``on_page`` is called with each page
+    number fetched.
+    """
+    index = get_cursor_index()
+    current, cursor = index.nearest(client.owner, feed, page)
+    while True:
+        data, next_cursor = await fetch(cursor)
+        if on_page is not None:
+            on_page(current)
+        if next_cursor is not None:
+            index.record(client.owner, feed, current + 1, next_cursor)
+        if current == page:
+            return data
+        if next_cursor is None:
+            return None
+        index.stats.replayed += 1
+        cursor = next_cursor
+        current += 1
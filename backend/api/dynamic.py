@@ -2,6 +2,7 @@ from __future__ import annotations
 
 from typing import Any
 
+from . import cursor_index
 from .client import BiliApiClient
 from .wbi import signed_get
 
@@ -36,10 +37,14 @@ class DynamicApi:
         return data if isinstance(data, dict) else {}
 
     async def delete_dynamic(self, dynamic_id: int) -> dict[str, Any]:
-        payload = await self._client.post(
-            DELETE_DYNAMIC_URL,
-            data={"dynamic_id": dynamic_id},
-            include_csrf=True,
-        )
+        try:
+            payload = await self._client.post(
+                DELETE_DYNAMIC_URL,
+                data={"dynamic_id": dynamic_id},
+                include_csrf=True,
+            )
+        finally:
+            # Even a failed write may have landed upstream and shifted pages.
+            cursor_index.invalidate(self._client, "dynamics")
         data = payload.get("data") if isinstance(payload, dict) else None
         return data if isinstance(data, dict) else {}
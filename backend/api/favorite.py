@@ -3,20 +3,35 @@ from __future__ import annotations
 from collections.abc import Sequence
 from typing import Any
 
+from . import cache
+from .cache import CachePolicy
 from .client import BiliApiClient
 
 FOLDERS_URL = "https://api.bilibili.com/x/v3/fav/folder/created/list-all"
 RESOURCE_IDS_URL = "https://api.bilibili.com/x/v3/fav/resource/ids"
 RESOURCE_LIST_URL = "https://api.bilibili.com/x/v3/fav/resource/list"
 BATCH_DELETE_URL = "https://api.bilibili.com/x/v3/fav/resource/batch-del"
+FOLDER_DELETE_URL = "https://api.bilibili.com/x/v3/fav/folder/del"
+
+FOLDERS_CACHE = CachePolicy(ttl=30.0, stale=120.0)
+RESOURCES_CACHE = CachePolicy(ttl=30.0, stale=120.0)
 
 
 class FavoriteApi:
     def __init__(self, client: BiliApiClient) -> None:
         self._client = client
 
-    async def get_folders(self, mid: int) -> dict[str, Any]:
-        payload = await self._client.get(FOLDERS_URL, params={"up_mid": mid})
+    async def get_folders(self, mid: int, *, fresh: bool = False) -> dict[str, Any]:
+        params = {"up_mid": mid}
+        if fresh:
+            cache.invalidate(self._client, FOLDERS_URL, up_mid=mid)
+        payload = await cache.cached_get(
+            self._client,
+            FOLDERS_URL,
+            params,
+            FOLDERS_CACHE,
+            lambda: self._client.get(FOLDERS_URL, params=params),
+        )
         data = payload.get("data") if isinstance(payload, dict) else None
         return data if isinstance(data, dict) else {}
 
@@ -50,18 +65,22 @@ class FavoriteApi:
         Returned ``data`` includes ``info`` (folder meta) and ``medias`` list
         with ``id``/``type``/``title``/``bvid``/``upper``/``duration``/...
         """
-        payload = await self._client.get(
+        params = {
+            "media_id": media_id,
+            "pn": pn,
+            "ps": ps,
+            "keyword": keyword,
+            "order": order,
+            "tid": tid,
+            "type": type_,
+            "platform": "web",
+        }
+        payload = await cache.cached_get(
+            self._client,
             RESOURCE_LIST_URL,
-            params={
-                "media_id": media_id,
-                "pn": pn,
-                "ps": ps,
-                "keyword": keyword,
-                "order": order,
-                "tid": tid,
-                "type": type_,
-                "platform": "web",
-            },
+            params,
+            RESOURCES_CACHE,
+            lambda: self._client.get(RESOURCE_LIST_URL, params=params),
         )
         data = payload.get("data") if isinstance(payload, dict) else None
         return data if isinstance(data, dict) else {}
@@ -71,10 +90,30 @@ class FavoriteApi:
             resources_value = resources
         else:
             resources_value = ",".join(str(item) for item in resources)
-        payload = await self._client.post(
-            BATCH_DELETE_URL,
-            data={"media_id": media_id, "resources": resources_value},
-            include_csrf=True,
-        )
+        try:
+            payload = await self._client.post(
+                BATCH_DELETE_URL,
+                data={"media_id": media_id, "resources": resources_value},
+                include_csrf=True,
+            )
+        finally:
+            # Even a failed write may have landed upstream.
+            cache.invalidate(self._client, RESOURCE_LIST_URL, media_id=media_id)
+            cache.invalidate(self._client, FOLDERS_URL)
+        data = payload.get("data") if isinstance(payload, dict) else None
+        return data if isinstance(data, dict) else {}
+
+    async def delete_folders(self, media_ids: Sequence[int]) -> dict[str, Any]:
+        """Delete whole folders, items included. Upstream refuses the default folder."""
+        try:
+            payload = await self._client.post(
+                FOLDER_DELETE_URL,
+                data={"media_ids": ",".join(str(item) for item in media_ids)},
+                include_csrf=True,
+            )
+        finally:
+            for media_id in media_ids:
+                cache.invalidate(self._client, RESOURCE_LIST_URL, media_id=media_id)
+            cache.invalidate(self._client, FOLDERS_URL)
         data = payload.get("data") if isinstance(payload, dict) else None
         return data if isinstance(data, dict) else {}
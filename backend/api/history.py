@@ -1,7 +1,9 @@
 from __future__ import annotations
 
+from collections.abc import Sequence
 from typing import Any
 
+from . import cursor_index
 from .client import BiliApiClient
 
 CLEAR_HISTORY_URL = "https://api.bilibili.com/x/v2/history/clear"
@@ -35,20 +37,28 @@ class HistoryApi:
         data = payload.get("data") if isinstance(payload, dict) else None
         return data if isinstance(data, dict) else {}
 
-    async def delete_history(self, kid: str) -> dict[str, Any]:
-        """Delete a single history entry.
+    async def delete_history(self, kid: Sequence[str] | str) -> dict[str, Any]:
+        """Delete history entries; several kids go out comma-joined in one call.
 
         ``kid`` format: ``archive_<aid>``, ``pgc_<epid>``, etc.
         """
-        payload = await self._client.post(
-            DELETE_HISTORY_URL,
-            data={"kid": kid},
-            include_csrf=True,
-        )
+        kid_value = kid if isinstance(kid, str) else ",".join(kid)
+        try:
+            payload = await self._client.post(
+                DELETE_HISTORY_URL,
+                data={"kid": kid_value},
+                include_csrf=True,
+            )
+        finally:
+            # Even a failed write may have landed upstream and shifted pages.
+            cursor_index.invalidate(self._client, "history")
         data = payload.get("data") if isinstance(payload, dict) else None
         return data if isinstance(data, dict) else {}
 
     async def clear_history(self) -> dict[str, Any]:
-        payload = await self._client.post(CLEAR_HISTORY_URL, data={}, include_csrf=True)
+        try:
+            payload = await self._client.post(CLEAR_HISTORY_URL, data={}, include_csrf=True)
+        finally:
+            cursor_index.invalidate(self._client, "history")
         data = payload.get("data") if isinstance(payload, dict) else None
         return data if isinstance(data, dict) else {}
@@ -0,0 +1,112 @@
+"""One ``/nav`` response feeds both the session identity and the WBI keys.
+
+``GET /api/v2/me`` is the first call of nearly every workflow and the WBI
+key fetch hits the same endpoint, so each of them used to pay for its own
+request. Here a single response fills the WBI key cache and a short-lived
+per-owner identity cache (``isLogin``, ``mid``, ``uname``, ...). A session
+known to be logged out is remembered too, so requests for it fail locally
+instead of spending rate budget on answers that can only be -101.
+"""
+
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from typing import Any
+
+from . import wbi
+from .client import BiliApiClient, BiliApiError
+
+NAV_URL = "https://api.bilibili.com/x/web-interface/nav"
+
+NOT_LOGGED_IN = -101
+
+# Short: long enough to cover one workflow's burst of calls, short enough
+# that a renamed account or a freshly revoked session shows up quickly.
+_IDENTITY_TTL = 60.0
+_MAX_OWNERS = 1024
+
+_identities: OrderedDict[str, tuple[float, dict[str, Any]]] = OrderedDict()
+
+
+class SessionExpiredError(BiliApiError):
+    """The SESSDATA is not (or no longer) logged in."""
+
+    def __init__(self, message: str = "Session expired; log in again") -> None:
+        super().__init__(message, code=NOT_LOGGED_IN, status_code=401)
+
+
+def _remember(owner: str, data: dict[str, Any]) -> None:
+    if not owner:
+        return
+    _identities[owner] = (time.monotonic(), data)
+    _identities.move_to_end(owner)
+    while len(_identities) > _MAX_OWNERS:
+        _identities.popitem(last=False)
+
+
+def cached_identity(owner: str) -> dict[str, Any] | None:
+    """The owner's nav data if fetched within the TTL."""
+    entry = _identities.get(owner)
+    if entry is None:
+        return None
+    fetched_at, data = entry
+    if time.monotonic() - fetched_at > _IDENTITY_TTL:
+        del _identities[owner]
+        return None
+    return data
+
+
+def known_expired(owner: str) -> bool:
+    data = cached_identity(owner) if owner else None
+    return data is not None and data.get("isLogin") is False
+
+
+def forget(owner: str) -> None:
+    _identities.pop(owner, None)
+
+
+def reset_for_tests() -> None:
+    _identities.clear()
+
+
+async def fetch_nav(client: BiliApiClient) -> dict[str, Any]:
+    """Call /nav once and feed the identity and WBI key caches.
+
+    A logged-out answer (-101) is returned rather than raised: it still
+    carries the WBI keys, and ``isLogin`` is false.
+    """
+    logged_in = True
+    try:
+        payload = await client.get(NAV_URL)
+    except BiliApiError as exc:
+        if exc.code != NOT_LOGGED_IN:
+            raise
+        payload = exc.data
+        logged_in = False
+    data = payload.get("data") if isinstance(payload, dict) else None
+    if not isinstance(data, dict):
+        data = {}
+    keys = wbi.keys_from_nav(data)
+    if keys is not None:
+        wbi.store_keys(keys)
+    if not logged_in:
+        data = {**data, "isLogin": False}
+    _remember(client.owner, data)
+    return data
+
+
+async def get_nav(client: BiliApiClient) -> dict[str, Any]:
+    """Nav data for ``client``'s session, from cache when fresh."""
+    cached = cached_identity(client.owner) if client.owner else None
+    if cached is not None:
+        return cached
+    return await fetch_nav(client)
+
+
+async def require_session(client: BiliApiClient) -> dict[str, Any]:
+    """Nav data for a logged-in session; raise :class:`SessionExpiredError` otherwise."""
+    data = await get_nav(client)
+    if data.get("isLogin") is False:
+        raise SessionExpiredError()
+    return data
@@ -1,19 +1,90 @@
 from __future__ import annotations
 
 import asyncio
+import contextvars
+import logging
 import time
 import weakref
+from collections import OrderedDict, deque
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+# Learned adaptive rates are remembered for this many owners after they go
+# idle, so a returning account does not have to climb back up from scratch.
+_MAX_REMEMBERED_RATES = 1024
+
+# Priority lanes, highest first. Someone looking at the UI should not queue
+# behind a long background clean, and deletes are the least urgent of all.
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+DESTRUCTIVE = "destructive"
+PRIORITIES = (INTERACTIVE, BACKGROUND, DESTRUCTIVE)
+
+# Share of tokens each lane gets while all of them are waiting.
+DEFAULT_WEIGHTS: dict[str, int] = {INTERACTIVE: 6, BACKGROUND: 3, DESTRUCTIVE: 1}
+
+_request_context: contextvars.ContextVar[str] = contextvars.ContextVar(
+    "bili_request_context", default=INTERACTIVE
+)
+
+
+@contextmanager
+def background_requests() -> Iterator[None]:
+    """Mark requests made in this context as background work."""
+    token = _request_context.set(BACKGROUND)
+    try:
+        yield
+    finally:
+        _request_context.reset(token)
+
+
+def request_priority(method: str) -> str:
+    """Lane for an outbound request: writes are destructive, reads inherit
+    the caller's context (interactive unless inside a background task)."""
+    if method.upper() not in ("GET", "HEAD"):
+        return DESTRUCTIVE
+    return _request_context.get()
+
+
+@dataclass(eq=False)
+class _Waiter:
+    future: asyncio.Future[None]
+    since: float
+    tokens: float
 
 
 class AsyncTokenBucket:
-    """Async token bucket rate limiter.
+    """Async token bucket rate limiter with priority lanes.
 
     A single bucket shared by all callers. ``acquire()`` blocks until a token
     is available, then consumes it. Default ``burst`` of 1 yields strict
     spacing of ``1/qps`` seconds between successive calls.
+
+    There is no lock: when nobody is queued and a token is there, acquiring
+    is a plain arithmetic check. Otherwise the caller parks a future in its
+    priority lane (O(1)) and a single dispatcher hands out tokens by smooth
+    weighted round-robin over the lanes that have waiters, so lower lanes
+    still progress under load. A waiter queued longer than
+    ``starvation_after`` seconds is served before anything else.
+
+    A grant is a reservation: ``acquire_many(n)`` may take more tokens than
+    the bucket holds, leaving it in debt that later callers wait out. A
+    waiter cancelled while queued costs nothing; one cancelled after its
+    grant refunds it.
     """
 
-    def __init__(self, qps: float, burst: int = 1) -> None:
+    def __init__(
+        self,
+        qps: float,
+        burst: int = 1,
+        *,
+        weights: dict[str, int] | None = None,
+        starvation_after: float = 30.0,
+    ) -> None:
         if qps <= 0:
             raise ValueError("qps must be positive")
         if burst < 1:
@@ -22,40 +93,405 @@ class AsyncTokenBucket:
         self._burst = burst
         self._tokens = float(burst)
         self._last = time.monotonic()
-        self._lock = asyncio.Lock()
-
-    async def acquire(self) -> None:
-        async with self._lock:
-            now = time.monotonic()
-            elapsed = now - self._last
-            self._tokens = min(float(self._burst), self._tokens + elapsed * self._qps)
-            self._last = now
-            if self._tokens < 1.0:
-                wait = (1.0 - self._tokens) / self._qps
-                await asyncio.sleep(wait)
-                now = time.monotonic()
-                elapsed = now - self._last
-                self._tokens = min(float(self._burst), self._tokens + elapsed * self._qps)
-                self._last = now
-            self._tokens -= 1.0
-
-
-_shared_buckets: weakref.WeakKeyDictionary[
-    asyncio.AbstractEventLoop, dict[tuple[float, int], AsyncTokenBucket]
+        self._weights = dict(weights or DEFAULT_WEIGHTS)
+        if set(self._weights) != set(PRIORITIES) or min(self._weights.values()) < 1:
+            raise ValueError("weights need a positive entry for every priority")
+        self._starvation_after = starvation_after
+        self._lanes: dict[str, deque[_Waiter]] = {p: deque() for p in PRIORITIES}
+        self._credit: dict[str, int] = dict.fromkeys(PRIORITIES, 0)
+        self._dispatcher: asyncio.Task[None] | None = None
+        self._wake: asyncio.Future[None] | None = None
+
+    @property
+    def rate(self) -> float:
+        return self._qps
+
+    def set_rate(self, qps: float) -> None:
+        """Change the refill rate. Tokens accrued so far are kept."""
+        if qps <= 0:
+            raise ValueError("qps must be positive")
+        self._refill(time.monotonic())
+        self._qps = float(qps)
+        self._poke()
+
+    def queued(self) -> dict[str, int]:
+        """Waiters per lane, cancelled ones included until they are skipped."""
+        return {p: len(lane) for p, lane in self._lanes.items()}
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._last
+        self._tokens = min(float(self._burst), self._tokens + elapsed * self._qps)
+        self._last = now
+
+    def _grantable(self, tokens: float) -> bool:
+        # Asking for more than the burst can never be satisfied in full, so a
+        # full bucket is enough; the rest is borrowed from future refills.
+        return self._tokens >= min(tokens, float(self._burst))
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        """Take ``tokens`` now if possible, without waiting or queue-jumping."""
+        if self._prune():
+            return False
+        self._refill(time.monotonic())
+        if not self._grantable(tokens):
+            return False
+        self._tokens -= tokens
+        return True
+
+    async def acquire(self, priority: str = INTERACTIVE) -> None:
+        await self.acquire_many(1, priority)
+
+    async def acquire_many(self, tokens: float, priority: str = INTERACTIVE) -> None:
+        """Wait for and take ``tokens`` tokens as a single reservation."""
+        if tokens <= 0:
+            raise ValueError("tokens must be positive")
+        lane = self._lanes[priority]
+        if self.try_acquire(tokens):
+            return
+        waiter = _Waiter(asyncio.get_running_loop().create_future(), time.monotonic(), tokens)
+        lane.append(waiter)
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch())
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if not waiter.future.cancelled():
+                # Granted, then cancelled before we could use it.
+                self.refund(tokens)
+            raise
+
+    def refund(self, tokens: float = 1.0) -> None:
+        """Give back tokens that were taken but never used."""
+        self._refill(time.monotonic())
+        self._tokens = min(float(self._burst), self._tokens + tokens)
+        self._poke()
+
+    async def _dispatch(self) -> None:
+        while self._prune():
+            self._refill(time.monotonic())
+            head = self._pick(peek=True)
+            if not self._grantable(head.tokens):
+                # Re-check after every sleep: the rate may have changed or a
+                # refund arrived while we waited.
+                needed = min(head.tokens, float(self._burst)) - self._tokens
+                await self._sleep(needed / self._qps)
+                continue
+            waiter = self._pick()
+            self._tokens -= waiter.tokens
+            waiter.future.set_result(None)
+
+    async def _sleep(self, delay: float) -> None:
+        loop = asyncio.get_running_loop()
+        wake = loop.create_future()
+        self._wake = wake
+        handle = loop.call_later(delay, _resolve, wake)
+        try:
+            await wake
+        finally:
+            handle.cancel()
+            self._wake = None
+
+    def _poke(self) -> None:
+        """Cut the dispatcher's sleep short; something changed."""
+        if self._wake is not None:
+            _resolve(self._wake)
+
+    def _prune(self) -> bool:
+        """Drop waiters cancelled while queued; True if anyone is left."""
+        alive = False
+        for lane in self._lanes.values():
+            while lane and lane[0].future.done():
+                lane.popleft()
+            alive = alive or bool(lane)
+        return alive
+
+    def _pick(self, *, peek: bool = False) -> _Waiter:
+        heads = {p: lane[0] for p, lane in self._lanes.items() if lane}
+        oldest = min(heads, key=lambda p: heads[p].since)
+        if time.monotonic() - heads[oldest].since >= self._starvation_after:
+            chosen = oldest
+        else:
+            credit = dict(self._credit)
+            for priority in PRIORITIES:
+                if priority in heads:
+                    credit[priority] += self._weights[priority]
+                else:
+                    # Lanes without waiters do not bank credit for later.
+                    credit[priority] = 0
+            chosen = max(heads, key=lambda p: credit[p])
+            if not peek:
+                credit[chosen] -= sum(self._weights[p] for p in heads)
+                self._credit = credit
+        if peek:
+            return heads[chosen]
+        return self._lanes[chosen].popleft()
+
+
+def _resolve(future: asyncio.Future[None]) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+def fair_shares(caps: dict[str, float], total: float) -> dict[str, float]:
+    """Max-min fair split of ``total`` among owners capped at ``caps``.
+
+    Owners whose cap is below an equal share keep their cap; what they leave
+    unused is split evenly among the rest.
+    """
+    shares: dict[str, float] = {}
+    remaining = total
+    ordered = sorted(caps.items(), key=lambda item: item[1])
+    for index, (owner, cap) in enumerate(ordered):
+        share = min(cap, remaining / (len(ordered) - index))
+        shares[owner] = share
+        remaining -= share
+    return shares
+
+
+@dataclass(frozen=True)
+class AdaptiveBounds:
+    """AIMD parameters for :class:`RateLimiter`.
+
+    After ``window`` consecutive clean responses an owner's rate grows by
+    ``increase`` r/s; a risk-control response multiplies it by ``decrease``.
+    Cuts are applied at most once per ``hold`` seconds, because the requests
+    already in flight when risk control fires tend to fail together and would
+    otherwise collapse the rate to the floor in one burst.
+    """
+
+    min_qps: float
+    max_qps: float
+    increase: float = 0.1
+    decrease: float = 0.5
+    window: int = 20
+    hold: float = 5.0
+
+    def __post_init__(self) -> None:
+        if not 0 < self.min_qps <= self.max_qps:
+            raise ValueError("adaptive bounds need 0 < min_qps <= max_qps")
+        if not 0 < self.decrease < 1:
+            raise ValueError("decrease must be between 0 and 1")
+
+    def clamp(self, qps: float) -> float:
+        return min(self.max_qps, max(self.min_qps, qps))
+
+
+@dataclass
+class _OwnerState:
+    bucket: AsyncTokenBucket
+    cap: float
+    last_seen: float
+    waiting: int = 0
+    clean: int = 0
+    last_cut: float = float("-inf")
+
+
+class RateLimiter:
+    """Per-owner token buckets nested under a process-wide ceiling.
+
+    B 站's risk control is applied per account and per IP, so one bucket for
+    the whole process made ten concurrent accounts split a single account's
+    budget. Here each owner (``owner_key``) gets up to ``qps``; when the
+    owners active in the last ``active_window`` seconds would together exceed
+    ``global_qps``, their buckets are slowed to a max-min fair share of it.
+    The global bucket then only enforces the ceiling as a backstop.
+
+    Both layers serve waiters by priority lane (see :class:`AsyncTokenBucket`),
+    so an account's interactive reads overtake its own background clean.
+
+    With ``adaptive`` set, each owner's cap is no longer fixed at ``qps``: it
+    starts there and is steered by :meth:`record_success` /
+    :meth:`record_risk` (additive increase, multiplicative decrease) within
+    the given bounds.
+    """
+
+    def __init__(
+        self,
+        qps: float,
+        global_qps: float | None = None,
+        *,
+        burst: int = 1,
+        active_window: float = 10.0,
+        adaptive: AdaptiveBounds | None = None,
+    ) -> None:
+        if qps <= 0:
+            raise ValueError("qps must be positive")
+        if global_qps is not None and global_qps <= 0:
+            raise ValueError("global_qps must be positive")
+        self._qps = float(qps)
+        self._global_qps = float(global_qps) if global_qps is not None else None
+        self._burst = burst
+        self._active_window = active_window
+        self._adaptive = adaptive
+        self._owners: dict[str, _OwnerState] = {}
+        self._learned: OrderedDict[str, float] = OrderedDict()
+        self._global = (
+            AsyncTokenBucket(qps=self._global_qps, burst=burst)
+            if self._global_qps is not None
+            else None
+        )
+
+    async def acquire(self, owner: str = "", *, priority: str = INTERACTIVE) -> None:
+        state = self._enter(owner)
+        state.waiting += 1
+        try:
+            await state.bucket.acquire(priority)
+        finally:
+            state.waiting -= 1
+            state.last_seen = time.monotonic()
+        if self._global is not None:
+            try:
+                await self._global.acquire(priority)
+            except asyncio.CancelledError:
+                state.bucket.refund()
+                raise
+
+    def try_acquire(self, owner: str = "") -> bool:
+        """Take a token for ``owner`` only if one is available right now."""
+        state = self._enter(owner)
+        if not state.bucket.try_acquire():
+            return False
+        if self._global is not None and not self._global.try_acquire():
+            state.bucket.refund()
+            return False
+        return True
+
+    def _enter(self, owner: str) -> _OwnerState:
+        now = time.monotonic()
+        state = self._owners.get(owner)
+        if state is None:
+            cap = self._initial_cap(owner)
+            state = _OwnerState(
+                bucket=AsyncTokenBucket(qps=cap, burst=self._burst),
+                cap=cap,
+                last_seen=now,
+            )
+            self._owners[owner] = state
+        state.last_seen = now
+        self._rebalance(now)
+        return state
+
+    def _initial_cap(self, owner: str) -> float:
+        if self._adaptive is None:
+            return self._qps
+        return self._adaptive.clamp(self._learned.get(owner, self._qps))
+
+    def record_success(self, owner: str = "") -> None:
+        """Count a clean response; raise the owner's rate after a streak."""
+        state = self._owners.get(owner)
+        if self._adaptive is None or state is None:
+            return
+        state.clean += 1
+        if state.clean < self._adaptive.window:
+            return
+        state.clean = 0
+        self._set_cap(owner, state, state.cap + self._adaptive.increase, "clean streak")
+
+    def record_risk(self, owner: str = "") -> None:
+        """Risk control fired for this owner: cut its rate."""
+        state = self._owners.get(owner)
+        if self._adaptive is None or state is None:
+            return
+        state.clean = 0
+        now = time.monotonic()
+        if now - state.last_cut < self._adaptive.hold:
+            return
+        state.last_cut = now
+        self._set_cap(owner, state, state.cap * self._adaptive.decrease, "risk control")
+
+    def _set_cap(self, owner: str, state: _OwnerState, cap: float, reason: str) -> None:
+        assert self._adaptive is not None
+        cap = self._adaptive.clamp(cap)
+        if cap == state.cap:
+            return
+        logger.info(
+            "Adaptive rate for owner %s: %.2f -> %.2f r/s (%s)",
+            owner[:8] or "anonymous",
+            state.cap,
+            cap,
+            reason,
+        )
+        state.cap = cap
+        self._learned[owner] = cap
+        self._learned.move_to_end(owner)
+        while len(self._learned) > _MAX_REMEMBERED_RATES:
+            self._learned.popitem(last=False)
+        self._rebalance(time.monotonic())
+
+    def _is_active(self, state: _OwnerState, now: float) -> bool:
+        return state.waiting > 0 or now - state.last_seen <= self._active_window
+
+    def _rebalance(self, now: float) -> None:
+        active = frozenset(
+            owner for owner, state in self._owners.items() if self._is_active(state, now)
+        )
+        # Idle owners hold nothing worth keeping; a returning owner starts a
+        # fresh bucket, which with the default burst of 1 is the same thing.
+        for owner in [o for o in self._owners if o not in active]:
+            del self._owners[owner]
+        caps = {owner: self._owners[owner].cap for owner in active}
+        shares = (
+            fair_shares(caps, self._global_qps) if self._global_qps is not None else caps
+        )
+        for owner, share in shares.items():
+            bucket = self._owners[owner].bucket
+            if bucket.rate != share:
+                bucket.set_rate(share)
+
+    def snapshot(self) -> dict[str, Any]:
+        now = time.monotonic()
+        active = [s for s in self._owners.values() if self._is_active(s, now)]
+        adaptive = self._adaptive
+        buckets = [s.bucket for s in active]
+        if self._global is not None:
+            buckets.append(self._global)
+        queued = dict.fromkeys(PRIORITIES, 0)
+        for bucket in buckets:
+            for priority, count in bucket.queued().items():
+                queued[priority] += count
+        return {
+            "per_owner_qps": self._qps,
+            "global_qps": self._global_qps,
+            "adaptive": (
+                {"min_qps": adaptive.min_qps, "max_qps": adaptive.max_qps}
+                if adaptive is not None
+                else None
+            ),
+            "active_owners": len(active),
+            "effective_qps": sorted(round(s.bucket.rate, 3) for s in active),
+            "queued": queued,
+        }
+
+
+_LimiterKey = tuple[float, float | None, int, AdaptiveBounds | None]
+
+_shared_limiters: weakref.WeakKeyDictionary[
+    asyncio.AbstractEventLoop, dict[_LimiterKey, RateLimiter]
 ] = weakref.WeakKeyDictionary()
 
 
-def get_shared_bucket(qps: float, burst: int = 1) -> AsyncTokenBucket:
-    """Return a process-local bucket shared by clients on the same event loop."""
+def get_shared_limiter(
+    qps: float,
+    global_qps: float | None = None,
+    burst: int = 1,
+    *,
+    adaptive: AdaptiveBounds | None = None,
+) -> RateLimiter:
+    """Return the limiter shared by clients on the same event loop."""
     loop = asyncio.get_running_loop()
-    buckets = _shared_buckets.get(loop)
-    if buckets is None:
-        buckets = {}
-        _shared_buckets[loop] = buckets
-
-    key = (float(qps), int(burst))
-    bucket = buckets.get(key)
-    if bucket is None:
-        bucket = AsyncTokenBucket(qps=qps, burst=burst)
-        buckets[key] = bucket
-    return bucket
+    limiters = _shared_limiters.get(loop)
+    if limiters is None:
+        limiters = {}
+        _shared_limiters[loop] = limiters
+
+    key = (
+        float(qps),
+        float(global_qps) if global_qps is not None else None,
+        int(burst),
+        adaptive,
+    )
+    limiter = limiters.get(key)
+    if limiter is None:
+        limiter = RateLimiter(qps, global_qps, burst=burst, adaptive=adaptive)
+        limiters[key] = limiter
+    return limiter
@@ -2,11 +2,16 @@ from __future__ import annotations
 
 from typing import Any
 
+from . import cache
+from .cache import CachePolicy
 from .client import BiliApiClient
 
 FOLLOWINGS_URL = "https://api.bilibili.com/x/relation/followings"
 MODIFY_URL = "https://api.bilibili.com/x/relation/modify"
 RELATION_URL = "https://api.bilibili.com/x/relation"
+RELATION_STAT_URL = "https://api.bilibili.com/x/relation/stat"
+
+FOLLOWINGS_CACHE = CachePolicy(ttl=30.0, stale=120.0)
 
 
 class RelationApi:
@@ -21,15 +26,19 @@ class RelationApi:
         order: str = "desc",
         order_type: str = "attention",
     ) -> dict[str, Any]:
-        payload = await self._client.get(
+        params = {
+            "vmid": mid,
+            "pn": pn,
+            "ps": ps,
+            "order": order,
+            "order_type": order_type,
+        }
+        payload = await cache.cached_get(
+            self._client,
             FOLLOWINGS_URL,
-            params={
-                "vmid": mid,
-                "pn": pn,
-                "ps": ps,
-                "order": order,
-                "order_type": order_type,
-            },
+            params,
+            FOLLOWINGS_CACHE,
+            lambda: self._client.get(FOLLOWINGS_URL, params=params),
         )
         data = payload.get("data") if isinstance(payload, dict) else None
         return data if isinstance(data, dict) else {}
@@ -41,11 +50,16 @@ class RelationApi:
         return await self._modify(mid, act=1)
 
     async def _modify(self, mid: int, *, act: int) -> dict[str, Any]:
-        payload = await self._client.post(
-            MODIFY_URL,
-            data={"fid": mid, "act": act, "re_src": 11},
-            include_csrf=True,
-        )
+        try:
+            payload = await self._client.post(
+                MODIFY_URL,
+                data={"fid": mid, "act": act, "re_src": 11},
+                include_csrf=True,
+            )
+        finally:
+            # Even a failed write may have landed upstream.
+            cache.invalidate(self._client, FOLLOWINGS_URL)
+            cache.invalidate(self._client, RELATION_STAT_URL, vmid=mid)
         data = payload.get("data") if isinstance(payload, dict) else None
         return data if isinstance(data, dict) else {}
 
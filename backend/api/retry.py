@@ -18,6 +18,17 @@ def is_risk_control_error(exc: BiliApiError) -> bool:
     return False
 
 
+def is_transient_error(exc: BiliApiError) -> bool:
+    """Return True for a dropped request: a transport failure or an HTTP 5xx.
+
+    These carry no B 站 business code, so asking again may well succeed.
+    Risk control is not transient in this sense; the client handles it.
+    """
+    if exc.code is not None:
+        return False
+    return exc.status_code is None or exc.status_code >= 500
+
+
 def compute_backoff(attempt: int, base: float, cap: float = 30.0) -> float:
     """Exponential backoff with full jitter, capped at ``cap`` seconds."""
     expo = min(cap, base * (2 ** attempt))
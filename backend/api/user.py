@@ -2,12 +2,18 @@ from __future__ import annotations
 
 from typing import Any
 
+from .cache import CachePolicy, cached_get
 from .client import BiliApiClient
+from .relation import RELATION_STAT_URL
 from .wbi import signed_get
 
 ACC_INFO_URL = "https://api.bilibili.com/x/space/wbi/acc/info"
 ARC_SEARCH_URL = "https://api.bilibili.com/x/space/wbi/arc/search"
-RELATION_STAT_URL = "https://api.bilibili.com/x/relation/stat"
+
+# Public profile data changes slowly; a few minutes of staleness is harmless.
+INFO_CACHE = CachePolicy(ttl=300.0, stale=600.0)
+STAT_CACHE = CachePolicy(ttl=120.0, stale=300.0)
+VIDEOS_CACHE = CachePolicy(ttl=300.0, stale=600.0)
 
 
 class UserApi:
@@ -19,12 +25,25 @@ class UserApi:
     async def get_info(self, mid: int) -> dict[str, Any]:
         params = {"mid": mid, "token": "", "platform": "web", "web_location": "1550101"}
         headers = {"Referer": f"https://space.bilibili.com/{mid}"}
-        payload = await signed_get(self._client, ACC_INFO_URL, params, headers=headers)
+        payload = await cached_get(
+            self._client,
+            ACC_INFO_URL,
+            params,
+            INFO_CACHE,
+            lambda: signed_get(self._client, ACC_INFO_URL, params, headers=headers),
+        )
         data = payload.get("data") if isinstance(payload, dict) else None
         return data if isinstance(data, dict) else {}
 
     async def get_stat(self, mid: int) -> dict[str, Any]:
-        payload = await self._client.get(RELATION_STAT_URL, params={"vmid": mid})
+        params = {"vmid": mid}
+        payload = await cached_get(
+            self._client,
+            RELATION_STAT_URL,
+            params,
+            STAT_CACHE,
+            lambda: self._client.get(RELATION_STAT_URL, params=params),
+        )
         data = payload.get("data") if isinstance(payload, dict) else None
         return data if isinstance(data, dict) else {}
 
@@ -49,6 +68,12 @@ class UserApi:
             "web_location": "1550101",
         }
         headers = {"Referer": f"https://space.bilibili.com/{mid}/video"}
-        payload = await signed_get(self._client, ARC_SEARCH_URL, params, headers=headers)
+        payload = await cached_get(
+            self._client,
+            ARC_SEARCH_URL,
+            params,
+            VIDEOS_CACHE,
+            lambda: signed_get(self._client, ARC_SEARCH_URL, params, headers=headers),
+        )
         data = payload.get("data") if isinstance(payload, dict) else None
         return data if isinstance(data, dict) else {}
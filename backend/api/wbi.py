@@ -1,10 +1,18 @@
 from __future__ import annotations
 
+import asyncio
 import hashlib
+import json
 import logging
+import os
 import time
 import urllib.parse
-from collections.abc import Mapping
+import weakref
+from collections.abc import Callable, Mapping
+from contextlib import AbstractAsyncContextManager, asynccontextmanager
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
 from typing import Any
 
 from .client import BiliApiClient, BiliApiError
@@ -18,28 +26,257 @@ NAV_URL = "https://api.bilibili.com/x/web-interface/nav"
 # cache every signed call pays for an extra /nav request — doubling the
 # requests charged against the shared rate limit and against risk control.
 _WBI_CACHE_TTL = 3600.0
-_cached_keys: tuple[str, str] | None = None
-_cached_at: float = 0.0
+# The background refresher renews the keys this long before they expire, so
+# signing never waits on /nav.
+_REFRESH_MARGIN = 300.0
+_RETRY_DELAY = 60.0
+
+
+@dataclass(frozen=True)
+class _Keys:
+    img_key: str
+    sub_key: str
+    # Wall-clock, so the on-disk copy can be aged by another process.
+    fetched_at: float
+
+    @property
+    def pair(self) -> tuple[str, str]:
+        return self.img_key, self.sub_key
+
+    def is_fresh(self) -> bool:
+        return 0 <= time.time() - self.fetched_at <= _WBI_CACHE_TTL
+
+
+OpenClient = Callable[[], AbstractAsyncContextManager[BiliApiClient]]
+
+_cached: _Keys | None = None
+_disk_path: Path | None = None
+# mtime of the key file as last read or written here; an unchanged file is
+# not read again.
+_disk_mtime: float | None = None
+# The keys on disk were rejected upstream; the next refresh removes the file.
+_disk_rejected = False
+# In-flight background writes, held so they are not garbage collected.
+_disk_writes: set[asyncio.Task[None]] = set()
+_refreshing: weakref.WeakKeyDictionary[
+    asyncio.AbstractEventLoop, asyncio.Task[tuple[str, str]]
+] = weakref.WeakKeyDictionary()
+
+
+def configure_disk_cache(path: str | Path | None) -> None:
+    """Persist keys at ``path`` so CLI runs and restarts skip the /nav call.
+
+    Each CLI command is a new process, and without this every one of them
+    fetched the keys again before its first signed request. The file is
+    only touched from worker threads (see :func:`_refresh`), never on the
+    signing path.
+    """
+    global _disk_path, _disk_mtime, _disk_rejected
+    _disk_path = Path(path).expanduser() if path else None
+    _disk_mtime = None
+    _disk_rejected = False
+
+
+def _load_from_disk() -> _Keys | None:
+    """The keys on disk, or None if missing, unreadable or unchanged since
+    they were last read or written here. Blocking; run it in a thread."""
+    global _disk_mtime
+    if _disk_path is None:
+        return None
+    try:
+        mtime = _disk_path.stat().st_mtime
+        if mtime == _disk_mtime:
+            return None
+        raw = json.loads(_disk_path.read_text(encoding="utf-8"))
+        _disk_mtime = mtime
+        return _Keys(str(raw["img_key"]), str(raw["sub_key"]), float(raw["fetched_at"]))
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, KeyError, TypeError) as exc:
+        logger.warning("Ignoring unreadable WBI key cache %s: %s", _disk_path, exc)
+        return None
+
+
+def _save_to_disk(keys: _Keys) -> None:
+    """Blocking; run it in a thread."""
+    global _disk_mtime
+    if _disk_path is None:
+        return
+    body = {"img_key": keys.img_key, "sub_key": keys.sub_key, "fetched_at": keys.fetched_at}
+    # Write-then-rename: a CLI run and the server may refresh at the same time.
+    tmp = _disk_path.with_name(f"{_disk_path.name}.{os.getpid()}.tmp")
+    try:
+        _disk_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp.write_text(json.dumps(body), encoding="utf-8")
+        os.replace(tmp, _disk_path)
+        _disk_mtime = _disk_path.stat().st_mtime
+    except OSError as exc:
+        logger.warning("Could not write WBI key cache %s: %s", _disk_path, exc)
+
+
+def _remove_from_disk() -> None:
+    """Blocking; run it in a thread."""
+    global _disk_mtime
+    if _disk_path is None:
+        return
+    try:
+        _disk_path.unlink(missing_ok=True)
+        _disk_mtime = None
+    except OSError as exc:
+        logger.warning("Could not remove WBI key cache %s: %s", _disk_path, exc)
+
+
+async def _sync_with_disk() -> bool:
+    """Adopt newer keys another process left on disk, or drop rejected ones.
+
+    Returns whether keys were adopted.
+    """
+    global _cached, _disk_rejected
+    if _disk_path is None:
+        return False
+    if _disk_rejected:
+        _disk_rejected = False
+        await asyncio.to_thread(_remove_from_disk)
+        return False
+    on_disk = await asyncio.to_thread(_load_from_disk)
+    if on_disk is None or (_cached is not None and on_disk.fetched_at <= _cached.fetched_at):
+        return False
+    _cached = on_disk
+    return True
+
+
+def _current() -> _Keys | None:
+    """The newest keys known to this process, fresh or not."""
+    return _cached
 
 
 def cached_keys() -> tuple[str, str] | None:
     """Return the process-wide keys if they are still fresh."""
-    if _cached_keys is None:
+    keys = _current()
+    if keys is None or not keys.is_fresh():
         return None
-    if time.monotonic() - _cached_at > _WBI_CACHE_TTL:
-        return None
-    return _cached_keys
+    return keys.pair
 
 
 def store_keys(keys: tuple[str, str]) -> None:
-    global _cached_keys, _cached_at
-    _cached_keys = keys
-    _cached_at = time.monotonic()
+    """Remember ``keys``; the disk copy is written from a worker thread."""
+    global _cached
+    _cached = _Keys(keys[0], keys[1], time.time())
+    if _disk_path is None:
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        _save_to_disk(_cached)
+        return
+    task = loop.create_task(asyncio.to_thread(_save_to_disk, _cached))
+    _disk_writes.add(task)
+    task.add_done_callback(_disk_writes.discard)
 
 
 def invalidate_cache() -> None:
-    global _cached_keys
-    _cached_keys = None
+    """Forget the keys; they were rejected upstream.
+
+    The copy on disk is removed by the next refresh rather than here, which
+    runs on the signing path.
+    """
+    global _cached, _disk_rejected
+    _cached = None
+    _disk_rejected = _disk_path is not None
+
+
+@asynccontextmanager
+async def _anonymous_client():  # type: ignore[no-untyped-def]
+    async with BiliApiClient() as client:
+        yield client
+
+
+_open_refresh_client: OpenClient = _anonymous_client
+
+
+def configure_refresh_client(open_client: OpenClient | None) -> None:
+    """Use ``open_client`` for refreshes (anonymous is fine, the keys are global).
+
+    The server passes its pooled, rate-limited client factory; by default a
+    refresh opens a plain anonymous client of its own.
+    """
+    global _open_refresh_client
+    _open_refresh_client = open_client or _anonymous_client
+
+
+async def _refresh(open_client: OpenClient) -> tuple[str, str]:
+    # The task outlives whichever caller started it (it is shielded, and may
+    # run in the background), so it opens and closes a client of its own
+    # rather than borrow one that may be closed under it.
+    if await _sync_with_disk() and _cached is not None and _cached.is_fresh():
+        # Another process (or an earlier run) refreshed them already.
+        return _cached.pair
+    async with open_client() as client:
+        # fetch_wbi_keys stores what it fetched.
+        return await fetch_wbi_keys(client)
+
+
+def _start_refresh(open_client: OpenClient | None = None) -> asyncio.Task[tuple[str, str]]:
+    loop = asyncio.get_running_loop()
+    task = _refreshing.get(loop)
+    if task is None or task.done():
+        task = loop.create_task(_refresh(open_client or _open_refresh_client))
+        task.add_done_callback(_log_refresh_failure)
+        _refreshing[loop] = task
+    return task
+
+
+async def refresh_keys(open_client: OpenClient | None = None) -> tuple[str, str]:
+    """Fetch and store new keys; concurrent callers share one /nav request."""
+    # Shielded: one caller being cancelled must not fail the others.
+    return await asyncio.shield(_start_refresh(open_client))
+
+
+async def get_keys() -> tuple[str, str]:
+    """Keys for signing, waiting on /nav only when there are none at all.
+
+    Expired keys are still served (a rotation is daily, the TTL an hour) while
+    a refresh runs in the background; ``signed_get`` refreshes and retries if
+    B 站 rejects them.
+    """
+    keys = _current()
+    if keys is None:
+        return await refresh_keys()
+    if not keys.is_fresh():
+        _start_refresh()
+    return keys.pair
+
+
+def _log_refresh_failure(task: asyncio.Task[tuple[str, str]]) -> None:
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning("WBI key refresh failed: %s", task.exception())
+
+
+async def keep_fresh(open_client: OpenClient) -> None:
+    """Refresh the keys shortly before they expire, forever.
+
+    Runs for the lifetime of the server; ``open_client`` supplies a client for
+    each refresh (anonymous is fine, /nav returns the keys either way). No
+    failure ends the loop: it is logged and the refresh retried.
+    """
+    while True:
+        keys = _current()
+        delay = 0.0
+        if keys is not None:
+            expires_at = keys.fetched_at + _WBI_CACHE_TTL
+            delay = max(0.0, expires_at - _REFRESH_MARGIN - time.time())
+        await asyncio.sleep(delay)
+        try:
+            await refresh_keys(open_client)
+        except BiliApiError as exc:
+            logger.warning("WBI key refresh failed, retrying in %.0fs: %s", _RETRY_DELAY, exc)
+            await asyncio.sleep(_RETRY_DELAY)
+        except Exception:
+            # Anything else (a failed write of the key cache, a bug) would
+            # otherwise end this lifetime loop without a trace.
+            logger.exception("WBI key refresh crashed, retrying in %.0fs", _RETRY_DELAY)
+            await asyncio.sleep(_RETRY_DELAY)
+
 
 _MIXIN_KEY_ENC_TAB = [
     46, 47, 18, 2, 53, 8, 23, 32, 15, 50, 10, 31, 58, 3, 45, 35,
@@ -54,24 +291,36 @@ def _extract_key(url: str) -> str:
     return name.rsplit(".", 1)[0]
 
 
+@lru_cache(maxsize=8)
 def _mixin_key(img_key: str, sub_key: str) -> str:
+    # Computed once per key rotation rather than on every signed request.
     raw = img_key + sub_key
     return "".join(raw[i] for i in _MIXIN_KEY_ENC_TAB if i < len(raw))[:32]
 
 
-async def fetch_wbi_keys(client: BiliApiClient) -> tuple[str, str]:
-    payload = await client.get(NAV_URL)
-    data = payload.get("data") if isinstance(payload, dict) else None
-    wbi = data.get("wbi_img") if isinstance(data, Mapping) else None
+def keys_from_nav(data: Mapping[str, Any]) -> tuple[str, str] | None:
+    """Extract ``(img_key, sub_key)`` from a /nav ``data`` object."""
+    wbi = data.get("wbi_img")
     if not isinstance(wbi, Mapping):
-        raise BiliApiError("Missing wbi_img in nav response", data=payload)
+        return None
     img_url = wbi.get("img_url")
     sub_url = wbi.get("sub_url")
     if not img_url or not sub_url:
-        raise BiliApiError("Missing wbi urls", data=payload)
+        return None
     return _extract_key(str(img_url)), _extract_key(str(sub_url))
 
 
+async def fetch_wbi_keys(client: BiliApiClient) -> tuple[str, str]:
+    """Fetch keys via /nav, which also refreshes the caller's identity cache."""
+    from .nav import fetch_nav
+
+    data = await fetch_nav(client)
+    keys = keys_from_nav(data)
+    if keys is None:
+        raise BiliApiError("Missing wbi_img in nav response", data=data)
+    return keys
+
+
 def sign_params(params: Mapping[str, Any], img_key: str, sub_key: str) -> dict[str, Any]:
     mixin = _mixin_key(img_key, sub_key)
     wts = int(time.time())
@@ -3,13 +3,15 @@ from __future__ import annotations
 import asyncio
 import json
 import sys
-from collections.abc import AsyncIterator, Awaitable
+from collections.abc import AsyncIterable, AsyncIterator, Awaitable
 from contextlib import asynccontextmanager
 from typing import Any, TypeVar
 
 import typer
 
-from backend.api import BiliApiClient
+from backend.api import BiliApiClient, wbi
+from backend.services import profile_cache
+from backend.settings import settings
 
 from . import credentials
 
@@ -33,6 +35,9 @@ def require_credentials() -> credentials.Credentials:
 @asynccontextmanager
 async def make_client(qps: float | None = DEFAULT_QPS) -> AsyncIterator[BiliApiClient]:
     creds = require_credentials()
+    # Shared with the server, so a CLI run reuses keys it already fetched.
+    wbi.configure_disk_cache(settings.wbi_cache_path)
+    profile_cache.configure_from_settings(settings)
     async with BiliApiClient(
         sessdata=creds.sessdata,
         bili_jct=creds.bili_jct,
@@ -45,6 +50,16 @@ def run_async(coro: Awaitable[T]) -> T:
     return asyncio.run(coro)
 
 
+def require_criteria(predicate: Any, options: str) -> None:
+    """Exit with code 1 unless ``predicate`` (a service filter) sets a criterion.
+
+    An empty filter matches nothing, so running the clean would only burn
+    requests; ``options`` names the flags that would have set one."""
+    if predicate.empty:
+        typer.echo(f"Give at least one of {options}.", err=True)
+        raise typer.Exit(code=1)
+
+
 def emit(obj: Any, *, json_output: bool = True) -> None:
     """Print ``obj`` as JSON (default) for machine consumers, or as a pretty
     repr if ``json_output=False``. AI agents should leave the default on."""
@@ -53,3 +68,27 @@ def emit(obj: Any, *, json_output: bool = True) -> None:
         sys.stdout.write("\n")
     else:
         typer.echo(repr(obj))
+
+
+async def emit_stream(items: AsyncIterable[Any], *, json_output: bool = True) -> None:
+    """Like :func:`emit` for a list, but print each element as it arrives.
+
+    The elements are formatted exactly as ``emit`` formats a list of them;
+    consumers just see them sooner, and the caller never has to hold the
+    whole list. If ``items`` raises part-way, the array printed so far is
+    closed before the error propagates, so stdout is still valid JSON."""
+    count = 0
+    try:
+        async for obj in items:
+            if not json_output:
+                typer.echo(repr(obj))
+                continue
+            body = json.dumps(obj, ensure_ascii=False, indent=2, default=str)
+            sys.stdout.write("[\n" if count == 0 else ",\n")
+            sys.stdout.write("\n".join("  " + line for line in body.splitlines()))
+            sys.stdout.flush()
+            count += 1
+    finally:
+        if json_output:
+            sys.stdout.write("\n]\n" if count else "[]\n")
+            sys.stdout.flush()
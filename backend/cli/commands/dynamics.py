@@ -1,11 +1,14 @@
 from __future__ import annotations
 
+from datetime import datetime
+
 import typer
 
 from backend.services import DynamicService
+from backend.services.dynamic import DynamicFilter, dynamic_type
 
 from .. import credentials
-from .._runtime import emit, make_client, run_async
+from .._runtime import emit, make_client, require_criteria, run_async
 
 app = typer.Typer(help="Inspect and selectively delete dynamics.")
 
@@ -68,3 +71,48 @@ def clear(
         emit(result, json_output=json_output)
 
     run_async(run())
+
+
+@app.command()
+def clean(
+    mid: int | None = typer.Option(None),
+    type_: list[str] = typer.Option(
+        [], "--type", help="forward, av, draw, word, article, ... (repeatable)."
+    ),
+    after: datetime | None = typer.Option(
+        None, formats=["%Y-%m-%d"], help="Published on or after this date."
+    ),
+    before: datetime | None = typer.Option(
+        None, formats=["%Y-%m-%d"], help="Published before this date."
+    ),
+    keyword: list[str] = typer.Option([], help="Text contains this (repeatable)."),
+    reposts: bool | None = typer.Option(
+        None, "--reposts/--originals", help="Only reposts, or only original dynamics."
+    ),
+    dry_run: bool = typer.Option(False, "--dry-run", help="List matches, delete nothing."),
+    yes: bool = typer.Option(False, "--yes", "-y"),
+    json_output: bool = typer.Option(True, "--json/--pretty"),
+) -> None:
+    """Delete dynamics matching every given criterion."""
+    predicate = DynamicFilter(
+        types=frozenset(dynamic_type(t) for t in type_ if t.strip()),
+        after=int(after.timestamp()) if after else None,
+        before=int(before.timestamp()) if before else None,
+        keywords=tuple(k for k in keyword if k),
+        reposts=reposts,
+    )
+    require_criteria(predicate, "--type/--after/--before/--keyword/--reposts/--originals")
+    real_mid = _resolve_mid(mid)
+    if not (yes or dry_run) and not typer.confirm(
+        f"Delete matching dynamics for mid={real_mid}?"
+    ):
+        raise typer.Abort()
+
+    async def run() -> None:
+        async with make_client() as client:
+            result = await DynamicService(client).clean_matching(
+                real_mid, predicate, dry_run=dry_run
+            )
+        emit(result, json_output=json_output)
+
+    run_async(run())
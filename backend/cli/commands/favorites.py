@@ -1,11 +1,15 @@
 from __future__ import annotations
 
+from contextlib import aclosing
+from datetime import datetime
+
 import typer
 
 from backend.services import FavoriteService
+from backend.services.favorite import FavoriteFilter
 
 from .. import credentials
-from .._runtime import emit, make_client, run_async
+from .._runtime import emit, emit_stream, make_client, require_criteria, run_async
 
 app = typer.Typer(help="Inspect and selectively delete favorites.")
 
@@ -56,6 +60,28 @@ def items(
     run_async(run())
 
 
+@app.command()
+def search(
+    keyword: str = typer.Argument(...),
+    mid: int | None = typer.Option(None),
+    limit: int | None = typer.Option(None, min=1, help="Stop after this many hits."),
+    concurrency: int = typer.Option(3, min=1, max=10),
+    json_output: bool = typer.Option(True, "--json/--pretty"),
+) -> None:
+    """Search every folder by keyword; hits are printed as they arrive."""
+    real_mid = _resolve_mid(mid)
+
+    async def run() -> None:
+        async with make_client() as client:
+            hits = FavoriteService(client).search(
+                real_mid, keyword, limit=limit, concurrency=concurrency
+            )
+            async with aclosing(hits):
+                await emit_stream(hits, json_output=json_output)
+
+    run_async(run())
+
+
 @app.command()
 def delete(
     media_id: int = typer.Argument(...),
@@ -75,17 +101,87 @@ def delete(
 @app.command()
 def clear(
     mid: int | None = typer.Option(None),
+    delete_folders: bool = typer.Option(
+        False,
+        "--delete-folders",
+        help="Delete non-default folders outright; only the default folder is emptied.",
+    ),
     yes: bool = typer.Option(False, "--yes", "-y"),
     json_output: bool = typer.Option(True, "--json/--pretty"),
 ) -> None:
     """Empty every favorite folder."""
     real_mid = _resolve_mid(mid)
-    if not yes and not typer.confirm(f"Delete ALL favorites for mid={real_mid}?"):
+    what = "favorite folders" if delete_folders else "favorites"
+    if not yes and not typer.confirm(f"Delete ALL {what} for mid={real_mid}?"):
+        raise typer.Abort()
+
+    async def run() -> None:
+        async with make_client() as client:
+            result = await FavoriteService(client).clear_all(
+                real_mid, delete_folders=delete_folders
+            )
+        emit(result, json_output=json_output)
+
+    run_async(run())
+
+
+@app.command()
+def clean(
+    mid: int | None = typer.Option(None),
+    invalid: bool = typer.Option(False, "--invalid", help="Deleted or taken-down videos."),
+    uploader: list[int] = typer.Option([], help="Uploaded by this UP (repeatable)."),
+    before: datetime | None = typer.Option(
+        None, formats=["%Y-%m-%d"], help="Favorited before this date."
+    ),
+    keyword: list[str] = typer.Option([], help="Title contains this (repeatable)."),
+    folder: list[int] = typer.Option([], help="Only scan this folder (repeatable)."),
+    dry_run: bool = typer.Option(False, "--dry-run", help="List matches, delete nothing."),
+    yes: bool = typer.Option(False, "--yes", "-y"),
+    json_output: bool = typer.Option(True, "--json/--pretty"),
+) -> None:
+    """Delete favorites matching every given criterion, across folders."""
+    predicate = FavoriteFilter(
+        invalid=invalid,
+        uploaders=frozenset(uploader),
+        favorited_before=int(before.timestamp()) if before else None,
+        keywords=tuple(k for k in keyword if k),
+    )
+    require_criteria(predicate, "--invalid/--uploader/--before/--keyword")
+    real_mid = _resolve_mid(mid)
+    if not (yes or dry_run) and not typer.confirm(
+        f"Delete matching favorites for mid={real_mid}?"
+    ):
+        raise typer.Abort()
+
+    async def run() -> None:
+        async with make_client() as client:
+            result = await FavoriteService(client).clean_matching(
+                real_mid, predicate, media_ids=folder or None, dry_run=dry_run
+            )
+        emit(result, json_output=json_output)
+
+    run_async(run())
+
+
+@app.command()
+def duplicates(
+    mid: int | None = typer.Option(None),
+    delete: bool = typer.Option(
+        False, "--delete", help="Keep the copy in the first folder, delete the others."
+    ),
+    yes: bool = typer.Option(False, "--yes", "-y"),
+    json_output: bool = typer.Option(True, "--json/--pretty"),
+) -> None:
+    """List videos saved in more than one folder."""
+    real_mid = _resolve_mid(mid)
+    if delete and not yes and not typer.confirm(
+        f"Delete duplicate favorites for mid={real_mid}?"
+    ):
         raise typer.Abort()
 
     async def run() -> None:
         async with make_client() as client:
-            result = await FavoriteService(client).clear_all(real_mid)
+            result = await FavoriteService(client).find_duplicates(real_mid, delete=delete)
         emit(result, json_output=json_output)
 
     run_async(run())
@@ -1,11 +1,15 @@
 from __future__ import annotations
 
+from collections.abc import AsyncIterator
+from contextlib import aclosing
+
 import typer
 
 from backend.services import FollowingService
+from backend.services.following import parse_detail_fields
 
 from .. import credentials
-from .._runtime import emit, make_client, run_async
+from .._runtime import emit, emit_stream, make_client, run_async
 
 app = typer.Typer(help="List / inspect / unfollow following accounts.")
 
@@ -23,6 +27,21 @@ def _resolve_mid(explicit: int | None) -> int:
     raise typer.Exit(code=1)
 
 
+def _fields(raw: str | None) -> tuple[str, ...]:
+    try:
+        return parse_detail_fields(raw)
+    except ValueError as exc:
+        raise typer.BadParameter(str(exc)) from exc
+
+
+FIELDS_OPTION = typer.Option(
+    None,
+    "--fields",
+    callback=_fields,
+    help="Comma-separated subset of info,stat,latest_video,video_count (default all).",
+)
+
+
 @app.command("list")
 def list_cmd(
     mid: int | None = typer.Option(
@@ -32,6 +51,7 @@ def list_cmd(
     page_size: int = typer.Option(50, min=1, max=50),
     with_detail: bool = typer.Option(False, help="Also fetch profile + latest video (slower)."),
     concurrency: int = typer.Option(3, min=1, max=10),
+    fields: str | None = FIELDS_OPTION,
     json_output: bool = typer.Option(True, "--json/--pretty"),
 ) -> None:
     """List one page of followings, optionally enriched with profile + stat + last video."""
@@ -44,14 +64,16 @@ def list_cmd(
             items = data.get("list") if isinstance(data, dict) else []
             items = [i for i in items if isinstance(i, dict)] if isinstance(items, list) else []
             if with_detail and items:
-                details = await service.enrich(
-                    [int(i["mid"]) for i in items if "mid" in i],
-                    concurrency=concurrency,
-                )
-                by_mid = {d["mid"]: d for d in details}
+                by_mid: dict[int, list[dict]] = {}
                 for item in items:
                     if "mid" in item:
-                        item["detail"] = by_mid.get(int(item["mid"]))
+                        by_mid.setdefault(int(item["mid"]), []).append(item)
+                details = service.iter_details(
+                    list(by_mid), concurrency=concurrency, ordered=False, fields=fields
+                )
+                async for found in details:
+                    for item in by_mid[found["mid"]]:
+                        item["detail"] = found
             payload = {
                 "page": page,
                 "page_size": page_size,
@@ -68,27 +90,53 @@ def all(
     mid: int | None = typer.Option(None),
     with_detail: bool = typer.Option(False),
     concurrency: int = typer.Option(3, min=1, max=10),
+    ordered: bool = typer.Option(
+        True, "--ordered/--unordered", help="Keep list order; --unordered emits pages as they land."
+    ),
+    fields: str | None = FIELDS_OPTION,
     json_output: bool = typer.Option(True, "--json/--pretty"),
 ) -> None:
-    """Stream every following across all pages as a flat JSON array."""
+    """Stream every following across all pages as a flat JSON array.
+
+    With ``--with-detail`` each item is printed as soon as its profile lookup
+    finishes instead of after the last one."""
     real_mid = _resolve_mid(mid)
 
     async def run() -> None:
         async with make_client() as client:
             service = FollowingService(client)
-            collected: list[dict] = []
-            async for item in service.iter_all(real_mid):
-                collected.append(item)
-            if with_detail and collected:
-                details = await service.enrich(
-                    [int(i["mid"]) for i in collected if "mid" in i],
-                    concurrency=concurrency,
+            collected = [item async for item in service.iter_all(real_mid, ordered=ordered)]
+            if not with_detail:
+                emit(collected, json_output=json_output)
+                return
+            # Positions, not items, per mid: a mid listed twice gets its
+            # detail in both places, and items keep their list order.
+            pending: dict[int, list[int]] = {}
+            for index, item in enumerate(collected):
+                if "mid" in item:
+                    pending.setdefault(int(item["mid"]), []).append(index)
+            ready = ["mid" not in item for item in collected]
+
+            async def enriched() -> AsyncIterator[dict]:
+                emitted = 0
+                details = service.iter_details(
+                    list(pending), concurrency=concurrency, ordered=False, fields=fields
                 )
-                by_mid = {d["mid"]: d for d in details}
-                for item in collected:
-                    if "mid" in item:
-                        item["detail"] = by_mid.get(int(item["mid"]))
-        emit(collected, json_output=json_output)
+                async with aclosing(details) as stream:
+                    async for found in stream:
+                        for index in pending.pop(found["mid"]):
+                            collected[index]["detail"] = found
+                            ready[index] = True
+                        # Print the longest ready run from the front, then
+                        # drop it so printed items can be freed.
+                        while emitted < len(collected) and ready[emitted]:
+                            yield collected[emitted]
+                            collected[emitted] = None
+                            emitted += 1
+                for item in collected[emitted:]:
+                    yield item
+
+            await emit_stream(enriched(), json_output=json_output)
 
     run_async(run())
 
@@ -96,13 +144,14 @@ def all(
 @app.command()
 def detail(
     target_mid: int = typer.Argument(..., help="The mid of the UP to inspect."),
+    fields: str | None = FIELDS_OPTION,
     json_output: bool = typer.Option(True, "--json/--pretty"),
 ) -> None:
     """Profile + stat + latest video for a single UP."""
 
     async def run() -> None:
         async with make_client() as client:
-            data = await FollowingService(client).get_detail(target_mid)
+            data = await FollowingService(client).get_detail(target_mid, fields=fields)
         emit(data, json_output=json_output)
 
     run_async(run())
@@ -113,7 +162,7 @@ def unfollow(
     mids: list[int] = typer.Argument(..., help="One or more mids to unfollow."),
     json_output: bool = typer.Option(True, "--json/--pretty"),
 ) -> None:
-    """Unfollow the given mids (sequential, rate-limited)."""
+    """Unfollow the given mids (a few in flight at a time, rate-limited)."""
 
     async def run() -> None:
         async with make_client() as client:
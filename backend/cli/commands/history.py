@@ -1,10 +1,13 @@
 from __future__ import annotations
 
+from datetime import datetime
+
 import typer
 
 from backend.services import HistoryService
+from backend.services.history import HistoryFilter
 
-from .._runtime import emit, make_client, run_async
+from .._runtime import emit, make_client, require_criteria, run_async
 
 app = typer.Typer(help="Watch history list / delete / clear.")
 
@@ -45,6 +48,39 @@ def delete(
     run_async(run())
 
 
+@app.command()
+def clean(
+    business: list[str] = typer.Option([], help="archive, pgc, live, ... (repeatable)."),
+    after: datetime | None = typer.Option(
+        None, formats=["%Y-%m-%d"], help="Viewed on or after this date."
+    ),
+    before: datetime | None = typer.Option(
+        None, formats=["%Y-%m-%d"], help="Viewed before this date."
+    ),
+    author: list[int] = typer.Option([], help="By this UP (repeatable)."),
+    dry_run: bool = typer.Option(False, "--dry-run", help="List matches, delete nothing."),
+    yes: bool = typer.Option(False, "--yes", "-y"),
+    json_output: bool = typer.Option(True, "--json/--pretty"),
+) -> None:
+    """Delete history entries matching every given criterion."""
+    predicate = HistoryFilter(
+        businesses=frozenset(b.strip() for b in business if b.strip()),
+        after=int(after.timestamp()) if after else None,
+        before=int(before.timestamp()) if before else None,
+        authors=frozenset(author),
+    )
+    require_criteria(predicate, "--business/--after/--before/--author")
+    if not (yes or dry_run) and not typer.confirm("Delete matching watch history?"):
+        raise typer.Abort()
+
+    async def run() -> None:
+        async with make_client() as client:
+            data = await HistoryService(client).delete_matching(predicate, dry_run=dry_run)
+        emit(data, json_output=json_output)
+
+    run_async(run())
+
+
 @app.command()
 def clear(
     yes: bool = typer.Option(False, "--yes", "-y"),
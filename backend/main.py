@@ -1,7 +1,9 @@
 from __future__ import annotations
 
+import asyncio
 import base64
 import logging
+import math
 import time
 import uuid
 from collections.abc import AsyncIterator
@@ -16,7 +18,10 @@ from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel, Field
 
-from backend.api import AuthApi, BiliApiError
+from backend.api import AuthApi, BiliApiError, wbi
+from backend.api.breaker import RiskCooldownError, open_breakers
+from backend.api.coalesce import get_coalescer
+from backend.api.cursor_index import get_cursor_index
 from backend.logging_config import configure_logging
 from backend.routers import (
     dynamics_router,
@@ -28,7 +33,15 @@ from backend.routers import (
     tasks_router,
     users_router,
 )
-from backend.routers._deps import anon_client, authed_client, get_auth_headers
+from backend.routers._deps import (
+    anon_client,
+    authed_client,
+    client_pool,
+    get_auth_headers,
+    rate_limiter,
+    response_cache,
+)
+from backend.services import profile_cache
 from backend.services.cleaner import CleanerService, CleanResult
 from backend.services.tasks import TaskCapacityError, task_registry
 from backend.settings import settings
@@ -42,18 +55,37 @@ STARTED_AT = time.time()
 @asynccontextmanager
 async def lifespan(_: FastAPI) -> AsyncIterator[None]:
     logger.info(
-        "Starting Bilibili Cleaner: qps=%.2f timeout=%.1fs retries=%d "
-        "max_running_tasks=%d audit_log=%s",
+        "Starting Bilibili Cleaner: qps=%.2f/account (%.2f global, adaptive=%s) "
+        "timeout=%.1fs retries=%d max_running_tasks=%d audit_log=%s",
         settings.api_qps,
+        settings.api_global_qps,
+        (
+            f"{settings.api_qps_min:g}-{settings.api_qps_max:g}"
+            if settings.api_adaptive
+            else "off"
+        ),
         settings.http_timeout,
         settings.max_retries,
         settings.max_running_tasks,
         settings.audit_log_path if settings.audit_log_enabled else "disabled",
     )
+    pool = client_pool()
+    # Off the startup path: with no network the handshake would only delay
+    # readiness, and the first real request connects on its own anyway.
+    prewarm = asyncio.create_task(pool.prewarm(), name="http-prewarm")
+    wbi.configure_disk_cache(settings.wbi_cache_path)
+    wbi.configure_refresh_client(anon_client)
+    profile_cache.configure_from_settings(settings)
+    wbi_refresh = asyncio.create_task(wbi.keep_fresh(anon_client), name="wbi-refresh")
     try:
         yield
     finally:
+        prewarm.cancel()
+        wbi_refresh.cancel()
+        wbi.configure_refresh_client(None)
         cancelled = await task_registry.shutdown()
+        await pool.aclose()
+        await profile_cache.shutdown()
         logger.info("Shutdown complete (%s task(s) cancelled)", cancelled)
 
 
@@ -65,9 +97,10 @@ app = FastAPI(
         "Open-source self-hosted toolkit for inspecting and cleaning your own "
         "Bilibili account: followings, favorite folders, dynamics, and watch "
         "history.\n\n"
-        "All requests are rate-limited (default 1.5 r/s, shared per event loop) "
-        "and retried with exponential backoff on risk-control responses "
-        "(`-352`, `-799`, `-509`, HTTP 412/429) — 3 retries, 4 attempts total. "
+        "All requests are rate-limited (default 1.5 r/s per account, 4.5 r/s "
+        "across all accounts in the process) and retried with exponential "
+        "backoff on risk-control responses (`-352`, `-799`, `-509`, HTTP "
+        "412/429) — 3 retries, 4 attempts total. "
         "Long-running cleans are exposed as async tasks under "
         "`/api/v2/tasks/*`.\n\n"
         "Endpoints under `/api/v2/*` are the canonical AI-facing surface; "
@@ -165,9 +198,13 @@ async def bilibili_error_handler(request: Request, exc: BiliApiError) -> JSONRes
         exc,
         extra={"request_id": getattr(request.state, "request_id", "-")},
     )
+    headers = None
+    if isinstance(exc, RiskCooldownError) and exc.retry_after is not None:
+        headers = {"Retry-After": str(math.ceil(exc.retry_after))}
     return JSONResponse(
         status_code=status_code,
         content={"error": str(exc), "code": exc.code, "data": exc.data},
+        headers=headers,
     )
 
 
@@ -215,10 +252,22 @@ async def readyz() -> JSONResponse:
     """
     running = task_registry.running_count()
     saturated = running >= settings.max_running_tasks
+    cache = response_cache()
+    profiles = profile_cache.get_profile_cache()
     body: dict[str, Any] = {
         "status": "saturated" if saturated else "ok",
         "running_tasks": running,
         "max_running_tasks": settings.max_running_tasks,
+        "rate_limit": rate_limiter().snapshot(),
+        "http_pool": client_pool().to_dict(),
+        "response_cache": cache.to_dict() if cache is not None else None,
+        "coalescing": get_coalescer().to_dict(),
+        "profile_cache": await profiles.to_dict() if profiles is not None else None,
+        "cursor_index": get_cursor_index().to_dict(),
+        "risk_control": {
+            owner[:8] or "anonymous": breaker.to_dict()
+            for owner, breaker in open_breakers().items()
+        },
         "uptime_seconds": round(time.time() - STARTED_AT, 1),
     }
     return JSONResponse(
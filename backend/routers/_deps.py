@@ -6,12 +6,39 @@ from contextlib import asynccontextmanager
 from fastapi import Depends, Header, HTTPException, status
 
 from backend.api import BiliApiClient
-from backend.services.tasks import owner_key
+from backend.api.breaker import BreakerConfig
+from backend.api.cache import ResponseCache, get_response_cache
+from backend.api.client import ClientPool, get_client_pool, owner_key
+from backend.api.ratelimit import AdaptiveBounds, RateLimiter, get_shared_limiter
 from backend.settings import settings
 
 DEFAULT_API_QPS = settings.api_qps
 
 
+def _adaptive_bounds() -> AdaptiveBounds | None:
+    if not settings.api_adaptive:
+        return None
+    low, high = sorted((settings.api_qps_min, settings.api_qps_max))
+    return AdaptiveBounds(min_qps=low, max_qps=high)
+
+
+ADAPTIVE_BOUNDS = _adaptive_bounds()
+
+
+def _breaker_config() -> BreakerConfig | None:
+    if settings.breaker_threshold <= 0:
+        return None
+    return BreakerConfig(
+        threshold=settings.breaker_threshold,
+        cooldown=settings.breaker_cooldown,
+        max_cooldown=max(settings.breaker_cooldown, settings.breaker_max_cooldown),
+        max_pause=settings.breaker_max_pause,
+    )
+
+
+BREAKER_CONFIG = _breaker_config()
+
+
 def get_auth_headers(
     sessdata: str | None = Header(None, alias="SESSDATA"),
     bili_jct: str | None = Header(None, alias="bili_jct"),
@@ -24,6 +51,29 @@ def get_auth_headers(
     return sessdata, bili_jct
 
 
+def client_pool() -> ClientPool:
+    """The running loop's upstream connection pool, configured from settings."""
+    return get_client_pool(
+        max_clients=settings.http_pool_size,
+        idle_timeout=settings.http_pool_idle_seconds,
+        max_connections=settings.http_max_connections,
+        keepalive_expiry=settings.http_keepalive_seconds,
+        http2=settings.http2,
+    )
+
+
+def response_cache() -> ResponseCache | None:
+    """The running loop's upstream response cache; None when disabled."""
+    if settings.response_cache_size <= 0:
+        return None
+    return get_response_cache(max_entries=settings.response_cache_size)
+
+
+def rate_limiter(qps: float = DEFAULT_API_QPS) -> RateLimiter:
+    """The limiter ``build_client`` clients acquire from, for introspection."""
+    return get_shared_limiter(qps, settings.api_global_qps, adaptive=ADAPTIVE_BOUNDS)
+
+
 def build_client(
     auth: tuple[str, str] | None = None, *, qps: float | None = DEFAULT_API_QPS
 ) -> BiliApiClient:
@@ -32,15 +82,24 @@ def build_client(
     Every caller must go through here. Constructing ``BiliApiClient`` inline
     silently skips the configured timeout and retry policy — which used to be
     the case for exactly the long-running background cleans that need it most.
+    The underlying HTTP client comes from the pool, so connections survive
+    across requests instead of paying a TLS handshake each time.
     """
     sessdata, bili_jct = auth if auth else (None, None)
     return BiliApiClient(
         sessdata=sessdata,
         bili_jct=bili_jct,
         qps=qps,
+        global_qps=settings.api_global_qps,
+        adaptive=ADAPTIVE_BOUNDS,
+        breaker=BREAKER_CONFIG,
+        response_cache=response_cache(),
         timeout=settings.http_timeout,
         max_retries=settings.max_retries,
         retry_base_delay=settings.retry_base_delay,
+        http_client=client_pool().client_for(
+            sessdata, bili_jct, timeout=settings.http_timeout
+        ),
     )
 
 
@@ -4,8 +4,14 @@ from typing import Any
 
 from fastapi import APIRouter, Query
 
-from backend.schemas import BatchActionResult, DeleteDynamicsRequest, TaskAck
+from backend.schemas import (
+    BatchActionResult,
+    DeleteDynamicsRequest,
+    DynamicCleanRequest,
+    TaskAck,
+)
 from backend.services import DynamicService
+from backend.services.dynamic import MAX_CLEAR_PAGES, DynamicFilter, dynamic_type
 from backend.services.tasks import TaskState, task_registry
 
 from ._deps import AuthDep, authed_client, task_owner
@@ -17,12 +23,26 @@ router = APIRouter(prefix="/dynamics", tags=["dynamics"])
 async def list_dynamics(
     mid: int = Query(..., ge=1, description="host_mid"),
     offset: str = Query("", description="Cursor from previous response.offset"),
+    page: int | None = Query(
+        None,
+        ge=1,
+        le=MAX_CLEAR_PAGES,
+        description="Jump to this page instead of following a cursor",
+    ),
     auth: tuple[str, str] = AuthDep,
 ) -> dict[str, Any]:
     """Returned shape: ``{items: [...], has_more, offset}``. WBI-signed under
-    the hood. Pass back ``offset`` to fetch the next page until ``has_more=false``."""
+    the hood. Pass back ``offset`` to fetch the next page until ``has_more=false``.
+
+    With ``page`` the ``offset`` is ignored: the server resumes from the
+    nearest page boundary it has seen for this account and walks the rest.
+    ``items`` is empty past the end."""
     async with authed_client(auth) as client:
-        return await DynamicService(client).list_page(mid, offset=offset or None)
+        service = DynamicService(client)
+        if page is not None:
+            found = await service.get_page(mid, page)
+            return found if found is not None else {"items": [], "has_more": False, "offset": ""}
+        return await service.list_page(mid, offset=offset or None)
 
 
 @router.post(
@@ -39,6 +59,30 @@ async def delete_dynamics(
     return BatchActionResult(**result)
 
 
+@router.post(
+    "/index/warm",
+    response_model=TaskAck,
+    summary="Record page boundaries ahead of time (async task)",
+)
+async def warm_dynamics_index(
+    mid: int = Query(..., ge=1),
+    pages: int = Query(20, ge=1, le=MAX_CLEAR_PAGES),
+    auth: tuple[str, str] = AuthDep,
+) -> TaskAck:
+    """Walk the first ``pages`` pages in the background so later ``?page=``
+    jumps within them cost one request. ``result.pages`` is how far the
+    index now reaches; ``ended`` is true when the feed is shorter."""
+
+    async def builder(state: TaskState) -> dict[str, Any]:
+        async with authed_client(auth) as client:
+            return await DynamicService(client).warm_index(
+                mid, pages, on_page=lambda _page: state.report_progress(advance=1)
+            )
+
+    state = task_registry.create("dynamics.index", builder, owner=task_owner(auth))
+    return TaskAck(task_id=state.task_id)
+
+
 @router.post(
     "/clear",
     response_model=TaskAck,
@@ -61,3 +105,42 @@ async def clear_dynamics_task(
 
     state = task_registry.create("dynamics.clear", builder, owner=task_owner(auth))
     return TaskAck(task_id=state.task_id)
+
+
+@router.post(
+    "/clean",
+    response_model=TaskAck,
+    summary="Delete dynamics matching criteria (async task)",
+)
+async def clean_dynamics_task(
+    body: DynamicCleanRequest,
+    mid: int = Query(..., ge=1),
+    auth: tuple[str, str] = AuthDep,
+) -> TaskAck:
+    """Scan the feed newest first and delete what matches all of the given
+    criteria. With ``after`` the scan stops once it is past that time.
+    ``result`` reports ``scanned``/``matched``; with ``dry_run`` it lists the
+    matches instead of deleting them."""
+    predicate = DynamicFilter(
+        types=frozenset(dynamic_type(t) for t in body.types if t.strip()),
+        after=body.after,
+        before=body.before,
+        keywords=tuple(k for k in body.keywords if k),
+        reposts=body.reposts,
+    )
+
+    async def builder(state: TaskState) -> dict[str, Any]:
+        async with authed_client(auth) as client:
+            service = DynamicService(client)
+
+            def on_item(_id: int, ok: bool, err: dict | None) -> None:
+                state.report_progress(advance=1)
+                if err is not None:
+                    state.report_error(err)
+
+            return await service.clean_matching(
+                mid, predicate, dry_run=body.dry_run, on_item=on_item
+            )
+
+    state = task_registry.create("dynamics.clean", builder, owner=task_owner(auth))
+    return TaskAck(task_id=state.task_id)
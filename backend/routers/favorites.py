@@ -1,11 +1,21 @@
 from __future__ import annotations
 
+import json
+from collections.abc import AsyncIterator
+from contextlib import aclosing
 from typing import Any
 
 from fastapi import APIRouter, Path, Query
+from fastapi.responses import StreamingResponse
 
-from backend.schemas import BatchActionResult, DeleteFavoritesRequest, TaskAck
+from backend.schemas import (
+    BatchActionResult,
+    DeleteFavoritesRequest,
+    FavoriteCleanRequest,
+    TaskAck,
+)
 from backend.services import FavoriteService
+from backend.services.favorite import FavoriteFilter
 from backend.services.tasks import TaskState, task_registry
 
 from ._deps import AuthDep, authed_client, task_owner
@@ -22,6 +32,41 @@ async def list_folders(
         return await FavoriteService(client).list_folders(mid)
 
 
+@router.get(
+    "/search",
+    response_class=StreamingResponse,
+    summary="Search every favorite folder by keyword (streams NDJSON)",
+)
+async def search_favorites(
+    mid: int = Query(..., ge=1),
+    keyword: str = Query(..., min_length=1),
+    limit: int | None = Query(None, ge=1, description="Stop after this many hits"),
+    concurrency: int = Query(3, ge=1, le=10),
+    auth: tuple[str, str] = AuthDep,
+) -> StreamingResponse:
+    """Searches all folders at once and writes one JSON item per line as each
+    folder's hits come in. Items saved in several folders appear once, with
+    the ``media_id`` they were first found in. Folders that could not be
+    searched are listed last as ``{"error": ..., "media_id": ...}`` lines.
+    Repeating a search within a few minutes is served from the response
+    cache."""
+    # Listing the folders up front lets a bad session fail with a proper
+    # status instead of a truncated 200 stream.
+    async with authed_client(auth) as client:
+        media_ids = await FavoriteService(client).folder_ids(mid)
+
+    async def lines() -> AsyncIterator[str]:
+        async with authed_client(auth) as client:
+            hits = FavoriteService(client).search(
+                mid, keyword, media_ids=media_ids, limit=limit, concurrency=concurrency
+            )
+            async with aclosing(hits):
+                async for item in hits:
+                    yield json.dumps(item, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
 @router.get(
     "/folders/{media_id}/items",
     summary="List items inside a favorite folder",
@@ -65,6 +110,11 @@ async def delete_folder_items(
 )
 async def clear_favorites_task(
     mid: int = Query(..., ge=1),
+    delete_folders: bool = Query(
+        False,
+        description="Delete non-default folders outright (one request each) "
+        "instead of emptying them; the default folder is still emptied.",
+    ),
     auth: tuple[str, str] = AuthDep,
 ) -> TaskAck:
     async def builder(state: TaskState) -> dict[str, Any]:
@@ -76,7 +126,88 @@ async def clear_favorites_task(
                 if err is not None:
                     state.report_error(err)
 
-            return await service.clear_all(mid, on_batch=on_batch)
+            def on_folder(_media_id: int, count: int, err: dict | None) -> None:
+                # A folder that failed to delete still holds its items.
+                if err is not None:
+                    state.report_error(err)
+                else:
+                    state.report_progress(advance=count)
+
+            return await service.clear_all(
+                mid, on_batch=on_batch, on_folder=on_folder, delete_folders=delete_folders
+            )
 
     state = task_registry.create("favorites.clear", builder, owner=task_owner(auth))
     return TaskAck(task_id=state.task_id)
+
+
+@router.post(
+    "/clean",
+    response_model=TaskAck,
+    summary="Delete favorites matching criteria across folders (async task)",
+)
+async def clean_favorites_task(
+    body: FavoriteCleanRequest,
+    mid: int = Query(..., ge=1),
+    auth: tuple[str, str] = AuthDep,
+) -> TaskAck:
+    """Scan every folder server-side and delete the items that match all of
+    the given criteria. ``result`` reports ``scanned``/``matched`` counts;
+    with ``dry_run`` it lists the matches instead of deleting them."""
+    predicate = FavoriteFilter(
+        invalid=body.invalid,
+        uploaders=frozenset(body.uploader_mids),
+        favorited_before=body.favorited_before,
+        keywords=tuple(k for k in body.title_keywords if k),
+    )
+
+    async def builder(state: TaskState) -> dict[str, Any]:
+        async with authed_client(auth) as client:
+            service = FavoriteService(client)
+
+            def on_batch(_media_id: int, batch: list[str], err: dict | None) -> None:
+                state.report_progress(advance=len(batch))
+                if err is not None:
+                    state.report_error(err)
+
+            return await service.clean_matching(
+                mid,
+                predicate,
+                media_ids=body.media_ids,
+                dry_run=body.dry_run,
+                on_batch=on_batch,
+            )
+
+    state = task_registry.create("favorites.clean", builder, owner=task_owner(auth))
+    return TaskAck(task_id=state.task_id)
+
+
+@router.post(
+    "/duplicates",
+    response_model=TaskAck,
+    summary="Find videos saved in several folders, optionally removing extra copies (async task)",
+)
+async def favorite_duplicates_task(
+    mid: int = Query(..., ge=1),
+    delete: bool = Query(
+        False, description="Keep the copy in the first folder and delete the others"
+    ),
+    auth: tuple[str, str] = AuthDep,
+) -> TaskAck:
+    """Builds an index from one ``ids`` call per folder. ``result.duplicates``
+    lists ``{id, media_ids}`` with folders in listing order; with ``delete``
+    every copy after the first is removed."""
+
+    async def builder(state: TaskState) -> dict[str, Any]:
+        async with authed_client(auth) as client:
+            service = FavoriteService(client)
+
+            def on_batch(_media_id: int, batch: list[str], err: dict | None) -> None:
+                state.report_progress(advance=len(batch))
+                if err is not None:
+                    state.report_error(err)
+
+            return await service.find_duplicates(mid, delete=delete, on_batch=on_batch)
+
+    state = task_registry.create("favorites.duplicates", builder, owner=task_owner(auth))
+    return TaskAck(task_id=state.task_id)
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from typing import Any
 
-from fastapi import APIRouter, Path, Query
+from fastapi import APIRouter, Depends, HTTPException, Path, Query
 
 from backend.schemas import (
     BatchActionResult,
@@ -12,6 +12,7 @@ from backend.schemas import (
     UnfollowRequest,
 )
 from backend.services import FollowingService
+from backend.services.following import parse_detail_fields
 from backend.services.tasks import TaskState, task_registry
 
 from ._deps import AuthDep, authed_client, task_owner
@@ -19,6 +20,25 @@ from ._deps import AuthDep, authed_client, task_owner
 router = APIRouter(prefix="/followings", tags=["followings"])
 
 
+def detail_fields(
+    fields: str | None = Query(
+        None,
+        description=(
+            "Comma-separated subset of info,stat,latest_video,video_count; "
+            "default all. Upstream calls for fields not asked for are skipped."
+        ),
+    ),
+) -> tuple[str, ...]:
+    try:
+        return parse_detail_fields(fields)
+    except ValueError as exc:
+        # Numeric: the constant's name differs between Starlette versions.
+        raise HTTPException(status_code=422, detail=str(exc)) from exc
+
+
+FieldsDep = Depends(detail_fields)
+
+
 @router.get(
     "",
     response_model=FollowingListResponse,
@@ -34,11 +54,13 @@ async def list_followings(
         False, description="Also fetch profile + recent video for each mid (slower)"
     ),
     concurrency: int = Query(3, ge=1, le=10),
+    fields: tuple[str, ...] = FieldsDep,
     auth: tuple[str, str] = AuthDep,
 ) -> FollowingListResponse:
     """List followings. When ``with_detail=true``, each item gets an extra
     ``detail`` field with profile + stat + latest video — useful for quality
-    filtering. Note: triggers extra requests; respects the global rate limit."""
+    filtering; ``fields`` trims it to what the filter needs. Note: triggers
+    extra requests; respects the global rate limit."""
     async with authed_client(auth) as client:
         service = FollowingService(client)
         data = await service.list_page(
@@ -49,12 +71,17 @@ async def list_followings(
             [i for i in items if isinstance(i, dict)] if isinstance(items, list) else []
         )
         if with_detail and items_list:
-            mids = [int(i["mid"]) for i in items_list if "mid" in i]
-            details = await service.enrich(mids, concurrency=concurrency)
-            by_mid = {d["mid"]: d for d in details}
+            by_mid: dict[int, list[dict[str, Any]]] = {}
             for item in items_list:
                 if "mid" in item:
-                    item["detail"] = by_mid.get(int(item["mid"]))
+                    item["detail"] = None
+                    by_mid.setdefault(int(item["mid"]), []).append(item)
+            details = service.iter_details(
+                by_mid, concurrency=concurrency, ordered=False, fields=fields
+            )
+            async for detail in details:
+                for item in by_mid[detail["mid"]]:
+                    item["detail"] = detail
         return FollowingListResponse(
             page=page,
             page_size=page_size,
@@ -66,17 +93,20 @@ async def list_followings(
 @router.get(
     "/{target_mid}",
     response_model=FollowingDetail,
+    response_model_exclude_unset=True,
     summary="Get full quality profile of one UP",
 )
 async def get_following_detail(
     target_mid: int = Path(..., ge=1),
+    fields: tuple[str, ...] = FieldsDep,
     auth: tuple[str, str] = AuthDep,
 ) -> FollowingDetail:
     """Combines ``/users/{mid}`` + ``/users/{mid}/stat`` + first video into
-    a single shape for quality scoring."""
+    a single shape for quality scoring. The upstream calls run concurrently;
+    ``fields`` limits both the calls and the response."""
     async with authed_client(auth) as client:
         service = FollowingService(client)
-        detail = await service.get_detail(target_mid)
+        detail = await service.get_detail(target_mid, fields=fields)
     return FollowingDetail(**detail)
 
 
@@ -89,9 +119,9 @@ async def unfollow_many(
     body: UnfollowRequest,
     auth: tuple[str, str] = AuthDep,
 ) -> BatchActionResult:
-    """Sequentially unfollow each mid (B 站 has no batch endpoint). Subject
-    to the global rate limit — long lists (>50) should use
-    ``POST /followings/unfollow-task`` instead."""
+    """Unfollow each mid (B 站 has no batch endpoint), a few requests in
+    flight at a time. Subject to the global rate limit — long lists (>50)
+    should use ``POST /followings/unfollow-task`` instead."""
     async with authed_client(auth) as client:
         service = FollowingService(client)
         result = await service.unfollow_many(body.mids)
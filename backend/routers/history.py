@@ -4,9 +4,12 @@ from typing import Any
 
 from fastapi import APIRouter, Query
 
+from backend.schemas import HistoryDeleteRequest, TaskAck
 from backend.services import HistoryService
+from backend.services.history import MAX_HISTORY_PAGES, HistoryFilter
+from backend.services.tasks import TaskState, task_registry
 
-from ._deps import AuthDep, authed_client
+from ._deps import AuthDep, authed_client, task_owner
 
 router = APIRouter(prefix="/history", tags=["history"])
 
@@ -18,12 +21,26 @@ async def list_history(
     view_at: int = Query(0, description="Cursor: last ``cursor.view_at``"),
     page_size: int = Query(20, ge=1, le=30),
     type_: str = Query("all", alias="type"),
+    page: int | None = Query(
+        None,
+        ge=1,
+        le=MAX_HISTORY_PAGES,
+        description="Jump to this page instead of following a cursor",
+    ),
     auth: tuple[str, str] = AuthDep,
 ) -> dict[str, Any]:
     """Returns ``{cursor, list}``. Send ``cursor.max`` + ``cursor.view_at`` as
-    the next call's ``max_id`` + ``view_at`` to page through."""
+    the next call's ``max_id`` + ``view_at`` to page through.
+
+    With ``page`` the cursor arguments are ignored: the server resumes from
+    the nearest page boundary it has seen for this account and walks the
+    rest. ``list`` is empty past the end."""
     async with authed_client(auth) as client:
-        return await HistoryService(client).list_page(
+        service = HistoryService(client)
+        if page is not None:
+            found = await service.get_page(page, page_size=page_size, type_=type_)
+            return found if found is not None else {"cursor": None, "list": []}
+        return await service.list_page(
             max_id=max_id,
             business=business,
             view_at=view_at,
@@ -41,6 +58,71 @@ async def delete_history(
         return await HistoryService(client).delete(kid)
 
 
+@router.post(
+    "/delete-task",
+    response_model=TaskAck,
+    summary="Delete history entries matching criteria (async task)",
+)
+async def delete_history_task(
+    body: HistoryDeleteRequest,
+    auth: tuple[str, str] = AuthDep,
+) -> TaskAck:
+    """Walk the history cursor newest first and delete the entries that match
+    all of the given criteria, several kids per call. With ``after`` the walk
+    stops once it is past that time. ``result`` reports ``scanned``/``matched``;
+    with ``dry_run`` it lists the matches instead of deleting them."""
+    predicate = HistoryFilter(
+        businesses=frozenset(b.strip() for b in body.businesses if b.strip()),
+        after=body.after,
+        before=body.before,
+        authors=frozenset(body.author_mids),
+    )
+
+    async def builder(state: TaskState) -> dict[str, Any]:
+        async with authed_client(auth) as client:
+            service = HistoryService(client)
+
+            def on_batch(kids: list[str], err: dict | None) -> None:
+                state.report_progress(advance=len(kids))
+                if err is not None:
+                    state.report_error(err)
+
+            return await service.delete_matching(
+                predicate, dry_run=body.dry_run, on_batch=on_batch
+            )
+
+    state = task_registry.create("history.delete", builder, owner=task_owner(auth))
+    return TaskAck(task_id=state.task_id)
+
+
+@router.post(
+    "/index/warm",
+    response_model=TaskAck,
+    summary="Record page boundaries ahead of time (async task)",
+)
+async def warm_history_index(
+    pages: int = Query(20, ge=1, le=MAX_HISTORY_PAGES),
+    page_size: int = Query(20, ge=1, le=30),
+    type_: str = Query("all", alias="type"),
+    auth: tuple[str, str] = AuthDep,
+) -> TaskAck:
+    """Walk the first ``pages`` pages in the background so later ``?page=``
+    jumps within them cost one request. ``result.pages`` is how far the
+    index now reaches; ``ended`` is true when the history is shorter."""
+
+    async def builder(state: TaskState) -> dict[str, Any]:
+        async with authed_client(auth) as client:
+            return await HistoryService(client).warm_index(
+                pages,
+                page_size=page_size,
+                type_=type_,
+                on_page=lambda _page: state.report_progress(advance=1),
+            )
+
+    state = task_registry.create("history.index", builder, owner=task_owner(auth))
+    return TaskAck(task_id=state.task_id)
+
+
 @router.post("/clear", summary="Wipe all watch history (single call, synchronous)")
 async def clear_history(auth: tuple[str, str] = AuthDep) -> dict[str, Any]:
     """Unlike other ``/clear`` endpoints this is one B 站 call so we don't
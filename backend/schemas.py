@@ -1,8 +1,8 @@
 from __future__ import annotations
 
-from typing import Any
+from typing import Any, ClassVar
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 
 
 class ErrorResponse(BaseModel):
@@ -16,7 +16,9 @@ class TaskInfo(BaseModel):
     kind: str
     status: str = Field(
         ...,
-        description="pending | running | completed | failed | cancelled",
+        description=(
+            "pending | running | paused_risk_control | completed | failed | cancelled"
+        ),
     )
     processed: int = 0
     total: int | None = None
@@ -54,9 +56,11 @@ class FollowingItem(BaseModel):
 
 
 class FollowingDetail(BaseModel):
+    """Fields left out of the request's ``fields`` are omitted from the response."""
+
     mid: int
-    info: dict[str, Any]
-    stat: dict[str, Any]
+    info: dict[str, Any] | None = None
+    stat: dict[str, Any] | None = None
     latest_video: dict[str, Any] | None = None
     video_count: int | None = None
 
@@ -94,6 +98,95 @@ class DeleteFavoritesRequest(BaseModel):
     resources: list[ResourceRef] = Field(..., min_length=1)
 
 
+class CleanCriteria(BaseModel):
+    """Criteria are combined with AND; at least one is required.
+
+    Subclasses name their criterion fields in ``criteria``. Blank strings
+    are dropped from list criteria first, since the filters built from them
+    skip such entries anyway. A list then counts as set once it has an
+    entry, anything else once it differs from the field's default (so
+    ``favorited_before: 0`` is a criterion, ``invalid: false`` is not).
+    """
+
+    criteria: ClassVar[tuple[str, ...]] = ()
+
+    @model_validator(mode="after")
+    def _has_criterion(self) -> CleanCriteria:
+        fields = type(self).model_fields
+        found = False
+        for name in self.criteria:
+            value = getattr(self, name)
+            if isinstance(value, list):
+                value = [v for v in value if not (isinstance(v, str) and not v.strip())]
+                setattr(self, name, value)
+                found = found or any(value)
+            else:
+                found = found or value != fields[name].default
+        if not found:
+            raise ValueError("set at least one criterion")
+        return self
+
+
+class FavoriteCleanRequest(CleanCriteria):
+    """Criteria are combined with AND; at least one is required."""
+
+    criteria = ("invalid", "uploader_mids", "favorited_before", "title_keywords")
+
+    invalid: bool = Field(False, description="Videos that were deleted or taken down")
+    uploader_mids: list[int] = Field(
+        default_factory=list, description="Uploaded by any of these UPs"
+    )
+    favorited_before: int | None = Field(
+        None, ge=0, description="Favorited before this Unix timestamp"
+    )
+    title_keywords: list[str] = Field(
+        default_factory=list, description="Title contains any of these (case-insensitive)"
+    )
+    media_ids: list[int] | None = Field(
+        None, description="Only scan these folders (default: every folder)"
+    )
+    dry_run: bool = Field(False, description="Report the matches without deleting them")
+
+
+class DynamicCleanRequest(CleanCriteria):
+    """Criteria are combined with AND; at least one is required."""
+
+    criteria = ("types", "after", "before", "keywords", "reposts")
+
+    types: list[str] = Field(
+        default_factory=list,
+        description="Dynamic types, e.g. forward, av, draw, word, article "
+        "(or the full DYNAMIC_TYPE_* name)",
+    )
+    after: int | None = Field(
+        None, ge=0, description="Published at or after this Unix timestamp"
+    )
+    before: int | None = Field(None, ge=0, description="Published before this Unix timestamp")
+    keywords: list[str] = Field(
+        default_factory=list, description="Text contains any of these (case-insensitive)"
+    )
+    reposts: bool | None = Field(
+        None, description="true: only reposts; false: only original dynamics"
+    )
+    dry_run: bool = Field(False, description="Report the matches without deleting them")
+
+
+class HistoryDeleteRequest(CleanCriteria):
+    """Criteria are combined with AND; at least one is required."""
+
+    criteria = ("businesses", "after", "before", "author_mids")
+
+    businesses: list[str] = Field(
+        default_factory=list, description="archive | pgc | live | article | cheese ..."
+    )
+    after: int | None = Field(None, ge=0, description="Viewed at or after this Unix timestamp")
+    before: int | None = Field(None, ge=0, description="Viewed before this Unix timestamp")
+    author_mids: list[int] = Field(
+        default_factory=list, description="Uploaded / hosted by any of these UPs"
+    )
+    dry_run: bool = Field(False, description="Report the matches without deleting them")
+
+
 class DeleteDynamicsRequest(BaseModel):
     ids: list[str] = Field(..., min_length=1)
 
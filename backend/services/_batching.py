@@ -0,0 +1,80 @@
+"""Adaptive sizing and failure bisection for favorite batch deletes.
+
+``batch-del`` takes up to 100 resources, and one resource it refuses (a video
+taken down since it was saved, a malformed id) fails the whole request. With
+fixed 100-item chunks those 99 good items used to come back as errors. A
+failed batch is now split in half and each half retried, which isolates the
+offending items in O(log n) extra calls per bad item while the rest still
+get deleted. :class:`BatchSizer` shrinks the batch after failures or slow
+replies, so a folder full of bad items costs less per failure, and grows it
+back while batches keep landing quickly.
+"""
+
+from __future__ import annotations
+
+from backend.api.breaker import RiskCooldownError
+from backend.api.client import BiliApiError
+from backend.api.nav import NOT_LOGGED_IN, SessionExpiredError
+from backend.api.retry import is_risk_control_error
+
+# Upstream's batch-del limit.
+MAX_BATCH = 100
+MIN_BATCH = 5
+
+# Failures that say nothing about the items in the batch: the session or its
+# CSRF token is bad, or upstream is struggling. Splitting would only repeat
+# them.
+UNSPLITTABLE_CODES = frozenset({NOT_LOGGED_IN, -111, -500, -503})
+
+
+def is_fatal_error(exc: BaseException) -> bool:
+    """True when a failure ends the whole run rather than one folder of it.
+
+    The session is gone, or the breaker has paused the account; reading or
+    deleting the next folder would fail the same way.
+    """
+    if isinstance(exc, (SessionExpiredError, RiskCooldownError)):
+        return True
+    return isinstance(exc, BiliApiError) and exc.code == NOT_LOGGED_IN
+
+
+def is_item_error(exc: Exception) -> bool:
+    """True when a batch may have failed because of some of its items."""
+    if not isinstance(exc, BiliApiError) or exc.code is None:
+        return False
+    return exc.code not in UNSPLITTABLE_CODES and not is_risk_control_error(exc)
+
+
+class BatchSizer:
+    """Additive-increase, multiplicative-decrease batch size.
+
+    Starts at ``maximum``. A batch that lands within ``slow_factor`` times
+    the running average latency grows the size by a tenth of ``maximum``;
+    a failed or slow one halves it, down to ``minimum``. Latency is compared
+    with the running average rather than a fixed threshold because it
+    includes time spent waiting on the rate limiter.
+    """
+
+    def __init__(
+        self,
+        *,
+        maximum: int = MAX_BATCH,
+        minimum: int = MIN_BATCH,
+        slow_factor: float = 3.0,
+    ) -> None:
+        if not 1 <= minimum <= maximum:
+            raise ValueError("need 1 <= minimum <= maximum")
+        self.maximum = maximum
+        self.minimum = minimum
+        self.slow_factor = slow_factor
+        self.size = maximum
+        self._latency: float | None = None
+
+    def record(self, ok: bool, elapsed: float) -> None:
+        baseline = self._latency
+        self._latency = elapsed if baseline is None else 0.8 * baseline + 0.2 * elapsed
+        slow = baseline is not None and elapsed > self.slow_factor * baseline
+        if ok and not slow:
+            self.size = min(self.maximum, self.size + max(1, self.maximum // 10))
+        else:
+            self.size = max(self.minimum, self.size // 2)
@@ -15,3 +15,9 @@ ItemCallback = Callable[[int, bool, dict[str, Any] | None], None]
 
 # (media_id, batch, error) — called after each batched favorite delete.
 BatchCallback = Callable[[int, Sequence[str], dict[str, Any] | None], None]
+
+# (media_id, item_count, error) — called after each whole-folder delete.
+FolderCallback = Callable[[int, int, dict[str, Any] | None], None]
+
+# (kids, error) — called after each batched history delete.
+KidBatchCallback = Callable[[Sequence[str], dict[str, Any] | None], None]
@@ -0,0 +1,240 @@
+"""Bounded worker pool shared by the cleanup services.
+
+B 站 has no batch endpoint for unfollows or dynamic deletes, so a clean is a
+long series of single POSTs. Awaiting each one before starting the next caps
+throughput at ``1 / RTT`` however generous the rate limit is. Here a handful
+of workers keep several requests in flight; the token bucket still decides
+how fast they actually go out. :func:`prefetch` likewise overlaps listing the
+next page with deleting the current one.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import AsyncIterable, AsyncIterator, Awaitable, Callable, Iterable
+from typing import Any, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# Enough to hide a slow round trip at the default rates. Raising it does not
+# raise the request rate, which the limiter caps regardless.
+WRITE_CONCURRENCY = 4
+
+# Write calls in a row that may fail, with none landing in between, before a
+# bulk delete gives up with ``stopped_reason: "no_progress"``.
+STALL_LIMIT = 3
+
+# The same for calls that each delete one item picked by a predicate (a
+# dynamic clean). One such item can be refused for reasons of its own, e.g.
+# already gone or not deletable, and matches can cluster, so a short run of
+# refusals is not yet a sign of a dead session. Batch calls and whole
+# folders have no such excuse and keep STALL_LIMIT.
+ITEM_STALL_LIMIT = 10
+
+
+async def run_bounded(
+    items: Iterable[T] | AsyncIterable[T],
+    worker: Callable[[T], Awaitable[None]],
+    *,
+    concurrency: int = WRITE_CONCURRENCY,
+) -> None:
+    """Await ``worker(item)`` for every item, at most ``concurrency`` at a time.
+
+    Items are started in order. An async iterable is only pulled when a
+    worker is free, so it may await (for example, hold back the next item)
+    without blocking the items already running. ``worker`` is expected to
+    handle its own failures; if one raises anyway, the remaining workers are
+    cancelled and the exception propagates.
+    """
+    if isinstance(items, AsyncIterable):
+        source = aiter(items)
+        # An async generator cannot be resumed by two workers at once.
+        pulling = asyncio.Lock()
+
+        async def drain() -> None:
+            while True:
+                async with pulling:
+                    try:
+                        item = await anext(source)
+                    except StopAsyncIteration:
+                        return
+                await worker(item)
+
+    else:
+        source = None
+        iterator = iter(items)
+
+        async def drain() -> None:
+            for item in iterator:
+                await worker(item)
+
+    workers = [asyncio.create_task(drain()) for _ in range(max(1, concurrency))]
+    try:
+        await asyncio.gather(*workers)
+    finally:
+        for task in workers:
+            task.cancel()
+        # Let cancelled workers unwind before returning, so no request is
+        # still in flight once the caller moves on.
+        await asyncio.gather(*workers, return_exceptions=True)
+        aclose = getattr(source, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
+
+# Pages listed ahead of the one being deleted. One is enough to hide a listing
+# round trip; more would only list items that are about to shift anyway.
+PREFETCH_DEPTH = 1
+
+Settle = Callable[[], Awaitable[None]]
+
+
+async def prefetch(
+    produce: Callable[[Settle], AsyncIterator[T]],
+    *,
+    depth: int = PREFETCH_DEPTH,
+) -> AsyncIterator[T]:
+    """Iterate ``produce(settle)`` with the producer running ahead of the caller.
+
+    The producer runs as its own task and hands pages over through a queue
+    of ``depth``, so the next page is being listed while the caller deletes
+    the current one. Awaiting ``settle()`` inside the producer blocks until
+    the caller has finished with every page handed over so far, for listings
+    that only read true once the deletes have landed. Producer errors are
+    raised to the caller. Wrap the iterator in ``contextlib.aclosing`` so
+    that leaving the loop early stops the producer.
+    """
+    queue: asyncio.Queue[tuple[bool, Any]] = asyncio.Queue(maxsize=max(1, depth))
+
+    async def settle() -> None:
+        await queue.join()
+
+    async def fill() -> None:
+        try:
+            async for page in produce(settle):
+                await queue.put((False, page))
+        except Exception as exc:
+            await queue.put((True, exc))
+        else:
+            await queue.put((True, None))
+
+    producer = asyncio.create_task(fill())
+    try:
+        while True:
+            finished, value = await queue.get()
+            if finished:
+                if value is not None:
+                    raise value
+                return
+            yield value
+            queue.task_done()
+    finally:
+        producer.cancel()
+        await asyncio.gather(producer, return_exceptions=True)
+
+
+async def stream_bounded(
+    items: Iterable[T],
+    fn: Callable[[T], Awaitable[R]],
+    *,
+    concurrency: int,
+    ordered: bool = True,
+) -> AsyncIterator[R]:
+    """Yield ``fn(item)`` for every item, at most ``concurrency`` calls at a time.
+
+    With ``ordered`` results come back in item order; finished results that
+    are waiting on a slower earlier one count against ``concurrency``, which
+    keeps the buffer bounded. Otherwise each result is yielded as soon as it
+    completes. An exception from ``fn`` cancels the outstanding calls and is
+    raised to the caller.
+    """
+    iterator = enumerate(items)
+    limit = max(1, concurrency)
+    running: dict[asyncio.Future[R], int] = {}
+    ready: dict[int, R] = {}
+    next_index = 0
+    exhausted = False
+    try:
+        while True:
+            while not exhausted and len(running) + len(ready) < limit:
+                try:
+                    index, item = next(iterator)
+                except StopIteration:
+                    exhausted = True
+                    break
+                running[asyncio.ensure_future(fn(item))] = index
+            if next_index in ready:
+                yield ready.pop(next_index)
+                next_index += 1
+                continue
+            if not running:
+                return
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for future in sorted(done, key=running.__getitem__):
+                index = running.pop(future)
+                if ordered:
+                    ready[index] = future.result()
+                else:
+                    yield future.result()
+    finally:
+        for future in running:
+            future.cancel()
+        await asyncio.gather(*running, return_exceptions=True)
+
+
+class StallGuard:
+    """Tells a bulk delete when to stop for lack of progress.
+
+    A run of ``limit`` failed calls with no success in between is an expired
+    session or risk control rather than a few bad items; carrying on would
+    only burn rate-limit budget and still end looking like a finished run.
+    A single failure among successes is recorded by the caller and ignored.
+    """
+
+    def __init__(self, limit: int = STALL_LIMIT) -> None:
+        if limit < 1:
+            raise ValueError("limit must be >= 1")
+        self.limit = limit
+        self.failures = 0
+
+    @property
+    def stalled(self) -> bool:
+        return self.failures >= self.limit
+
+    def record(self, ok: bool) -> None:
+        self.failures = 0 if ok else self.failures + 1
+
+
+async def run_until_stalled(
+    items: AsyncIterable[T],
+    worker: Callable[[T], Awaitable[bool]],
+    guard: StallGuard,
+    *,
+    concurrency: int = WRITE_CONCURRENCY,
+) -> bool:
+    """:func:`run_bounded` for write calls, stopping once ``guard`` stalls.
+
+    ``worker`` returns whether its call landed. No further item is pulled
+    from ``items`` after ``guard`` stalls; a scan feeding ``items`` may also
+    check ``guard.stalled`` to stop listing early. Returns whether the run
+    stopped for lack of progress.
+    """
+
+    async def feed() -> AsyncIterator[T]:
+        source = aiter(items)
+        try:
+            async for item in source:
+                if guard.stalled:
+                    return
+                yield item
+        finally:
+            aclose = getattr(source, "aclose", None)
+            if aclose is not None:
+                await aclose()
+
+    async def work(item: T) -> None:
+        guard.record(await worker(item))
+
+    await run_bounded(feed(), work, concurrency=concurrency)
+    return guard.stalled
@@ -1,20 +1,127 @@
 from __future__ import annotations
 
 import logging
-from collections.abc import AsyncIterator, Sequence
+from collections.abc import AsyncIterator, Callable, Mapping, Sequence
+from contextlib import aclosing
+from dataclasses import dataclass
 from typing import Any
 
 from backend import audit
-from backend.api import DynamicApi
+from backend.api import DynamicApi, cursor_index
 from backend.api.client import BiliApiClient
 
 from ._progress import ItemCallback
 from ._utils import extract_dynamic_id, safe_int
+from ._workers import (
+    ITEM_STALL_LIMIT,
+    WRITE_CONCURRENCY,
+    Settle,
+    StallGuard,
+    prefetch,
+    run_bounded,
+    run_until_stalled,
+)
 
 logger = logging.getLogger(__name__)
 
 MAX_CLEAR_PAGES = 200
 
+TYPE_PREFIX = "DYNAMIC_TYPE_"
+REPOST_TYPE = "DYNAMIC_TYPE_FORWARD"
+
+
+def _module(item: Mapping[str, Any], name: str) -> Mapping[str, Any]:
+    modules = item.get("modules")
+    module = modules.get(name) if isinstance(modules, Mapping) else None
+    return module if isinstance(module, Mapping) else {}
+
+
+def dynamic_type(name: str) -> str:
+    """Upstream's type name for ``forward``, ``av``, ``DYNAMIC_TYPE_DRAW``, ..."""
+    name = name.strip().upper()
+    return name if name.startswith(TYPE_PREFIX) else TYPE_PREFIX + name
+
+
+def dynamic_pub_ts(item: Mapping[str, Any]) -> int | None:
+    return safe_int(_module(item, "module_author").get("pub_ts"))
+
+
+def dynamic_text(item: Mapping[str, Any]) -> str:
+    """The dynamic's own text: the classic ``desc`` or an opus summary."""
+    module = _module(item, "module_dynamic")
+    desc = module.get("desc")
+    if isinstance(desc, Mapping) and desc.get("text"):
+        return str(desc["text"])
+    major = module.get("major")
+    opus = major.get("opus") if isinstance(major, Mapping) else None
+    summary = opus.get("summary") if isinstance(opus, Mapping) else None
+    if isinstance(summary, Mapping) and summary.get("text"):
+        return str(summary["text"])
+    return ""
+
+
+def is_pinned(item: Mapping[str, Any]) -> bool:
+    """A pinned dynamic is listed first whatever its age."""
+    return _module(item, "module_tag").get("text") == "置顶"
+
+
+@dataclass(frozen=True)
+class DynamicFilter:
+    """Which dynamics a predicate clean removes.
+
+    Every criterion that is set must hold; ``after``/``before`` bound
+    ``pub_ts`` as ``after <= pub_ts < before``. ``reposts`` picks reposts
+    (True) or originals (False). A filter with nothing set matches nothing.
+    """
+
+    types: frozenset[str] = frozenset()
+    after: int | None = None
+    before: int | None = None
+    keywords: tuple[str, ...] = ()
+    reposts: bool | None = None
+
+    @property
+    def empty(self) -> bool:
+        return not (
+            self.types
+            or self.after is not None
+            or self.before is not None
+            or self.keywords
+            or self.reposts is not None
+        )
+
+    def __call__(self, item: Mapping[str, Any]) -> bool:
+        if self.empty:
+            return False
+        kind = str(item.get("type") or "")
+        if self.types and kind not in self.types:
+            return False
+        if self.reposts is not None and (kind == REPOST_TYPE) != self.reposts:
+            return False
+        if self.after is not None or self.before is not None:
+            pub_ts = dynamic_pub_ts(item)
+            if pub_ts is None:
+                return False
+            if self.after is not None and pub_ts < self.after:
+                return False
+            if self.before is not None and pub_ts >= self.before:
+                return False
+        if self.keywords:
+            text = dynamic_text(item).casefold()
+            if not any(keyword.casefold() in text for keyword in self.keywords):
+                return False
+        return True
+
+    def past_window(self, item: Mapping[str, Any]) -> bool:
+        """True once the feed, newest first, has gone below ``after``.
+
+        Nothing listed after such an item can match, so the scan can stop.
+        """
+        if self.after is None or is_pinned(item):
+            return False
+        pub_ts = dynamic_pub_ts(item)
+        return pub_ts is not None and pub_ts < self.after
+
 
 class DynamicService:
     def __init__(self, client: BiliApiClient) -> None:
@@ -26,6 +133,39 @@ class DynamicService:
     ) -> dict[str, Any]:
         return await self._api.get_dynamics(mid, offset=offset)
 
+    async def get_page(
+        self,
+        mid: int,
+        page: int,
+        *,
+        on_page: Callable[[int], None] | None = None,
+    ) -> dict[str, Any] | None:
+        """Page ``page`` (1-based) of ``mid``'s feed, or None past the end.
+
+        Resumes from the nearest ``offset`` the cursor index knows instead of
+        walking from the top; every page walked through is recorded.
+        """
+
+        async def fetch(offset: str | None) -> tuple[dict[str, Any], str | None]:
+            data = await self._api.get_dynamics(mid, offset=offset)
+            next_offset = data.get("offset")
+            if not data.get("has_more") or not next_offset or next_offset == offset:
+                return data, None
+            return data, str(next_offset)
+
+        return await cursor_index.seek(
+            self._client, ("dynamics", mid), page, fetch, on_page=on_page
+        )
+
+    async def warm_index(
+        self, mid: int, pages: int, *, on_page: Callable[[int], None] | None = None
+    ) -> dict[str, Any]:
+        """Record the boundaries of the first ``pages`` pages ahead of time."""
+        found = await self.get_page(mid, pages, on_page=on_page)
+        index = cursor_index.get_cursor_index()
+        known = index.known_pages(self._client.owner, ("dynamics", mid))
+        return {"pages": known, "ended": found is None}
+
     async def iter_all(self, mid: int) -> AsyncIterator[dict[str, Any]]:
         offset: str | None = None
         safety = 0
@@ -47,87 +187,197 @@ class DynamicService:
                 logger.warning("iter_all reached safety limit on mid %s", mid)
                 return
 
+    async def _delete(
+        self,
+        dynamic_id: int,
+        errors: list[dict[str, Any]],
+        on_item: ItemCallback | None,
+    ) -> bool:
+        try:
+            await self._api.delete_dynamic(dynamic_id)
+        except Exception as exc:
+            err = {"id": dynamic_id, "type": type(exc).__name__, "message": str(exc)}
+            errors.append(err)
+            logger.warning("Failed to delete dynamic id=%s: %s", dynamic_id, exc)
+            audit.record("dynamic.delete", dynamic_id, ok=False, error=str(exc))
+            if on_item is not None:
+                on_item(dynamic_id, False, err)
+            return False
+        audit.record("dynamic.delete", dynamic_id, ok=True)
+        if on_item is not None:
+            on_item(dynamic_id, True, None)
+        return True
+
+    async def _delete_all(
+        self,
+        ids: Sequence[int],
+        errors: list[dict[str, Any]],
+        on_item: ItemCallback | None,
+        concurrency: int,
+    ) -> int:
+        ok = 0
+
+        async def one(dynamic_id: int) -> None:
+            nonlocal ok
+            if await self._delete(dynamic_id, errors, on_item):
+                ok += 1
+
+        await run_bounded(ids, one, concurrency=concurrency)
+        return ok
+
     async def delete_many(
         self,
         ids: Sequence[int | str],
         *,
         on_item: ItemCallback | None = None,
+        concurrency: int = WRITE_CONCURRENCY,
     ) -> dict[str, Any]:
-        ok = 0
         errors: list[dict[str, Any]] = []
+        valid: list[int] = []
         for raw in ids:
             dynamic_id = safe_int(raw)
             if dynamic_id is None:
                 errors.append({"id": str(raw), "type": "ValueError", "message": "invalid id"})
                 continue
-            try:
-                await self._api.delete_dynamic(dynamic_id)
-                ok += 1
-                audit.record("dynamic.delete", dynamic_id, ok=True)
-                if on_item is not None:
-                    on_item(dynamic_id, True, None)
-            except Exception as exc:
-                err = {"id": dynamic_id, "type": type(exc).__name__, "message": str(exc)}
-                errors.append(err)
-                logger.warning("Failed to delete dynamic id=%s: %s", dynamic_id, exc)
-                audit.record("dynamic.delete", dynamic_id, ok=False, error=str(exc))
-                if on_item is not None:
-                    on_item(dynamic_id, False, err)
+            valid.append(dynamic_id)
+        ok = await self._delete_all(valid, errors, on_item, concurrency)
         return {"ok": ok, "errors": errors, "total": len(ids)}
 
+    async def clean_matching(
+        self,
+        mid: int,
+        predicate: DynamicFilter,
+        *,
+        dry_run: bool = False,
+        on_item: ItemCallback | None = None,
+        concurrency: int = WRITE_CONCURRENCY,
+    ) -> dict[str, Any]:
+        """Delete every dynamic of ``mid`` that ``predicate`` matches.
+
+        Matches are deleted as the scan finds them; the offset cursor does
+        not move when listed items go away. The feed is newest first, so a
+        scan with ``predicate.after`` stops at the first (unpinned) dynamic
+        older than that, and the requests made stay proportional to the
+        window rather than to the whole history. With ``dry_run`` nothing is
+        deleted and the matches are returned.
+        """
+        ok = 0
+        errors: list[dict[str, Any]] = []
+        found: list[dict[str, Any]] = []
+        scanned = matched = 0
+        guard = StallGuard(ITEM_STALL_LIMIT)
+        ended_early = False
+
+        async def matches() -> AsyncIterator[int]:
+            nonlocal scanned, matched, ended_early
+            async with aclosing(self.iter_all(mid)) as items:
+                async for item in items:
+                    if guard.stalled:
+                        return
+                    if predicate.past_window(item):
+                        ended_early = True
+                        return
+                    scanned += 1
+                    dynamic_id = extract_dynamic_id(item)
+                    if dynamic_id is None or not predicate(item):
+                        continue
+                    matched += 1
+                    if dry_run:
+                        found.append(
+                            {
+                                "id": dynamic_id,
+                                "type": item.get("type"),
+                                "pub_ts": dynamic_pub_ts(item),
+                                "text": dynamic_text(item)[:100],
+                            }
+                        )
+                        continue
+                    yield dynamic_id
+
+        async def delete(dynamic_id: int) -> bool:
+            nonlocal ok
+            if not await self._delete(dynamic_id, errors, on_item):
+                return False
+            ok += 1
+            return True
+
+        stalled = await run_until_stalled(matches(), delete, guard, concurrency=concurrency)
+        result: dict[str, Any] = {
+            "ok": ok,
+            "errors": errors,
+            "scanned": scanned,
+            "matched": matched,
+            "ended_early": ended_early,
+        }
+        if dry_run:
+            result["matches"] = found
+        if stalled:
+            logger.warning(
+                "Stopped dynamic clean for mid=%s after %s deletes in a row failed",
+                mid,
+                guard.failures,
+            )
+            result["stopped_reason"] = "no_progress"
+        return result
+
     async def clear_all(
-        self, mid: int, *, on_item: ItemCallback | None = None
+        self,
+        mid: int,
+        *,
+        on_item: ItemCallback | None = None,
+        concurrency: int = WRITE_CONCURRENCY,
     ) -> dict[str, Any]:
         ok = 0
         errors: list[dict[str, Any]] = []
-        offset: str | None = None
-        safety = 0
-        while True:
-            data = await self._api.get_dynamics(mid, offset=offset)
-            items = data.get("items") if isinstance(data, dict) else None
-            if not isinstance(items, list) or not items:
-                break
-            page_ok = 0
-            page_attempted = 0
-            for item in items:
-                dynamic_id = extract_dynamic_id(item) if isinstance(item, dict) else None
-                if dynamic_id is None:
-                    continue
-                page_attempted += 1
-                try:
-                    await self._api.delete_dynamic(dynamic_id)
-                    ok += 1
-                    page_ok += 1
-                    audit.record("dynamic.delete", dynamic_id, ok=True)
-                    if on_item is not None:
-                        on_item(dynamic_id, True, None)
-                except Exception as exc:
-                    err = {"id": dynamic_id, "type": type(exc).__name__, "message": str(exc)}
-                    errors.append(err)
-                    logger.warning("Failed to delete dynamic id=%s: %s", dynamic_id, exc)
-                    audit.record("dynamic.delete", dynamic_id, ok=False, error=str(exc))
-                    if on_item is not None:
-                        on_item(dynamic_id, False, err)
-            if page_attempted and page_ok == 0:
-                # Every delete on this page failed — almost always an expired
-                # session or risk control. Retrying the next page would just
-                # burn rate-limit budget and still report success.
-                logger.warning(
-                    "Stopped dynamic clear_all for mid=%s after a page made no progress",
-                    mid,
-                )
-                return {"ok": ok, "errors": errors, "stopped_reason": "no_progress"}
-            has_more = bool(data.get("has_more")) if isinstance(data, dict) else False
-            next_offset = data.get("offset") if isinstance(data, dict) else None
-            if not has_more or not next_offset or next_offset == offset:
-                break
-            offset = str(next_offset)
-            safety += 1
-            if safety > MAX_CLEAR_PAGES:
-                logger.warning(
-                    "dynamic clear_all for mid=%s hit the %s-page safety limit",
-                    mid,
-                    MAX_CLEAR_PAGES,
-                )
-                return {"ok": ok, "errors": errors, "stopped_reason": "page_limit"}
+        page_limited = False
+
+        async def batches(settle: Settle) -> AsyncIterator[list[int]]:
+            # The offset cursor is the last id on the page, so deleting the
+            # page does not move the next one: it can be listed straight away.
+            nonlocal page_limited
+            offset: str | None = None
+            safety = 0
+            while True:
+                data = await self._api.get_dynamics(mid, offset=offset)
+                items = data.get("items") if isinstance(data, dict) else None
+                if not isinstance(items, list) or not items:
+                    return
+                ids = [
+                    dynamic_id
+                    for item in items
+                    if isinstance(item, dict)
+                    and (dynamic_id := extract_dynamic_id(item)) is not None
+                ]
+                if ids:
+                    yield ids
+                has_more = bool(data.get("has_more")) if isinstance(data, dict) else False
+                next_offset = data.get("offset") if isinstance(data, dict) else None
+                if not has_more or not next_offset or next_offset == offset:
+                    return
+                offset = str(next_offset)
+                safety += 1
+                if safety > MAX_CLEAR_PAGES:
+                    page_limited = True
+                    return
+
+        async with aclosing(prefetch(batches)) as pages:
+            async for ids in pages:
+                page_ok = await self._delete_all(ids, errors, on_item, concurrency)
+                ok += page_ok
+                if page_ok == 0:
+                    # Every delete on this page failed — almost always an expired
+                    # session or risk control. Retrying the next page would just
+                    # burn rate-limit budget and still report success.
+                    logger.warning(
+                        "Stopped dynamic clear_all for mid=%s after a page made no progress",
+                        mid,
+                    )
+                    return {"ok": ok, "errors": errors, "stopped_reason": "no_progress"}
+        if page_limited:
+            logger.warning(
+                "dynamic clear_all for mid=%s hit the %s-page safety limit",
+                mid,
+                MAX_CLEAR_PAGES,
+            )
+            return {"ok": ok, "errors": errors, "stopped_reason": "page_limit"}
         return {"ok": ok, "errors": errors}
@@ -1,26 +1,119 @@
 from __future__ import annotations
 
+import asyncio
 import logging
-from collections.abc import AsyncIterator, Mapping, Sequence
+import time
+from collections.abc import AsyncIterator, Callable, Iterable, Mapping, Sequence
+from contextlib import aclosing
+from dataclasses import dataclass
 from typing import Any
 
 from backend import audit
 from backend.api import FavoriteApi
 from backend.api.client import BiliApiClient
 
-from ._progress import BatchCallback
-from ._utils import chunked, safe_int
+from ._batching import BatchSizer, is_fatal_error, is_item_error
+from ._progress import BatchCallback, FolderCallback
+from ._utils import safe_int
+from ._workers import (
+    WRITE_CONCURRENCY,
+    Settle,
+    StallGuard,
+    prefetch,
+    run_bounded,
+    stream_bounded,
+)
 
 logger = logging.getLogger(__name__)
 
+# Folders paged at once by a predicate clean. Listing is read-only and cheap,
+# but every page still draws on the same rate limit as the deletes.
+SCAN_CONCURRENCY = 3
+
+# What B 站 shows in place of a favorite whose video is gone.
+INVALID_TITLE = "已失效视频"
+
+
+def is_default_folder(folder: Mapping[str, Any]) -> bool:
+    """True for the account's default folder, which upstream never deletes.
+
+    Bit 1 of ``attr`` is clear only on the default folder. A folder without a
+    readable ``attr`` is treated as the default, so it is emptied rather than
+    deleted.
+    """
+    attr = safe_int(folder.get("attr"))
+    return attr is None or not attr & 2
+
+
+def is_invalid_item(item: Mapping[str, Any]) -> bool:
+    """True for a favorite whose video was deleted or taken down.
+
+    Upstream sets bit 0 of ``attr`` on those (1: removed by review, 9: deleted
+    by the uploader) and replaces the title.
+    """
+    attr = safe_int(item.get("attr"))
+    return bool(attr and attr & 1) or item.get("title") == INVALID_TITLE
+
+
+@dataclass(frozen=True)
+class FavoriteFilter:
+    """Which favorites a predicate clean removes.
+
+    Every criterion that is set must hold; one that is left at its default
+    does not narrow the match. A filter with nothing set matches nothing, so
+    a forgotten criterion never turns into "delete everything".
+    """
+
+    invalid: bool = False
+    uploaders: frozenset[int] = frozenset()
+    favorited_before: int | None = None
+    keywords: tuple[str, ...] = ()
+
+    @property
+    def empty(self) -> bool:
+        return not (
+            self.invalid or self.uploaders or self.favorited_before is not None or self.keywords
+        )
+
+    def __call__(self, item: Mapping[str, Any]) -> bool:
+        if self.empty:
+            return False
+        if self.invalid and not is_invalid_item(item):
+            return False
+        if self.uploaders:
+            upper = item.get("upper")
+            if not isinstance(upper, Mapping) or safe_int(upper.get("mid")) not in self.uploaders:
+                return False
+        if self.favorited_before is not None:
+            fav_time = safe_int(item.get("fav_time"))
+            if fav_time is None or fav_time >= self.favorited_before:
+                return False
+        if self.keywords:
+            title = str(item.get("title") or "").casefold()
+            if not any(keyword.casefold() in title for keyword in self.keywords):
+                return False
+        return True
+
+
+@dataclass
+class _FolderTally:
+    total: int
+    done: int = 0
+    ok: int = 0
+    rejected: int = 0
+
+    @property
+    def finished(self) -> bool:
+        return self.done == self.total
+
 
 class FavoriteService:
     def __init__(self, client: BiliApiClient) -> None:
         self._client = client
         self._api = FavoriteApi(client)
 
-    async def list_folders(self, mid: int) -> list[dict[str, Any]]:
-        data = await self._api.get_folders(mid)
+    async def list_folders(self, mid: int, *, fresh: bool = False) -> list[dict[str, Any]]:
+        data = await self._api.get_folders(mid, fresh=fresh)
         folders = data.get("list") if isinstance(data, dict) else None
         return [f for f in folders if isinstance(f, dict)] if isinstance(folders, list) else []
 
@@ -42,12 +135,15 @@ class FavoriteService:
         media_id: int,
         *,
         page_size: int = 20,
+        keyword: str = "",
         order: str = "mtime",
     ) -> AsyncIterator[dict[str, Any]]:
         page = 1
         safety = 0
         while True:
-            data = await self.list_items(media_id, page=page, page_size=page_size, order=order)
+            data = await self.list_items(
+                media_id, page=page, page_size=page_size, keyword=keyword, order=order
+            )
             medias = data.get("medias") if isinstance(data, dict) else None
             if not isinstance(medias, list) or not medias:
                 return
@@ -62,6 +158,74 @@ class FavoriteService:
                 logger.warning("iter_items reached safety limit on folder %s", media_id)
                 return
 
+    async def folder_ids(self, mid: int) -> list[int]:
+        """Ids of ``mid``'s folders that may hold items, in listing order."""
+        media_ids: list[int] = []
+        for folder in await self.list_folders(mid):
+            media_id = safe_int(folder.get("id") or folder.get("media_id"))
+            if media_id is not None and safe_int(folder.get("media_count")) != 0:
+                media_ids.append(media_id)
+        return media_ids
+
+    async def search(
+        self,
+        mid: int,
+        keyword: str,
+        *,
+        media_ids: Iterable[int] | None = None,
+        limit: int | None = None,
+        concurrency: int = SCAN_CONCURRENCY,
+    ) -> AsyncIterator[dict[str, Any]]:
+        """Yield the items of every folder matching ``keyword``.
+
+        Folders (all of ``mid``'s, or just ``media_ids``) are searched
+        ``concurrency`` at a time and each folder's hits are yielded as soon
+        as it has been paged through, so results arrive in completion order.
+        An item saved in several folders is yielded once, with the
+        ``media_id`` of the folder it was first found in. Pages go through the
+        response cache, so repeating a search shortly after is free.
+
+        A dead session or a risk cooldown ends the search with that error.
+        Any other folder failure is logged, and once every other folder has
+        been searched the stream ends with one ``{"error", "media_id"}``
+        record per failed folder, so a reader can tell the results are
+        incomplete.
+        """
+        folders = await self.folder_ids(mid) if media_ids is None else list(media_ids)
+
+        async def search_folder(
+            media_id: int,
+        ) -> tuple[int, list[dict[str, Any]], Exception | None]:
+            hits: list[dict[str, Any]] = []
+            try:
+                async for item in self.iter_items(media_id, keyword=keyword):
+                    hits.append(item)
+            except Exception as exc:
+                if is_fatal_error(exc):
+                    raise
+                logger.warning("Failed to search favorite folder %s: %s", media_id, exc)
+                return media_id, hits, exc
+            return media_id, hits, None
+
+        seen: set[tuple[Any, Any]] = set()
+        failures: list[dict[str, Any]] = []
+        searches = stream_bounded(folders, search_folder, concurrency=concurrency, ordered=False)
+        async with aclosing(searches):
+            async for media_id, hits, error in searches:
+                if error is not None:
+                    failures.append({"error": str(error), "media_id": media_id})
+                    continue
+                for item in hits:
+                    key = (item.get("id"), item.get("type", 2))
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                    yield {**item, "media_id": media_id}
+                    if limit is not None and len(seen) >= limit:
+                        return
+        for failure in failures:
+            yield failure
+
     async def delete_resources(
         self,
         media_id: int,
@@ -88,79 +252,403 @@ class FavoriteService:
                 formatted.append(f"{rid}:{rtype}")
         ok = 0
         errors: list[dict[str, Any]] = []
-        for batch in chunked(formatted, 100):
-            try:
-                await self._api.batch_delete(media_id, batch)
-                ok += len(batch)
-                audit.record("favorite.delete", batch, ok=True, media_id=media_id)
-                if on_batch is not None:
-                    on_batch(media_id, batch, None)
-            except Exception as exc:
-                err = {"media_id": media_id, "type": type(exc).__name__, "message": str(exc)}
-                errors.append(err)
-                logger.warning(
-                    "Failed to delete %s item(s) from folder %s: %s", len(batch), media_id, exc
-                )
-                audit.record("favorite.delete", batch, ok=False, error=str(exc), media_id=media_id)
-                if on_batch is not None:
-                    on_batch(media_id, batch, err)
+        sizer = BatchSizer()
+        pending = formatted
+        while pending:
+            batch, pending = pending[: sizer.size], pending[sizer.size :]
+            deleted, _ = await self._delete_batch(media_id, batch, errors, on_batch, sizer)
+            ok += deleted
         return {"ok": ok, "errors": errors, "total": len(formatted)}
 
+    async def _delete_batch(
+        self,
+        media_id: int,
+        batch: list[str],
+        errors: list[dict[str, Any]],
+        on_batch: BatchCallback | None,
+        sizer: BatchSizer | None = None,
+    ) -> tuple[int, int]:
+        """Delete ``batch``, bisecting it if upstream refuses some of its items.
+
+        Returns ``(deleted, rejected)``, where ``rejected`` counts items
+        isolated as refused on their own rather than lost to a failure of
+        the whole request. ``sizer`` hears about this call only, not about
+        the halves it is split into.
+        """
+        start = time.monotonic()
+        try:
+            await self._api.batch_delete(media_id, batch)
+        except Exception as exc:
+            if sizer is not None:
+                sizer.record(False, time.monotonic() - start)
+            item_error = is_item_error(exc)
+            if item_error and len(batch) > 1:
+                half = len(batch) // 2
+                left = await self._delete_batch(media_id, batch[:half], errors, on_batch)
+                right = await self._delete_batch(media_id, batch[half:], errors, on_batch)
+                return left[0] + right[0], left[1] + right[1]
+            err = {"media_id": media_id, "type": type(exc).__name__, "message": str(exc)}
+            if item_error:
+                err["resource"] = batch[0]
+            errors.append(err)
+            logger.warning(
+                "Failed to delete %s item(s) from folder %s: %s", len(batch), media_id, exc
+            )
+            audit.record("favorite.delete", batch, ok=False, error=str(exc), media_id=media_id)
+            if on_batch is not None:
+                on_batch(media_id, batch, err)
+            return 0, len(batch) if item_error else 0
+        if sizer is not None:
+            sizer.record(True, time.monotonic() - start)
+        audit.record("favorite.delete", batch, ok=True, media_id=media_id)
+        if on_batch is not None:
+            on_batch(media_id, batch, None)
+        return len(batch), 0
+
     async def clear_all(
         self,
         mid: int,
         *,
         on_batch: BatchCallback | None = None,
+        on_folder: FolderCallback | None = None,
+        concurrency: int = WRITE_CONCURRENCY,
+        delete_folders: bool = False,
     ) -> dict[str, Any]:
-        total_ok = 0
+        """Empty every folder ``mid`` created.
+
+        Folder contents are listed one folder ahead of the deletes, and
+        batches from different folders share ``concurrency`` workers, so a
+        small folder no longer leaves the pipeline idle. Folders the listing
+        already reports as empty are skipped without an ``ids`` call.
+
+        With ``delete_folders`` every folder except the default one is
+        deleted outright, one request per folder, and ``on_folder`` is called
+        instead of ``on_batch`` for those. Only the default folder, which
+        cannot be deleted, is emptied item by item. A folder that cannot be
+        deleted is reported in ``errors`` and the rest go on; only
+        ``STALL_LIMIT`` failures in a row stop the run.
+        """
         errors: list[dict[str, Any]] = []
-        folders = await self.list_folders(mid)
-        for folder in folders:
+        total_ok = 0
+        media_ids: list[int] = []
+        doomed: list[tuple[int, int]] = []
+        for folder in await self.list_folders(mid, fresh=True):
             media_id = safe_int(folder.get("id") or folder.get("media_id"))
             if media_id is None:
                 continue
-            resource_ids = await self._api.get_folder_ids(media_id)
-            if not resource_ids:
-                continue
-            resources = [f"{item}:2" for item in resource_ids]
-            folder_ok = 0
-            folder_batches = 0
-            for batch in chunked(resources, 100):
-                folder_batches += 1
-                try:
-                    await self._api.batch_delete(media_id, batch)
-                    total_ok += len(batch)
-                    folder_ok += len(batch)
-                    audit.record("favorite.delete", batch, ok=True, media_id=media_id)
-                    if on_batch is not None:
-                        on_batch(media_id, batch, None)
-                except Exception as exc:
-                    err = {
-                        "media_id": media_id,
-                        "type": type(exc).__name__,
-                        "message": str(exc),
-                    }
-                    errors.append(err)
-                    logger.warning(
-                        "Failed to delete %s item(s) from folder %s: %s",
-                        len(batch),
-                        media_id,
-                        exc,
-                    )
-                    audit.record(
-                        "favorite.delete", batch, ok=False, error=str(exc), media_id=media_id
-                    )
-                    if on_batch is not None:
-                        on_batch(media_id, batch, err)
-            if folder_batches and folder_ok == 0:
-                # Nothing in this folder could be deleted — an expired session or
-                # risk control, not a folder-specific problem. Continuing through
-                # the remaining folders would burn rate-limit budget and still
-                # report a clean run, so stop and say why.
+            count = safe_int(folder.get("media_count"))
+            if delete_folders and not is_default_folder(folder):
+                doomed.append((media_id, count or 0))
+            elif count != 0:
+                media_ids.append(media_id)
+
+        folders_deleted = 0
+        guard = StallGuard()
+        for media_id, count in doomed:
+            # One refused folder says nothing about the session; only a run
+            # of refusals with nothing deleted in between does.
+            ok = await self._delete_folder(media_id, count, errors, on_folder)
+            guard.record(ok)
+            if ok:
+                folders_deleted += 1
+                total_ok += count
+            elif guard.stalled:
                 logger.warning(
-                    "Stopped favorite clear_all for mid=%s: folder %s made no progress",
+                    "Stopped favorite clear_all for mid=%s: %s folder deletes in a row failed",
                     mid,
-                    media_id,
+                    guard.failures,
                 )
-                return {"ok": total_ok, "errors": errors, "stopped_reason": "no_progress"}
-        return {"ok": total_ok, "errors": errors}
+                break
+        stopped = guard.stalled
+
+        async def listed(settle: Settle) -> AsyncIterator[tuple[int, list[str]]]:
+            for media_id in media_ids:
+                resource_ids = await self._api.get_folder_ids(media_id)
+                yield media_id, [f"{item}:2" for item in resource_ids]
+
+        if not stopped:
+            deleted, stopped = await self._delete_stream(
+                prefetch(listed),
+                errors,
+                on_batch=on_batch,
+                concurrency=concurrency,
+                proven=folders_deleted > 0,
+                label=f"clear_all for mid={mid}",
+            )
+            total_ok += deleted
+        result: dict[str, Any] = {"ok": total_ok, "errors": errors}
+        if delete_folders:
+            result["folders_deleted"] = folders_deleted
+        if stopped:
+            result["stopped_reason"] = "no_progress"
+        return result
+
+    async def clean_matching(
+        self,
+        mid: int,
+        predicate: Callable[[Mapping[str, Any]], bool],
+        *,
+        media_ids: Iterable[int] | None = None,
+        dry_run: bool = False,
+        on_batch: BatchCallback | None = None,
+        concurrency: int = WRITE_CONCURRENCY,
+        scan_concurrency: int = SCAN_CONCURRENCY,
+    ) -> dict[str, Any]:
+        """Delete every favorite of ``mid`` for which ``predicate(item)`` holds.
+
+        Folders (all of ``mid``'s, or just ``media_ids``) are paged through
+        :meth:`iter_items` ``scan_concurrency`` at a time. A folder's matches
+        are deleted once its scan is done, since deleting mid-scan would shift
+        the pages still to be read, while other folders carry on scanning.
+        With ``dry_run`` nothing is deleted and the matches are returned.
+        """
+        errors: list[dict[str, Any]] = []
+        found: list[dict[str, Any]] = []
+        scanned = matched = 0
+        folders = await self.folder_ids(mid)
+        if media_ids is not None:
+            wanted = set(media_ids)
+            folders = [media_id for media_id in folders if media_id in wanted]
+
+        async def scan(media_id: int) -> tuple[int, list[str]]:
+            nonlocal scanned, matched
+            hits: list[str] = []
+            try:
+                async for item in self.iter_items(media_id):
+                    scanned += 1
+                    rid = item.get("id")
+                    if rid is None or not predicate(item):
+                        continue
+                    rtype = item.get("type", 2)
+                    hits.append(f"{rid}:{rtype}")
+                    if dry_run:
+                        found.append(
+                            {
+                                "media_id": media_id,
+                                "id": rid,
+                                "type": rtype,
+                                "title": item.get("title"),
+                            }
+                        )
+            except Exception as exc:
+                if is_fatal_error(exc):
+                    # Every other folder would fail the same way; fail the
+                    # run instead of reporting it complete.
+                    raise
+                # Whatever matched before the failure is still worth deleting.
+                errors.append(
+                    {"media_id": media_id, "type": type(exc).__name__, "message": str(exc)}
+                )
+                logger.warning("Failed to scan favorite folder %s: %s", media_id, exc)
+            matched += len(hits)
+            return media_id, hits
+
+        async def matches() -> AsyncIterator[tuple[int, list[str]]]:
+            scans = stream_bounded(folders, scan, concurrency=scan_concurrency, ordered=False)
+            async with aclosing(scans):
+                async for media_id, hits in scans:
+                    if hits and not dry_run:
+                        yield media_id, hits
+
+        deleted, stopped = await self._delete_stream(
+            matches(),
+            errors,
+            on_batch=on_batch,
+            concurrency=concurrency,
+            label=f"clean for mid={mid}",
+        )
+        result: dict[str, Any] = {
+            "ok": deleted,
+            "errors": errors,
+            "scanned": scanned,
+            "matched": matched,
+        }
+        if dry_run:
+            result["matches"] = found
+        if stopped:
+            result["stopped_reason"] = "no_progress"
+        return result
+
+    async def find_duplicates(
+        self,
+        mid: int,
+        *,
+        delete: bool = False,
+        on_batch: BatchCallback | None = None,
+        concurrency: int = WRITE_CONCURRENCY,
+        scan_concurrency: int = SCAN_CONCURRENCY,
+    ) -> dict[str, Any]:
+        """Find videos saved in more than one of ``mid``'s folders.
+
+        The index (resource id -> folders) is built from one ``ids`` call per
+        folder, ``scan_concurrency`` at a time, instead of paging item
+        metadata. ``duplicates`` lists each such video with its folders in
+        listing order. With ``delete`` the first copy is kept and the others
+        are removed through batched deletes.
+        """
+        errors: list[dict[str, Any]] = []
+        folders = await self.folder_ids(mid)
+
+        async def list_ids(media_id: int) -> tuple[int, list[int]]:
+            try:
+                return media_id, await self._api.get_folder_ids(media_id)
+            except Exception as exc:
+                if is_fatal_error(exc):
+                    # Every folder would come back empty; an index of nothing
+                    # would report "no duplicates" as if it were true.
+                    raise
+                # A folder we could not read holds no copy we would delete.
+                errors.append(
+                    {"media_id": media_id, "type": type(exc).__name__, "message": str(exc)}
+                )
+                logger.warning("Failed to list favorite folder %s: %s", media_id, exc)
+                return media_id, []
+
+        index: dict[int, list[int]] = {}
+        listed = stream_bounded(folders, list_ids, concurrency=scan_concurrency, ordered=True)
+        async with aclosing(listed):
+            async for media_id, resource_ids in listed:
+                for rid in dict.fromkeys(resource_ids):
+                    index.setdefault(rid, []).append(media_id)
+        duplicates = [
+            {"id": rid, "media_ids": media_ids}
+            for rid, media_ids in index.items()
+            if len(media_ids) > 1
+        ]
+        result: dict[str, Any] = {
+            "ok": 0,
+            "errors": errors,
+            "scanned_folders": len(folders),
+            "resources": len(index),
+            "duplicates": duplicates,
+            "removable": sum(len(d["media_ids"]) - 1 for d in duplicates),
+        }
+        if not delete or not duplicates:
+            return result
+
+        extra: dict[int, list[str]] = {}
+        for dup in duplicates:
+            for media_id in dup["media_ids"][1:]:
+                extra.setdefault(media_id, []).append(f"{dup['id']}:2")
+
+        async def doomed() -> AsyncIterator[tuple[int, list[str]]]:
+            for media_id in folders:
+                if media_id in extra:
+                    yield media_id, extra[media_id]
+
+        deleted, stopped = await self._delete_stream(
+            doomed(),
+            errors,
+            on_batch=on_batch,
+            concurrency=concurrency,
+            label=f"dedupe for mid={mid}",
+        )
+        result["ok"] = deleted
+        if stopped:
+            result["stopped_reason"] = "no_progress"
+        return result
+
+    async def _delete_stream(
+        self,
+        folders: AsyncIterator[tuple[int, list[str]]],
+        errors: list[dict[str, Any]],
+        *,
+        on_batch: BatchCallback | None,
+        concurrency: int,
+        proven: bool = False,
+        label: str,
+    ) -> tuple[int, bool]:
+        """Delete each ``(media_id, resources)`` pair ``folders`` yields.
+
+        Batches from different folders share ``concurrency`` workers. Until
+        one batch has landed (or ``proven`` says something already did),
+        batches go out one at a time: if the session is dead, that costs a
+        single request rather than a burst. Returns ``(deleted, stopped)``;
+        ``folders`` is closed on return.
+        """
+        total_ok = 0
+        stopped: list[int] = []
+        in_flight = 0
+        idle = asyncio.Event()
+        idle.set()
+        sizer = BatchSizer()
+
+        async def batches() -> AsyncIterator[tuple[int, list[str], _FolderTally]]:
+            nonlocal in_flight
+            async with aclosing(folders):
+                async for media_id, resources in folders:
+                    pending = resources
+                    tally = _FolderTally(total=len(pending))
+                    while pending:
+                        if not (proven or total_ok):
+                            await idle.wait()
+                        if stopped:
+                            return
+                        # Sized when handed out, so it reflects every batch
+                        # that has come back so far.
+                        batch, pending = pending[: sizer.size], pending[sizer.size :]
+                        in_flight += 1
+                        idle.clear()
+                        yield media_id, batch, tally
+
+        async def delete(unit: tuple[int, list[str], _FolderTally]) -> None:
+            nonlocal in_flight, total_ok
+            media_id, batch, tally = unit
+            try:
+                deleted, rejected = await self._delete_batch(
+                    media_id, batch, errors, on_batch, sizer
+                )
+                total_ok += deleted
+                tally.ok += deleted
+                tally.rejected += rejected
+                tally.done += len(batch)
+                if tally.finished and not tally.ok and not stopped:
+                    # Nothing in this folder could be deleted — an expired
+                    # session or risk control, not a folder-specific problem.
+                    # Continuing through the remaining folders would burn
+                    # rate-limit budget and still report a clean run, so stop
+                    # and say why. A folder whose every item was refused on
+                    # its own says nothing about the session, so go on.
+                    if tally.rejected == tally.total:
+                        return
+                    logger.warning(
+                        "Stopped favorite %s: folder %s made no progress", label, media_id
+                    )
+                    stopped.append(media_id)
+            finally:
+                in_flight -= 1
+                if not in_flight:
+                    idle.set()
+
+        await run_bounded(batches(), delete, concurrency=concurrency)
+        return total_ok, bool(stopped)
+
+    async def _delete_folder(
+        self,
+        media_id: int,
+        count: int,
+        errors: list[dict[str, Any]],
+        on_folder: FolderCallback | None,
+    ) -> bool:
+        # The count comes from the listing taken before the delete; afterwards
+        # there is nothing left to count.
+        try:
+            await self._api.delete_folders([media_id])
+        except Exception as exc:
+            err = {"media_id": media_id, "type": type(exc).__name__, "message": str(exc)}
+            errors.append(err)
+            logger.warning("Failed to delete folder %s: %s", media_id, exc)
+            audit.record(
+                "favorite.delete_folder",
+                media_id,
+                ok=False,
+                error=str(exc),
+                media_count=count,
+            )
+            if on_folder is not None:
+                on_folder(media_id, count, err)
+            return False
+        audit.record("favorite.delete_folder", media_id, ok=True, media_count=count)
+        if on_folder is not None:
+            on_folder(media_id, count, None)
+        return True
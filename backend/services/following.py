@@ -2,19 +2,56 @@ from __future__ import annotations
 
 import asyncio
 import logging
-from collections.abc import AsyncIterator, Sequence
+from collections.abc import AsyncIterator, Awaitable, Callable, Collection, Iterable, Sequence
+from contextlib import aclosing
 from typing import Any
 
 from backend import audit
 from backend.api import RelationApi, UserApi
 from backend.api.client import BiliApiClient, BiliApiError
+from backend.api.retry import is_transient_error, sleep_backoff
 
 from ._progress import ItemCallback
-from ._utils import extract_following_mids
+from ._utils import extract_following_mids, safe_int
+from ._workers import WRITE_CONCURRENCY, Settle, prefetch, run_bounded, stream_bounded
+from .profile_cache import MISSING_CODES, ProfileCache, get_profile_cache
 
 logger = logging.getLogger(__name__)
 
 MAX_CLEAR_PAGES = 200
+CLEAR_PAGE_SIZE = 50
+MAX_LIST_PAGES = 500
+
+# Listing pages fetched at once by ``iter_all``; the limiter still sets the pace.
+PAGE_CONCURRENCY = 4
+# Extra attempts for a page whose request was dropped (transport error, 5xx).
+PAGE_RETRIES = 2
+PAGE_RETRY_DELAY = 0.5
+
+# What ``get_detail`` can return; ``latest_video`` and ``video_count`` share
+# one upstream call.
+DETAIL_FIELDS = ("info", "stat", "latest_video", "video_count")
+
+
+def parse_detail_fields(raw: str | None) -> tuple[str, ...]:
+    """``"info,stat"`` -> ``("info", "stat")``; empty or None means all fields."""
+    if not raw or not raw.strip():
+        return DETAIL_FIELDS
+    wanted = {part.strip() for part in raw.split(",") if part.strip()}
+    unknown = wanted - set(DETAIL_FIELDS)
+    if unknown:
+        raise ValueError(
+            f"unknown detail fields: {', '.join(sorted(unknown))} "
+            f"(choose from {', '.join(DETAIL_FIELDS)})"
+        )
+    return tuple(f for f in DETAIL_FIELDS if f in wanted)
+
+
+def _page_items(data: dict[str, Any]) -> list[dict[str, Any]]:
+    items = data.get("list")
+    if not isinstance(items, list):
+        return []
+    return [item for item in items if isinstance(item, dict)]
 
 
 class FollowingService:
@@ -43,53 +80,176 @@ class FollowingService:
         page_size: int = 50,
         order: str = "desc",
         order_type: str = "attention",
+        concurrency: int = PAGE_CONCURRENCY,
+        ordered: bool = True,
     ) -> AsyncIterator[dict[str, Any]]:
-        """Yield each following item across all pages."""
-        page = 1
-        safety = 0
-        while True:
-            data = await self._relation_api.get_followings(
-                mid, pn=page, ps=page_size, order=order, order_type=order_type
+        """Yield each following item across all pages.
+
+        Page 1 carries ``total``, so the remaining page numbers are known up
+        front and fetched ``concurrency`` at a time under the rate limiter.
+        With ``ordered=False`` each page is yielded as soon as it arrives.
+        Without a usable ``total`` (or with ``concurrency=1``) pages are read
+        one after another until a short one.
+        """
+        data = await self._fetch_page(mid, 1, page_size, order, order_type)
+        first = _page_items(data)
+        for item in first:
+            yield item
+        if len(first) < page_size:
+            return
+        total = safe_int(data.get("total"))
+        next_page = 2
+        if total is not None and concurrency > 1:
+            last = min(-(-total // page_size), MAX_LIST_PAGES)
+            tail_full = last == 1
+
+            async def fetch(pn: int) -> tuple[int, list[dict[str, Any]]]:
+                data = await self._fetch_page(mid, pn, page_size, order, order_type)
+                return pn, _page_items(data)
+
+            fanned = stream_bounded(
+                range(2, last + 1), fetch, concurrency=concurrency, ordered=ordered
             )
-            items = data.get("list") if isinstance(data, dict) else None
-            if not isinstance(items, list) or not items:
+            async with aclosing(fanned) as pages:
+                async for pn, items in pages:
+                    for item in items:
+                        yield item
+                    if pn == last:
+                        tail_full = len(items) == page_size
+            if not tail_full:
                 return
+            # ``total`` was stale: follows arrived since page 1. Carry on serially.
+            next_page = last + 1
+        page = next_page
+        while page <= MAX_LIST_PAGES:
+            items = _page_items(
+                await self._fetch_page(mid, page, page_size, order, order_type)
+            )
             for item in items:
-                if isinstance(item, dict):
-                    yield item
+                yield item
             if len(items) < page_size:
                 return
             page += 1
-            safety += 1
-            if safety > 500:
-                logger.warning("iter_all reached safety limit at page=%s", page)
-                return
+        logger.warning("iter_all reached safety limit at page=%s", page)
 
-    async def get_detail(self, target_mid: int) -> dict[str, Any]:
-        """Combined profile + relation-stat + latest video for a single UP."""
+    async def _fetch_page(
+        self, mid: int, pn: int, page_size: int, order: str, order_type: str
+    ) -> dict[str, Any]:
+        """One page of followings, retrying a dropped request a few times."""
+        attempt = 0
+        while True:
+            try:
+                data = await self._relation_api.get_followings(
+                    mid, pn=pn, ps=page_size, order=order, order_type=order_type
+                )
+            except BiliApiError as exc:
+                if not is_transient_error(exc) or attempt >= PAGE_RETRIES:
+                    raise
+                logger.info("Retrying followings page %s of mid=%s: %s", pn, mid, exc)
+                await sleep_backoff(attempt, PAGE_RETRY_DELAY)
+                attempt += 1
+                continue
+            return data if isinstance(data, dict) else {}
+
+    async def get_detail(
+        self, target_mid: int, *, fields: Collection[str] = DETAIL_FIELDS
+    ) -> dict[str, Any]:
+        """Combined profile + relation-stat + latest video for a single UP.
+
+        Only the upstream calls needed for ``fields`` are made, all at once;
+        the result carries ``mid`` plus exactly the requested fields.
+        """
+        wanted = set(fields)
+        unknown = wanted - set(DETAIL_FIELDS)
+        if unknown:
+            raise ValueError(f"unknown detail fields: {', '.join(sorted(unknown))}")
+        parts = []
+        if "info" in wanted:
+            parts.append(("info", self._detail_info))
+        if "stat" in wanted:
+            parts.append(("stat", self._detail_stat))
+        if wanted & {"latest_video", "video_count"}:
+            parts.append(("videos", self._detail_videos))
+        cache = get_profile_cache()
+        gone = await cache.missing(target_mid) if cache is not None and parts else None
+        if gone is not None:
+            fetched = {field: gone for field in DETAIL_FIELDS}
+            fetched["video_count"] = None
+        else:
+            fetched = {}
+            results = await asyncio.gather(
+                *(self._cached_part(cache, target_mid, name, fetch) for name, fetch in parts)
+            )
+            for part in results:
+                fetched.update(part)
+        return {"mid": target_mid, **{f: fetched[f] for f in DETAIL_FIELDS if f in wanted}}
+
+    async def _cached_part(
+        self,
+        cache: ProfileCache | None,
+        target_mid: int,
+        name: str,
+        fetch: Callable[[int], Awaitable[dict[str, Any]]],
+    ) -> dict[str, Any]:
+        if cache is None:
+            return await fetch(target_mid)
+        part = await cache.get(target_mid, name)
+        if part is not None:
+            return part
+        part = await fetch(target_mid)
+        errors = [v for v in part.values() if isinstance(v, dict) and "_error" in v]
+        if not errors:
+            await cache.put(target_mid, name, part)
+        elif errors[0].get("_code") in MISSING_CODES:
+            await cache.mark_missing(target_mid, errors[0])
+        return part
+
+    async def _detail_info(self, target_mid: int) -> dict[str, Any]:
         try:
-            info = await self._user_api.get_info(target_mid)
+            return {"info": await self._user_api.get_info(target_mid)}
         except BiliApiError as exc:
-            info = {"_error": str(exc), "_code": exc.code}
+            return {"info": {"_error": str(exc), "_code": exc.code}}
+
+    async def _detail_stat(self, target_mid: int) -> dict[str, Any]:
         try:
-            stat = await self._user_api.get_stat(target_mid)
+            return {"stat": await self._user_api.get_stat(target_mid)}
         except BiliApiError as exc:
-            stat = {"_error": str(exc), "_code": exc.code}
+            return {"stat": {"_error": str(exc), "_code": exc.code}}
+
+    async def _detail_videos(self, target_mid: int) -> dict[str, Any]:
         try:
             videos = await self._user_api.get_videos(target_mid, pn=1, ps=1)
-            vlist = videos.get("list", {}).get("vlist") if isinstance(videos, dict) else None
-            latest = vlist[0] if isinstance(vlist, list) and vlist else None
-            video_count = videos.get("page", {}).get("count") if isinstance(videos, dict) else None
         except BiliApiError as exc:
-            latest = {"_error": str(exc), "_code": exc.code}
-            video_count = None
-        return {
-            "mid": target_mid,
-            "info": info,
-            "stat": stat,
-            "latest_video": latest,
-            "video_count": video_count,
-        }
+            return {"latest_video": {"_error": str(exc), "_code": exc.code}, "video_count": None}
+        vlist = videos.get("list", {}).get("vlist") if isinstance(videos, dict) else None
+        latest = vlist[0] if isinstance(vlist, list) and vlist else None
+        video_count = videos.get("page", {}).get("count") if isinstance(videos, dict) else None
+        return {"latest_video": latest, "video_count": video_count}
+
+    async def iter_details(
+        self,
+        mids: Iterable[int],
+        *,
+        concurrency: int = 3,
+        ordered: bool = True,
+        fields: Collection[str] = DETAIL_FIELDS,
+    ) -> AsyncIterator[dict[str, Any]]:
+        """Yield :meth:`get_detail` for each mid as it completes.
+
+        ``concurrency`` workers fetch at a time, so the first detail arrives
+        after one lookup rather than after all of them, and only the details
+        in flight (plus, when ``ordered``, those waiting on a slower earlier
+        mid) are held in memory. With ``ordered=False`` details come back in
+        completion order. ``fields`` is passed on to :meth:`get_detail`.
+        """
+
+        async def fetch_detail(target: int) -> dict[str, Any]:
+            return await self.get_detail(target, fields=fields)
+
+        details = stream_bounded(mids, fetch_detail, concurrency=concurrency, ordered=ordered)
+        async with aclosing(details) as stream:
+            async for item in stream:
+                yield item
 
     async def enrich(
         self,
@@ -97,39 +257,60 @@ class FollowingService:
         *,
         concurrency: int = 3,
     ) -> list[dict[str, Any]]:
-        """Fetch detail for many mids in parallel under ``concurrency`` limit."""
-        sem = asyncio.Semaphore(concurrency)
+        """Fetch detail for many mids under ``concurrency`` limit, in order."""
+        return [d async for d in self.iter_details(mids, concurrency=concurrency)]
+
+    async def _unfollow(
+        self,
+        target: int,
+        errors: list[dict[str, Any]],
+        on_item: ItemCallback | None,
+    ) -> bool:
+        try:
+            await self._relation_api.unfollow(target)
+        except Exception as exc:
+            err = {"mid": target, "type": type(exc).__name__, "message": str(exc)}
+            errors.append(err)
+            logger.warning("Failed to unfollow mid=%s: %s", target, exc)
+            audit.record("following.unfollow", target, ok=False, error=str(exc))
+            if on_item is not None:
+                on_item(target, False, err)
+            return False
+        audit.record("following.unfollow", target, ok=True)
+        if on_item is not None:
+            on_item(target, True, None)
+        return True
+
+    async def _unfollow_all(
+        self,
+        mids: Sequence[int],
+        errors: list[dict[str, Any]],
+        on_item: ItemCallback | None,
+        concurrency: int,
+    ) -> int:
+        ok = 0
 
-        async def one(target: int) -> dict[str, Any]:
-            async with sem:
-                return await self.get_detail(target)
+        async def one(target: int) -> None:
+            nonlocal ok
+            if await self._unfollow(target, errors, on_item):
+                ok += 1
 
-        return await asyncio.gather(*(one(m) for m in mids))
+        await run_bounded(mids, one, concurrency=concurrency)
+        return ok
 
     async def unfollow_many(
         self,
         mids: Sequence[int],
         *,
         on_item: ItemCallback | None = None,
+        concurrency: int = WRITE_CONCURRENCY,
     ) -> dict[str, Any]:
-        """Unfollow each mid sequentially. ``on_item`` is a callable
-        ``(mid, ok, error)`` invoked after each attempt for progress tracking."""
-        ok = 0
+        """Unfollow each mid, keeping up to ``concurrency`` requests in flight.
+
+        ``on_item`` is a callable ``(mid, ok, error)`` invoked after each
+        attempt for progress tracking, in completion order."""
         errors: list[dict[str, Any]] = []
-        for target in mids:
-            try:
-                await self._relation_api.unfollow(target)
-                ok += 1
-                audit.record("following.unfollow", target, ok=True)
-                if on_item is not None:
-                    on_item(target, True, None)
-            except Exception as exc:
-                err = {"mid": target, "type": type(exc).__name__, "message": str(exc)}
-                errors.append(err)
-                logger.warning("Failed to unfollow mid=%s: %s", target, exc)
-                audit.record("following.unfollow", target, ok=False, error=str(exc))
-                if on_item is not None:
-                    on_item(target, False, err)
+        ok = await self._unfollow_all(mids, errors, on_item, concurrency)
         return {"ok": ok, "errors": errors, "total": len(mids)}
 
     async def clear_all(
@@ -137,45 +318,74 @@ class FollowingService:
         mid: int,
         *,
         on_item: ItemCallback | None = None,
+        concurrency: int = WRITE_CONCURRENCY,
     ) -> dict[str, Any]:
         ok = 0
         errors: list[dict[str, Any]] = []
-        safety = 0
-        while True:
-            data = await self._relation_api.get_followings(mid, pn=1, ps=50)
-            target_mids = extract_following_mids(data)
-            if not target_mids:
-                break
-            page_ok = 0
-            for target in target_mids:
-                try:
-                    await self._relation_api.unfollow(target)
-                    ok += 1
-                    page_ok += 1
-                    audit.record("following.unfollow", target, ok=True)
-                    if on_item is not None:
-                        on_item(target, True, None)
-                except Exception as exc:
-                    err = {"mid": target, "type": type(exc).__name__, "message": str(exc)}
-                    errors.append(err)
-                    logger.warning("Failed to unfollow mid=%s: %s", target, exc)
-                    audit.record("following.unfollow", target, ok=False, error=str(exc))
-                    if on_item is not None:
-                        on_item(target, False, err)
-            if page_ok == 0:
-                logger.warning(
-                    "Stopped clear_all for mid=%s after a page made no progress",
-                    mid,
-                )
-                return {"ok": ok, "errors": errors, "stopped_reason": "no_progress"}
-            safety += 1
-            if safety > MAX_CLEAR_PAGES:
-                # Bailing out here used to look identical to a finished clean,
-                # so the caller reported success while followings remained.
-                logger.warning(
-                    "clear_all for mid=%s hit the %s-page safety limit with items left",
-                    mid,
-                    MAX_CLEAR_PAGES,
+        page_limited = False
+
+        async def batches(settle: Settle) -> AsyncIterator[list[int]]:
+            # Every unfollow moves the rest of the list up, so while deletes
+            # are in flight the page holding the next unseen mids can only be
+            # estimated, and ``seen`` drops what was already handed over. Once
+            # a listing runs short the deletes are let settle and the list is
+            # read again from the top: what it shows then is what is left, so
+            # earlier failures are retried just as they were page by page.
+            nonlocal page_limited
+            seen: set[int] = set()
+            handed = 0
+            ok_before = 0
+            settled = True
+            pn = 1
+            fetched = 0
+            while True:
+                if fetched > MAX_CLEAR_PAGES:
+                    page_limited = True
+                    return
+                data = await self._relation_api.get_followings(
+                    mid, pn=pn, ps=CLEAR_PAGE_SIZE
                 )
-                return {"ok": ok, "errors": errors, "stopped_reason": "page_limit"}
+                fetched += 1
+                listed = extract_following_mids(data)
+                if settled:
+                    if not listed:
+                        return
+                    fresh = listed
+                    seen = set(listed)
+                    handed = 0
+                    ok_before = ok
+                else:
+                    fresh = [target for target in listed if target not in seen]
+                    seen.update(fresh)
+                if fresh:
+                    handed += len(fresh)
+                    yield fresh
+                if len(listed) < CLEAR_PAGE_SIZE:
+                    await settle()
+                    settled, pn = True, 1
+                elif fresh:
+                    settled = False
+                    pn = (handed - (ok - ok_before)) // CLEAR_PAGE_SIZE + 1
+                else:
+                    pn += 1
+
+        async with aclosing(prefetch(batches)) as pages:
+            async for targets in pages:
+                page_ok = await self._unfollow_all(targets, errors, on_item, concurrency)
+                ok += page_ok
+                if page_ok == 0:
+                    logger.warning(
+                        "Stopped clear_all for mid=%s after a page made no progress",
+                        mid,
+                    )
+                    return {"ok": ok, "errors": errors, "stopped_reason": "no_progress"}
+        if page_limited:
+            # Bailing out here used to look identical to a finished clean,
+            # so the caller reported success while followings remained.
+            logger.warning(
+                "clear_all for mid=%s hit the %s-page safety limit with items left",
+                mid,
+                MAX_CLEAR_PAGES,
+            )
+            return {"ok": ok, "errors": errors, "stopped_reason": "page_limit"}
         return {"ok": ok, "errors": errors}
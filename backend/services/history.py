@@ -1,14 +1,119 @@
 from __future__ import annotations
 
+import logging
+from collections.abc import AsyncIterator, Callable, Mapping
+from contextlib import aclosing
+from dataclasses import dataclass
 from typing import Any
 
 from backend import audit
-from backend.api import HistoryApi
+from backend.api import HistoryApi, cursor_index
 from backend.api.client import BiliApiClient
 
+from ._progress import KidBatchCallback
+from ._utils import safe_int
+from ._workers import WRITE_CONCURRENCY, StallGuard, run_until_stalled
+
+logger = logging.getLogger(__name__)
+
+MAX_HISTORY_PAGES = 500
+
+# Kids per delete call. The endpoint takes them comma-joined.
+DELETE_BATCH = 20
+
+# Businesses the cursor endpoint can filter on itself via ``type``.
+SERVER_TYPES = frozenset({"archive", "live", "article"})
+
+
+def history_kid(item: Mapping[str, Any]) -> str | None:
+    """The entry's delete key, e.g. ``archive_<aid>``."""
+    kid = item.get("kid")
+    if isinstance(kid, str) and kid:
+        return kid
+    history = item.get("history")
+    if not isinstance(history, Mapping):
+        return None
+    business, oid = history.get("business"), safe_int(history.get("oid"))
+    if not business or oid is None:
+        return None
+    return f"{business}_{oid}"
+
+
+def history_business(item: Mapping[str, Any]) -> str:
+    history = item.get("history")
+    return str(history.get("business") or "") if isinstance(history, Mapping) else ""
+
+
+@dataclass(frozen=True)
+class HistoryFilter:
+    """Which history entries a selective delete removes.
+
+    Every criterion that is set must hold; ``after``/``before`` bound
+    ``view_at`` as ``after <= view_at < before``. A filter with nothing set
+    matches nothing.
+    """
+
+    businesses: frozenset[str] = frozenset()
+    after: int | None = None
+    before: int | None = None
+    authors: frozenset[int] = frozenset()
+
+    @property
+    def empty(self) -> bool:
+        return not (
+            self.businesses or self.after is not None or self.before is not None or self.authors
+        )
+
+    @property
+    def server_type(self) -> str:
+        """The cursor ``type`` that narrows the listing without losing matches."""
+        if len(self.businesses) == 1 and self.businesses <= SERVER_TYPES:
+            return next(iter(self.businesses))
+        return "all"
+
+    def __call__(self, item: Mapping[str, Any]) -> bool:
+        if self.empty:
+            return False
+        if self.businesses and history_business(item) not in self.businesses:
+            return False
+        if self.after is not None or self.before is not None:
+            view_at = safe_int(item.get("view_at"))
+            if view_at is None:
+                return False
+            if self.after is not None and view_at < self.after:
+                return False
+            if self.before is not None and view_at >= self.before:
+                return False
+        if self.authors and safe_int(item.get("author_mid")) not in self.authors:
+            return False
+        return True
+
+    def past_window(self, item: Mapping[str, Any]) -> bool:
+        """True once the list, newest first, has gone below ``after``."""
+        if self.after is None:
+            return False
+        view_at = safe_int(item.get("view_at"))
+        return view_at is not None and view_at < self.after
+
+
+def next_cursor(
+    data: Mapping[str, Any], current: tuple[int, int]
+) -> tuple[int, int, str] | None:
+    """``(max, view_at, business)`` of the page after ``data``; None at the end."""
+    items = data.get("list")
+    cursor = data.get("cursor")
+    if not isinstance(items, list) or not items or not isinstance(cursor, Mapping):
+        return None
+    next_max = safe_int(cursor.get("max")) or 0
+    next_view_at = safe_int(cursor.get("view_at")) or 0
+    if not next_max or (next_max, next_view_at) == current:
+        return None
+    return next_max, next_view_at, str(cursor.get("business") or "")
+
 
 class HistoryService:
     def __init__(self, client: BiliApiClient) -> None:
+        self._client = client
         self._api = HistoryApi(client)
 
     async def list_page(
@@ -28,6 +133,87 @@ class HistoryService:
             type_=type_,
         )
 
+    async def iter_all(
+        self,
+        *,
+        page_size: int = 30,
+        type_: str = "all",
+    ) -> AsyncIterator[dict[str, Any]]:
+        """Yield every history entry, newest first, following the cursor.
+
+        Each page's ``cursor`` (``max``, ``view_at``, ``business``) is sent
+        back for the next one; a page without entries, or a cursor that does
+        not move, ends the walk.
+        """
+        max_id, view_at, business = 0, 0, ""
+        pages = 0
+        while True:
+            data = await self.list_page(
+                max_id=max_id,
+                business=business,
+                view_at=view_at,
+                page_size=page_size,
+                type_=type_,
+            )
+            items = data.get("list")
+            if not isinstance(items, list) or not items:
+                return
+            for item in items:
+                if isinstance(item, dict):
+                    yield item
+            cursor = next_cursor(data, (max_id, view_at))
+            if cursor is None:
+                return
+            max_id, view_at, business = cursor
+            pages += 1
+            if pages > MAX_HISTORY_PAGES:
+                logger.warning("history iter_all reached the %s-page limit", MAX_HISTORY_PAGES)
+                return
+
+    async def get_page(
+        self,
+        page: int,
+        *,
+        page_size: int = 20,
+        type_: str = "all",
+        on_page: Callable[[int], None] | None = None,
+    ) -> dict[str, Any] | None:
+        """Page ``page`` (1-based) of the history, or None past the end.
+
+        Resumes from the nearest page boundary the cursor index knows instead
+        of walking from the top; every page walked through is recorded.
+        """
+
+        async def fetch(
+            cursor: tuple[int, int, str] | None,
+        ) -> tuple[dict[str, Any], tuple[int, int, str] | None]:
+            max_id, view_at, business = cursor or (0, 0, "")
+            data = await self.list_page(
+                max_id=max_id,
+                business=business,
+                view_at=view_at,
+                page_size=page_size,
+                type_=type_,
+            )
+            return data, next_cursor(data, (max_id, view_at))
+
+        feed = ("history", type_, page_size)
+        return await cursor_index.seek(self._client, feed, page, fetch, on_page=on_page)
+
+    async def warm_index(
+        self,
+        pages: int,
+        *,
+        page_size: int = 20,
+        type_: str = "all",
+        on_page: Callable[[int], None] | None = None,
+    ) -> dict[str, Any]:
+        """Record the boundaries of the first ``pages`` pages ahead of time."""
+        found = await self.get_page(pages, page_size=page_size, type_=type_, on_page=on_page)
+        feed = ("history", type_, page_size)
+        known = cursor_index.get_cursor_index().known_pages(self._client.owner, feed)
+        return {"pages": known, "ended": found is None}
+
     async def delete(self, kid: str) -> dict[str, Any]:
         try:
             result = await self._api.delete_history(kid)
@@ -37,6 +223,107 @@ class HistoryService:
         audit.record("history.delete", kid, ok=True)
         return result
 
+    async def _delete_batch(
+        self,
+        kids: list[str],
+        errors: list[dict[str, Any]],
+        on_batch: KidBatchCallback | None,
+    ) -> bool:
+        try:
+            await self._api.delete_history(kids)
+        except Exception as exc:
+            err = {"kids": kids, "type": type(exc).__name__, "message": str(exc)}
+            errors.append(err)
+            logger.warning("Failed to delete %s history entries: %s", len(kids), exc)
+            audit.record("history.delete", kids, ok=False, error=str(exc))
+            if on_batch is not None:
+                on_batch(kids, err)
+            return False
+        audit.record("history.delete", kids, ok=True)
+        if on_batch is not None:
+            on_batch(kids, None)
+        return True
+
+    async def delete_matching(
+        self,
+        predicate: HistoryFilter,
+        *,
+        dry_run: bool = False,
+        on_batch: KidBatchCallback | None = None,
+        concurrency: int = WRITE_CONCURRENCY,
+        batch_size: int = DELETE_BATCH,
+    ) -> dict[str, Any]:
+        """Delete every history entry ``predicate`` matches.
+
+        The cursor is walked newest first and stops at the first entry older
+        than ``predicate.after``. Matches are deleted ``batch_size`` kids per
+        call while the walk goes on; the cursor is the last entry's position,
+        so deleting listed entries does not move it. With ``dry_run`` nothing
+        is deleted and the matches are returned.
+        """
+        ok = 0
+        errors: list[dict[str, Any]] = []
+        found: list[dict[str, Any]] = []
+        scanned = matched = 0
+        guard = StallGuard()
+        ended_early = False
+
+        async def batches() -> AsyncIterator[list[str]]:
+            nonlocal scanned, matched, ended_early
+            pending: list[str] = []
+            async with aclosing(self.iter_all(type_=predicate.server_type)) as items:
+                async for item in items:
+                    if guard.stalled:
+                        return
+                    if predicate.past_window(item):
+                        ended_early = True
+                        break
+                    scanned += 1
+                    kid = history_kid(item)
+                    if kid is None or not predicate(item):
+                        continue
+                    matched += 1
+                    if dry_run:
+                        found.append(
+                            {
+                                "kid": kid,
+                                "title": item.get("title"),
+                                "author_mid": item.get("author_mid"),
+                                "view_at": item.get("view_at"),
+                            }
+                        )
+                        continue
+                    pending.append(kid)
+                    if len(pending) >= batch_size:
+                        yield pending
+                        pending = []
+            if pending:
+                yield pending
+
+        async def delete(kids: list[str]) -> bool:
+            nonlocal ok
+            if not await self._delete_batch(kids, errors, on_batch):
+                return False
+            ok += len(kids)
+            return True
+
+        stalled = await run_until_stalled(batches(), delete, guard, concurrency=concurrency)
+        result: dict[str, Any] = {
+            "ok": ok,
+            "errors": errors,
+            "scanned": scanned,
+            "matched": matched,
+            "ended_early": ended_early,
+        }
+        if dry_run:
+            result["matches"] = found
+        if stalled:
+            logger.warning(
+                "Stopped history delete after %s failed calls in a row", guard.failures
+            )
+            result["stopped_reason"] = "no_progress"
+        return result
+
     async def clear(self) -> dict[str, Any]:
         try:
             result = await self._api.clear_history()
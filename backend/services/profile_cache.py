@@ -0,0 +1,264 @@
+"""On-disk cache of public UP profile data for :meth:`FollowingService.get_detail`.
+
+Profile, follower stats and the latest upload change slowly, yet opening the
+followings list with ``with_detail=true`` used to refetch all three for every
+UP on every visit; a quality scan of a 2,000-following account cost about
+6,000 requests each time. Parts are stored per target mid in SQLite under
+``data/`` with their own TTLs, so the server and CLI runs share them and they
+survive restarts. Users that no longer exist (-404 / -626) are remembered as
+missing and are not asked about again until ``missing`` expires.
+
+The data is public (no account's cookies are involved), so one cache serves
+every account. Like the audit log, failures here never propagate: an
+unusable database disables the cache and the reason is logged once.
+
+SQLite calls block, and a CLI run holding the write lock can make one wait
+up to ``busy_timeout``, so they all run on a single worker thread; the event
+loop (every other owner's requests) never waits on the database.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import sqlite3
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, TypeVar
+
+from backend.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+# Upstream codes meaning the user is gone (deleted or never existed).
+MISSING_CODES = frozenset({-404, -626})
+
+_MISSING = "missing"
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class ProfileTTLs:
+    """Seconds each part stays fresh; 0 turns caching off for that part."""
+
+    info: float = 86400.0
+    stat: float = 21600.0
+    videos: float = 21600.0
+    missing: float = 604800.0
+
+    def for_part(self, part: str) -> float:
+        return float(getattr(self, part))
+
+
+@dataclass
+class ProfileCacheStats:
+    hits: int = 0
+    missing_hits: int = 0
+    misses: int = 0
+    writes: int = 0
+
+    def to_dict(self) -> dict[str, int]:
+        return {
+            "hits": self.hits,
+            "missing_hits": self.missing_hits,
+            "misses": self.misses,
+            "writes": self.writes,
+        }
+
+
+class ProfileCache:
+    def __init__(
+        self,
+        path: str | Path,
+        ttls: ProfileTTLs | None = None,
+        *,
+        busy_timeout: float = 1.0,
+    ) -> None:
+        self._path = Path(path).expanduser()
+        self._ttls = ttls or ProfileTTLs()
+        self._busy_timeout = busy_timeout
+        self._db: sqlite3.Connection | None = None
+        self._broken = False
+        # One thread: the connection is used serially and never from the loop.
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="profile-cache")
+        self.stats = ProfileCacheStats()
+
+    async def _run(self, fn: Callable[..., T], *args: Any) -> T:
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    def _conn(self) -> sqlite3.Connection | None:
+        if self._db is not None or self._broken:
+            return self._db
+        try:
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            # The server and CLI runs may share the file; wait briefly on a lock.
+            db = sqlite3.connect(
+                self._path, timeout=self._busy_timeout, check_same_thread=False
+            )
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS profile_parts ("
+                " mid INTEGER NOT NULL, part TEXT NOT NULL, payload TEXT NOT NULL,"
+                " fetched_at REAL NOT NULL, PRIMARY KEY (mid, part))"
+            )
+            db.commit()
+        except (OSError, sqlite3.Error) as exc:
+            self._broken = True
+            logger.error(
+                "Profile cache disabled: cannot open %s (%s). Set "
+                "BILI_PROFILE_CACHE_PATH to a writable location or "
+                "BILI_PROFILE_CACHE_ENABLED=0 to silence this.",
+                self._path,
+                exc,
+            )
+            return None
+        self._db = db
+        return db
+
+    def _read(self, mid: int, part: str) -> Any | None:
+        ttl = self._ttls.for_part(part)
+        db = self._conn()
+        if db is None or ttl <= 0:
+            return None
+        try:
+            row = db.execute(
+                "SELECT payload, fetched_at FROM profile_parts WHERE mid = ? AND part = ?",
+                (mid, part),
+            ).fetchone()
+        except sqlite3.Error as exc:
+            logger.warning("Profile cache read failed for mid=%s: %s", mid, exc)
+            return None
+        if row is None or not 0 <= time.time() - row[1] <= ttl:
+            return None
+        try:
+            return json.loads(row[0])
+        except ValueError:
+            return None
+
+    def _write(self, mid: int, part: str, value: Any) -> bool:
+        db = self._conn()
+        if db is None or self._ttls.for_part(part) <= 0:
+            return False
+        try:
+            db.execute(
+                "INSERT OR REPLACE INTO profile_parts (mid, part, payload, fetched_at)"
+                " VALUES (?, ?, ?, ?)",
+                (mid, part, json.dumps(value, ensure_ascii=False), time.time()),
+            )
+            db.commit()
+        except (sqlite3.Error, TypeError, ValueError) as exc:
+            logger.warning("Profile cache write failed for mid=%s: %s", mid, exc)
+            return False
+        return True
+
+    async def missing(self, mid: int) -> dict[str, Any] | None:
+        """The error recorded for a user known not to exist, if still fresh."""
+        error = await self._run(self._read, mid, _MISSING)
+        if error is not None:
+            self.stats.missing_hits += 1
+        return error
+
+    async def get(self, mid: int, part: str) -> dict[str, Any] | None:
+        """A fresh cached ``part`` for ``mid``, or None."""
+        value = await self._run(self._read, mid, part)
+        if value is None:
+            self.stats.misses += 1
+        else:
+            self.stats.hits += 1
+        return value
+
+    async def put(self, mid: int, part: str, value: dict[str, Any]) -> None:
+        if await self._run(self._write, mid, part, value):
+            self.stats.writes += 1
+
+    async def mark_missing(self, mid: int, error: dict[str, Any]) -> None:
+        if await self._run(self._write, mid, _MISSING, error):
+            self.stats.writes += 1
+
+    def _entries(self) -> int | None:
+        db = self._conn()
+        if db is None:
+            return None
+        try:
+            return int(db.execute("SELECT COUNT(*) FROM profile_parts").fetchone()[0])
+        except sqlite3.Error:
+            return None
+
+    def _close_db(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    async def close(self) -> None:
+        """Close the database after the work queued before it, off the loop."""
+        await self._run(self._close_db)
+        await asyncio.to_thread(self._executor.shutdown)
+
+    def close_blocking(self) -> None:
+        """:meth:`close` for callers with no event loop to stall."""
+        self._executor.submit(self._close_db)
+        self._executor.shutdown(wait=True)
+
+    async def to_dict(self) -> dict[str, Any]:
+        entries = await self._run(self._entries)
+        return {"path": str(self._path), "entries": entries, **self.stats.to_dict()}
+
+
+_cache: ProfileCache | None = None
+# Replaced caches still closing, held so the tasks are not garbage collected.
+_closing: set[asyncio.Task[None]] = set()
+
+
+def _discard(cache: ProfileCache) -> None:
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        cache.close_blocking()
+        return
+    task = loop.create_task(cache.close())
+    _closing.add(task)
+    task.add_done_callback(_closing.discard)
+
+
+def configure(path: str | Path | None, ttls: ProfileTTLs | None = None) -> None:
+    """Use the cache at ``path`` from now on; None turns it off.
+
+    On a running loop the previous cache is closed in the background.
+    """
+    global _cache
+    if _cache is not None:
+        _discard(_cache)
+    _cache = ProfileCache(path, ttls) if path else None
+
+
+async def shutdown() -> None:
+    """Turn the cache off, waiting (off the loop) for its queued work."""
+    global _cache
+    cache, _cache = _cache, None
+    if cache is not None:
+        await cache.close()
+    await asyncio.gather(*_closing)
+
+
+def configure_from_settings(settings: Settings) -> None:
+    if not settings.profile_cache_enabled:
+        configure(None)
+        return
+    configure(
+        settings.profile_cache_path,
+        ProfileTTLs(
+            info=settings.profile_ttl_info,
+            stat=settings.profile_ttl_stat,
+            videos=settings.profile_ttl_videos,
+            missing=settings.profile_ttl_missing,
+        ),
+    )
+
+
+def get_profile_cache() -> ProfileCache | None:
+    return _cache
@@ -1,7 +1,6 @@
 from __future__ import annotations
 
 import asyncio
-import hashlib
 import hmac
 import logging
 import time
@@ -10,28 +9,27 @@ from collections.abc import Awaitable, Callable
 from dataclasses import dataclass, field
 from typing import Any
 
+# Re-exported: tasks were the first thing keyed by owner, and callers still
+# import it from here.
+from backend.api.breaker import is_paused
+from backend.api.client import owner_key as owner_key
+from backend.api.nav import SessionExpiredError, known_expired
+from backend.api.ratelimit import background_requests
 from backend.settings import settings
 
 logger = logging.getLogger(__name__)
 
 TaskKind = str
 TaskStatus = str  # one of: pending / running / completed / failed / cancelled
+# Reported instead of "running" while the owner's risk-control breaker is open;
+# never stored, since the pause ends without the task noticing.
+PAUSED_STATUS = "paused_risk_control"
 
 
 class TaskCapacityError(RuntimeError):
     """Raised when too many tasks are already running."""
 
 
-def owner_key(sessdata: str) -> str:
-    """Derive a stable, non-reversible owner id from a session cookie.
-
-    Tasks are keyed by this instead of the raw ``SESSDATA`` so the registry
-    never holds a usable credential in memory, and so a task's owner can be
-    compared without the value ever appearing in logs or API responses.
-    """
-    return hashlib.sha256(sessdata.encode("utf-8")).hexdigest()
-
-
 @dataclass
 class TaskState:
     task_id: str
@@ -79,10 +77,13 @@ class TaskState:
             )
 
     def to_dict(self) -> dict[str, Any]:
+        status = self.status
+        if status == "running" and self.owner and is_paused(self.owner):
+            status = PAUSED_STATUS
         return {
             "task_id": self.task_id,
             "kind": self.kind,
-            "status": self.status,
+            "status": status,
             "processed": self.processed,
             "total": self.total,
             "errors": list(self.errors),
@@ -146,6 +147,10 @@ class TaskRegistry:
         owner: str = "",
         total: int | None = None,
     ) -> TaskState:
+        if known_expired(owner):
+            # Refuse up front rather than queue a clean whose every request
+            # would fail.
+            raise SessionExpiredError()
         running = self.running_count()
         if running >= self._max_running:
             raise TaskCapacityError(f"{running} tasks already running (limit {self._max_running})")
@@ -160,7 +165,9 @@ class TaskRegistry:
             state.started_at = time.time()
             logger.info("Task %s (%s) started", task_id, kind)
             try:
-                result = await builder(state)
+                # Yield the rate limit to whoever is waiting on the UI.
+                with background_requests():
+                    result = await builder(state)
                 if isinstance(result, dict):
                     state.result = result
                 if state.status == "running":
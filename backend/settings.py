@@ -59,14 +59,35 @@ class Settings:
     """Process-wide tunables.
 
     ``api_qps`` is the single most important knob: it caps the request rate
-    against B 站 for the whole process. Raising it increases the chance of
-    triggering risk control (-352 / 412).
+    against B 站 for each account. ``api_global_qps`` caps the whole process
+    (B 站 also rate-limits per IP); concurrent accounts split it fairly.
+    Raising either increases the chance of triggering risk control (-352 / 412).
+    With ``api_adaptive`` the per-account rate starts at ``api_qps`` and is
+    tuned between ``api_qps_min`` and ``api_qps_max`` from risk-control signals.
+    ``breaker_threshold`` consecutive risk-control responses pause every
+    request for that account for ``breaker_cooldown`` seconds; 0 disables it.
+    ``profile_ttl_*`` are how long each part of a cached UP profile is reused.
     """
 
     api_qps: float
+    api_global_qps: float
+    api_adaptive: bool
+    api_qps_min: float
+    api_qps_max: float
     http_timeout: float
     max_retries: int
     retry_base_delay: float
+    breaker_threshold: int
+    breaker_cooldown: float
+    breaker_max_cooldown: float
+    breaker_max_pause: float
+
+    http_pool_size: int
+    http_pool_idle_seconds: float
+    http_max_connections: int
+    http_keepalive_seconds: float
+    http2: bool
+    response_cache_size: int
 
     log_level: str
     log_requests: bool
@@ -79,13 +100,36 @@ class Settings:
     audit_log_enabled: bool
     audit_log_path: str
 
+    wbi_cache_path: str
+
+    profile_cache_enabled: bool
+    profile_cache_path: str
+    profile_ttl_info: float
+    profile_ttl_stat: float
+    profile_ttl_videos: float
+    profile_ttl_missing: float
+
 
 def load_settings() -> Settings:
     return Settings(
         api_qps=_float("API_QPS", 1.5, minimum=0.01),
+        api_global_qps=_float("API_GLOBAL_QPS", 4.5, minimum=0.01),
+        api_adaptive=_bool("API_ADAPTIVE", False),
+        api_qps_min=_float("API_QPS_MIN", 0.5, minimum=0.01),
+        api_qps_max=_float("API_QPS_MAX", 4.0, minimum=0.01),
         http_timeout=_float("HTTP_TIMEOUT", 10.0, minimum=0.1),
         max_retries=_int("MAX_RETRIES", 3, minimum=0),
         retry_base_delay=_float("RETRY_BASE_DELAY", 1.0, minimum=0.0),
+        breaker_threshold=_int("BREAKER_THRESHOLD", 3, minimum=0),
+        breaker_cooldown=_float("BREAKER_COOLDOWN", 30.0, minimum=1.0),
+        breaker_max_cooldown=_float("BREAKER_MAX_COOLDOWN", 600.0, minimum=1.0),
+        breaker_max_pause=_float("BREAKER_MAX_PAUSE", 900.0, minimum=0.0),
+        http_pool_size=_int("HTTP_POOL_SIZE", 64, minimum=1),
+        http_pool_idle_seconds=_float("HTTP_POOL_IDLE_SECONDS", 300.0, minimum=0.0),
+        http_max_connections=_int("HTTP_MAX_CONNECTIONS", 20, minimum=1),
+        http_keepalive_seconds=_float("HTTP_KEEPALIVE_SECONDS", 30.0, minimum=0.0),
+        http2=_bool("HTTP2", False),
+        response_cache_size=_int("RESPONSE_CACHE_SIZE", 2048, minimum=0),
         log_level=(_env("LOG_LEVEL") or "INFO").upper(),
         log_requests=_bool("LOG_REQUESTS", True),
         max_running_tasks=_int("MAX_RUNNING_TASKS", 4, minimum=1),
@@ -94,6 +138,13 @@ def load_settings() -> Settings:
         shutdown_grace_seconds=_float("SHUTDOWN_GRACE_SECONDS", 5.0, minimum=0.0),
         audit_log_enabled=_bool("AUDIT_LOG_ENABLED", True),
         audit_log_path=_env("AUDIT_LOG_PATH") or "data/audit.jsonl",
+        wbi_cache_path=_env("WBI_CACHE_PATH") or "data/wbi_keys.json",
+        profile_cache_enabled=_bool("PROFILE_CACHE_ENABLED", True),
+        profile_cache_path=_env("PROFILE_CACHE_PATH") or "data/profiles.sqlite3",
+        profile_ttl_info=_float("PROFILE_TTL_INFO", 86400.0, minimum=0.0),
+        profile_ttl_stat=_float("PROFILE_TTL_STAT", 21600.0, minimum=0.0),
+        profile_ttl_videos=_float("PROFILE_TTL_VIDEOS", 21600.0, minimum=0.0),
+        profile_ttl_missing=_float("PROFILE_TTL_MISSING", 604800.0, minimum=0.0),
     )
 
 
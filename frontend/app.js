@@ -927,7 +927,7 @@ const app = {
     renderTasks(tasks) {
         const list = document.getElementById("task-list");
         list.replaceChildren();
-        const active = tasks.filter((task) => ["pending", "running"].includes(task.status));
+        const active = tasks.filter((task) => ["pending", "running", "paused_risk_control"].includes(task.status));
         document.getElementById("task-count").textContent = String(tasks.length);
         document.getElementById("task-summary").textContent = active.length ? `${active.length} 个任务运行中` : "暂无运行任务";
         if (!tasks.length) {
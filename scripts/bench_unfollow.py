@@ -0,0 +1,72 @@
+"""Benchmark unfollow throughput against a simulated slow upstream.
+
+Each unfollow POST is answered by an in-process transport after a fixed
+delay, so the numbers isolate how the service overlaps round trips with the
+rate limit. Sequential unfollows top out at ``1 / latency`` items/sec; with
+enough workers the token bucket (``--qps``) becomes the ceiling instead.
+
+Usage::
+
+    python scripts/bench_unfollow.py               # 40 mids, 10 req/s
+    python scripts/bench_unfollow.py 100 --qps 20
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+LATENCIES = (0.05, 0.2, 0.5)
+CONCURRENCY = (1, 2, 4, 8)
+
+
+async def bench(count: int, qps: float, latency: float, concurrency: int) -> float:
+    import httpx
+
+    from backend.api.client import BiliApiClient
+    from backend.services import FollowingService
+
+    async def upstream(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(latency)
+        return httpx.Response(200, json={"code": 0, "data": {}})
+
+    http = httpx.AsyncClient(transport=httpx.MockTransport(upstream))
+    # One account for every run: the global limit is split between recently
+    # active accounts, so a fresh one per run would shrink each run's share.
+    async with BiliApiClient(
+        sessdata="bench", bili_jct="csrf", qps=qps, global_qps=qps, http_client=http
+    ) as client:
+        start = time.perf_counter()
+        result = await FollowingService(client).unfollow_many(
+            list(range(1, count + 1)), concurrency=concurrency
+        )
+        elapsed = time.perf_counter() - start
+    await http.aclose()
+    assert result["ok"] == count, result
+    return count / elapsed
+
+
+async def main(count: int, qps: float) -> None:
+    # Run as a script, sys.path[0] is scripts/, so `backend` is not importable.
+    sys.path.insert(0, str(REPO_ROOT))
+    header = "".join(f"{f'workers={n}':>12}" for n in CONCURRENCY)
+    print(f"{count} unfollows at {qps:g} req/s (items/sec)")
+    print(f"{'latency':<10}{header}")
+    for latency in LATENCIES:
+        rates = [await bench(count, qps, latency, n) for n in CONCURRENCY]
+        print(f"{f'{latency * 1000:.0f} ms':<10}" + "".join(f"{r:>12.2f}" for r in rates))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("count", nargs="?", type=int, default=40)
+    parser.add_argument("--qps", type=float, default=10.0)
+    args = parser.parse_args()
+    # The benchmark's fake unfollows do not belong in the real audit trail.
+    os.environ.setdefault("BILI_AUDIT_LOG_ENABLED", "0")
+    asyncio.run(main(args.count, args.qps))
@@ -6,9 +6,11 @@ import httpx
 import pytest
 
 from backend import audit
-from backend.api import wbi
+from backend.api import nav, wbi
 from backend.api.client import BiliApiClient
+from backend.cli import _runtime
 from backend.main import app
+from backend.services import profile_cache
 from backend.services import tasks as tasks_module
 
 
@@ -20,8 +22,20 @@ def isolate_process_state(tmp_path, monkeypatch):
     without this a test would inherit keys fetched by an earlier one (and its
     mocked ``/nav`` route would never be called).
     """
+    wbi.configure_disk_cache(None)
     wbi.invalidate_cache()
     tasks_module.reset_for_tests()
+    nav.reset_for_tests()
+    profile_cache.configure(None)
+    monkeypatch.setattr(
+        _runtime,
+        "settings",
+        replace(
+            _runtime.settings,
+            wbi_cache_path=str(tmp_path / "wbi_keys.json"),
+            profile_cache_path=str(tmp_path / "profiles.sqlite3"),
+        ),
+    )
     # Settings is frozen, so swap the module-level binding instead of mutating.
     monkeypatch.setattr(
         audit,
@@ -35,6 +49,9 @@ def isolate_process_state(tmp_path, monkeypatch):
     audit.reset_for_tests()
     yield
     wbi.invalidate_cache()
+    wbi.configure_disk_cache(None)
+    nav.reset_for_tests()
+    profile_cache.configure(None)
     tasks_module.reset_for_tests()
     audit.reset_for_tests()
 
@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import asyncio
+
+import httpx
+import pytest
+import respx
+
+from backend.api.breaker import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    BreakerConfig,
+    RiskBreaker,
+    RiskCooldownError,
+    get_breaker,
+)
+from backend.api.client import BiliApiClient, BiliApiError, owner_key, parse_retry_after
+from backend.api.ratelimit import background_requests
+from backend.services.tasks import task_registry
+
+pytestmark = pytest.mark.asyncio
+
+URL = "https://api.bilibili.com/test"
+RISK = {"code": -352, "message": "risk"}
+OK = {"code": 0, "data": {"ok": True}}
+
+
+async def test_opens_after_threshold_consecutive_risk_responses() -> None:
+    breaker = RiskBreaker(BreakerConfig(threshold=2, cooldown=5.0))
+    breaker.record_risk()
+    breaker.record_success()
+    breaker.record_risk()
+    assert breaker.state == CLOSED  # the success reset the streak
+    breaker.record_risk()
+    assert breaker.state == OPEN
+    assert 4.0 < breaker.remaining() <= 5.0
+
+
+async def test_retry_after_overrides_the_cooldown() -> None:
+    breaker = RiskBreaker(BreakerConfig(threshold=1, cooldown=5.0))
+    breaker.record_risk(retry_after=60.0)
+    assert breaker.remaining() > 59.0
+
+
+async def test_single_half_open_probe_then_close() -> None:
+    breaker = RiskBreaker(BreakerConfig(threshold=1, cooldown=0.05))
+    breaker.record_risk()
+
+    probe = await breaker.before_request()
+    assert probe.probe
+    assert probe.waited >= 0.04
+    assert breaker.state == HALF_OPEN
+
+    # Everyone else waits for the probe's verdict.
+    follower = asyncio.create_task(breaker.before_request())
+    await asyncio.sleep(0.01)
+    assert not follower.done()
+
+    breaker.record_success(probe)
+    await asyncio.wait_for(follower, timeout=1.0)
+    assert breaker.state == CLOSED
+
+
+async def test_only_the_probe_holder_frees_the_probe_slot() -> None:
+    breaker = RiskBreaker(BreakerConfig(threshold=1, cooldown=0.05))
+    stale = await breaker.before_request()  # in flight before the breaker opened
+    breaker.record_risk()
+    probe = await breaker.before_request()
+
+    # The stale request times out, then hits risk control: neither may let a
+    # second probe out while the first is pending, nor reopen the breaker.
+    breaker.release(stale)
+    breaker.record_risk(permit=stale)
+    follower = asyncio.create_task(breaker.before_request())
+    await asyncio.sleep(0.01)
+    assert not follower.done()
+    assert breaker.state == HALF_OPEN
+
+    breaker.release(probe)
+    second = await asyncio.wait_for(follower, timeout=1.0)
+    assert second.probe
+
+
+async def test_failed_probe_reopens_with_longer_cooldown() -> None:
+    breaker = RiskBreaker(BreakerConfig(threshold=1, cooldown=0.05, max_cooldown=0.08))
+    breaker.record_risk()
+    probe = await breaker.before_request()
+    breaker.record_risk(permit=probe)
+    assert breaker.state == OPEN
+    assert breaker.remaining() > 0.06  # doubled, capped at max_cooldown
+
+
+async def test_gives_up_instead_of_waiting_past_max_wait() -> None:
+    breaker = RiskBreaker(BreakerConfig(threshold=1, cooldown=30.0))
+    breaker.record_risk()
+    with pytest.raises(RiskCooldownError) as info:
+        await breaker.before_request(max_wait=1.0)
+    assert info.value.status_code == 429
+    assert info.value.retry_after > 29.0
+
+
+async def test_parse_retry_after() -> None:
+    assert parse_retry_after("12") == 12.0
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0  # in the past
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after(None) is None
+
+
+async def test_clients_share_one_cooldown_without_spending_retries() -> None:
+    config = BreakerConfig(threshold=2, cooldown=0.05)
+    first = BiliApiClient(sessdata="sess", breaker=config, max_retries=0)
+    second = BiliApiClient(sessdata="sess", breaker=config, max_retries=0)
+    with respx.mock() as router:
+        route = router.get(URL).mock(
+            side_effect=[
+                httpx.Response(200, json=RISK),
+                httpx.Response(200, json=RISK),
+                httpx.Response(200, json=OK),
+            ]
+        )
+        with background_requests():
+            with pytest.raises(BiliApiError):
+                await first.get(URL)  # no retries left, breaker not yet open
+            # Opens the breaker; with it open the request waits instead of failing.
+            data = await second.get(URL)
+
+    assert data["data"]["ok"] is True
+    assert route.call_count == 3
+    assert get_breaker(config, owner_key("sess")).state == CLOSED
+
+
+async def test_interactive_requests_fail_fast_during_a_cooldown() -> None:
+    config = BreakerConfig(threshold=1, cooldown=30.0)
+    client = BiliApiClient(sessdata="sess", breaker=config, max_retries=0)
+    with respx.mock() as router:
+        route = router.get(URL).mock(return_value=httpx.Response(200, json=RISK))
+        with pytest.raises(RiskCooldownError) as first:
+            await client.get(URL)
+        with pytest.raises(RiskCooldownError) as second:
+            await asyncio.wait_for(client.get(URL), timeout=1.0)
+
+    assert route.call_count == 1
+    assert first.value.retry_after > 29.0
+    assert second.value.status_code == 429
+
+
+async def test_a_probe_cancelled_while_queued_for_a_token_frees_the_slot() -> None:
+    config = BreakerConfig(threshold=1, cooldown=0.02)
+    client = BiliApiClient(sessdata="sess", qps=0.1, breaker=config, max_retries=0)
+    breaker = get_breaker(config, client.owner)
+    breaker.record_risk()
+    assert client._limiter().try_acquire(client.owner)  # the next token is 10s away
+
+    with respx.mock(assert_all_called=False) as router:
+        route = router.get(URL).mock(return_value=httpx.Response(200, json=OK))
+        with background_requests():
+            holder = asyncio.create_task(client.get(URL))
+        await asyncio.sleep(0.1)
+        assert breaker.state == HALF_OPEN  # the holder has the probe, waits on the limiter
+        holder.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await holder
+
+    second = await asyncio.wait_for(breaker.before_request(max_wait=0.0), timeout=1.0)
+    assert second.probe
+    assert route.call_count == 0
+
+
+async def test_http_retry_after_header_sets_the_pause() -> None:
+    config = BreakerConfig(threshold=1, cooldown=0.01, max_pause=1.0)
+    client = BiliApiClient(sessdata="sess", breaker=config, max_retries=0)
+    with respx.mock() as router:
+        router.get(URL).mock(return_value=httpx.Response(429, headers={"Retry-After": "120"}))
+        with pytest.raises(RiskCooldownError):
+            await client.get(URL)
+    assert get_breaker(config, owner_key("sess")).remaining() > 100.0
+
+
+async def test_running_task_reports_paused_risk_control() -> None:
+    config = BreakerConfig(threshold=1, cooldown=30.0)
+    owner = owner_key("sess")
+    release = asyncio.Event()
+
+    async def builder(_state):  # type: ignore[no-untyped-def]
+        await release.wait()
+        return {}
+
+    state = task_registry.create("test", builder, owner=owner)
+    await asyncio.sleep(0)
+    assert state.to_dict()["status"] == "running"
+
+    get_breaker(config, owner).record_risk()
+    assert state.to_dict()["status"] == "paused_risk_control"
+
+    get_breaker(config, owner).record_success()
+    assert state.to_dict()["status"] == "running"
+    release.set()
@@ -11,7 +11,9 @@ from typer.testing import CliRunner
 from backend.api.auth import NAV_URL as AUTH_NAV_URL
 from backend.api.relation import FOLLOWINGS_URL, MODIFY_URL
 from backend.api.relation_tag import LIST_TAGS_URL
+from backend.api.user import ACC_INFO_URL, ARC_SEARCH_URL, RELATION_STAT_URL
 from backend.cli import credentials
+from backend.cli._runtime import emit_stream, run_async
 from backend.cli.main import app
 
 CSRF = "csrf-token"
@@ -115,6 +117,62 @@ def test_cli_followings_list_uses_saved_mid(saved_creds: Path) -> None:
     assert len(body["items"]) == 1
 
 
+def test_cli_followings_all_streams_details(saved_creds: Path) -> None:
+    runner = CliRunner()
+    with respx.mock() as router:
+        router.get(AUTH_NAV_URL).mock(
+            return_value=httpx.Response(
+                200,
+                json={
+                    "code": 0,
+                    "data": {
+                        "isLogin": True,
+                        "wbi_img": {
+                            "img_url": "https://i0.hdslb.com/bfs/wbi/" + "a" * 32 + ".png",
+                            "sub_url": "https://i0.hdslb.com/bfs/wbi/" + "b" * 32 + ".png",
+                        },
+                    },
+                },
+            )
+        )
+        router.get(FOLLOWINGS_URL).mock(
+            return_value=httpx.Response(
+                200,
+                json={
+                    "code": 0,
+                    "data": {
+                        "list": [{"mid": 1}, {"uname": "no-mid"}, {"mid": 2}, {"mid": 1}],
+                        "total": 4,
+                    },
+                },
+            )
+        )
+        router.get(ACC_INFO_URL).mock(
+            side_effect=lambda request: httpx.Response(
+                200, json={"code": 0, "data": {"name": f"up{request.url.params['mid']}"}}
+            )
+        )
+        router.get(RELATION_STAT_URL).mock(
+            return_value=httpx.Response(200, json={"code": 0, "data": {"follower": 5}})
+        )
+        router.get(ARC_SEARCH_URL).mock(
+            return_value=httpx.Response(
+                200, json={"code": 0, "data": {"list": {"vlist": []}, "page": {"count": 0}}}
+            )
+        )
+        result = runner.invoke(app, ["followings", "all", "--with-detail"])
+    assert result.exit_code == 0
+    body = json.loads(result.stdout)
+    # List order and duplicates are kept; details attach per position.
+    assert [item.get("mid") for item in body] == [1, None, 2, 1]
+    assert [item.get("detail", {}).get("info", {}).get("name") for item in body] == [
+        "up1",
+        None,
+        "up2",
+        "up1",
+    ]
+
+
 def test_cli_followings_unfollow(saved_creds: Path) -> None:
     runner = CliRunner()
     with respx.mock() as router:
@@ -148,3 +206,13 @@ def test_cli_logout(saved_creds: Path) -> None:
     result = runner.invoke(app, ["logout"])
     assert result.exit_code == 0
     assert credentials.load() is None
+
+
+def test_emit_stream_closes_the_array_when_the_source_fails(capsys) -> None:
+    async def items():  # type: ignore[no-untyped-def]
+        yield {"n": 1}
+        raise RuntimeError("session expired")
+
+    with pytest.raises(RuntimeError):
+        run_async(emit_stream(items()))
+    assert json.loads(capsys.readouterr().out) == [{"n": 1}]
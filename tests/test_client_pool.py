@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import httpx
+import pytest
+import respx
+
+from backend.api.auth import NAV_URL
+from backend.api.client import BiliApiClient, ClientPool, get_client_pool
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_same_owner_gets_the_same_client() -> None:
+    pool = ClientPool()
+    first = pool.client_for("sess-a", "jct")
+    second = pool.client_for("sess-a", "jct")
+    other = pool.client_for("sess-b", "jct")
+
+    assert first is second
+    assert other is not first
+    assert pool.stats.hits == 1
+    assert pool.stats.misses == 2
+    assert first.cookies.get("SESSDATA") == "sess-a"
+    assert other.cookies.get("SESSDATA") == "sess-b"
+
+
+async def test_anonymous_clients_are_never_shared() -> None:
+    """A QR login sets SESSDATA on whichever cookie jar receives it."""
+    pool = ClientPool()
+    first = pool.client_for(None)
+    second = pool.client_for(None)
+
+    assert first is not second
+    assert pool.to_dict()["clients"] == 0
+
+
+async def test_refreshed_csrf_token_gets_its_own_client() -> None:
+    pool = ClientPool()
+    old = pool.client_for("sess", "old")
+    client = pool.client_for("sess", "new")
+    assert client.cookies.get("bili_jct") == "new"
+    # Callers still holding the old client keep a consistent cookie jar.
+    assert old.cookies.get("bili_jct") == "old"
+
+
+async def test_timeouts_are_per_caller_not_per_pooled_client() -> None:
+    pool = ClientPool()
+    with respx.mock() as router:
+        route = router.get(NAV_URL).mock(
+            return_value=httpx.Response(200, json={"code": 0, "data": {}})
+        )
+        slow = BiliApiClient(timeout=30.0, http_client=pool.client_for("sess", timeout=30.0))
+        fast = BiliApiClient(timeout=2.0, http_client=pool.client_for("sess", timeout=2.0))
+        await slow.get(NAV_URL, params={"n": 1})
+        await fast.get(NAV_URL, params={"n": 2})
+
+    timeouts = [call.request.extensions["timeout"]["read"] for call in route.calls]
+    assert timeouts == [30.0, 2.0]
+
+
+async def test_least_recently_used_owner_is_evicted() -> None:
+    pool = ClientPool(max_clients=2)
+    a = pool.client_for("a")
+    pool.client_for("b")
+    pool.client_for("a")
+    pool.client_for("c")
+
+    assert pool.stats.evictions == 1
+    assert pool.client_for("a") is a
+    assert pool.stats.misses == 3  # b was evicted, a was kept
+
+
+async def test_idle_owners_are_evicted() -> None:
+    pool = ClientPool(idle_timeout=0.0)
+    first = pool.client_for("a")
+    assert pool.client_for("a") is not first
+    assert pool.stats.evictions == 1
+
+
+async def test_closing_a_borrowing_client_keeps_the_pooled_one_open() -> None:
+    pool = ClientPool()
+    http = pool.client_for("sess", "jct")
+    async with BiliApiClient(sessdata="sess", bili_jct="jct", http_client=http):
+        pass
+    assert not http.is_closed
+
+
+async def test_pooled_requests_are_counted() -> None:
+    pool = ClientPool()
+    with respx.mock() as router:
+        router.get(NAV_URL).mock(return_value=httpx.Response(200, json={"code": 0, "data": {}}))
+        client = BiliApiClient(http_client=pool.client_for("sess"))
+        await client.get(NAV_URL)
+        await client.get(NAV_URL)
+
+    stats = pool.to_dict()
+    assert stats["requests"] == 2
+    assert stats["connections_reused"] == 2  # respx never opens a real connection
+
+
+async def test_routes_reuse_one_client_per_session(
+    async_client: httpx.AsyncClient, auth_headers: dict[str, str]
+) -> None:
+    with respx.mock() as router:
+        router.get(NAV_URL).mock(
+            return_value=httpx.Response(200, json={"code": 0, "data": {"isLogin": True}})
+        )
+        for _ in range(3):
+            resp = await async_client.get("/api/v2/me", headers=auth_headers)
+            assert resp.status_code == 200
+
+    stats = get_client_pool().to_dict()
+    assert stats["clients"] == 1
+    assert stats["misses"] == 1
+    assert stats["hits"] == 2
+
+    ready = await async_client.get("/readyz")
+    assert ready.json()["http_pool"]["hits"] == 2
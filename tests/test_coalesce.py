@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import asyncio
+
+import httpx
+import pytest
+import respx
+
+from backend.api.client import BiliApiClient, BiliApiError
+from backend.api.coalesce import RequestCoalescer, get_coalescer, request_key
+
+pytestmark = pytest.mark.asyncio
+
+URL = "https://api.bilibili.com/test"
+
+
+async def _slow(payload: dict) -> httpx.Response:
+    await asyncio.sleep(0.02)
+    return httpx.Response(200, json=payload)
+
+
+async def test_identical_gets_share_one_upstream_call() -> None:
+    clients = [BiliApiClient(sessdata="sess") for _ in range(3)]
+    with respx.mock() as router:
+        route = router.get(URL).mock(side_effect=lambda _: _slow({"code": 0, "data": [1]}))
+        results = await asyncio.gather(*(c.get(URL, params={"a": 1}) for c in clients))
+
+    assert route.call_count == 1
+    assert all(r["data"] == [1] for r in results)
+    results[1]["data"].append(2)  # followers get their own copy
+    assert results[0]["data"] == [1]
+    assert get_coalescer().to_dict() == {"in_flight": 0, "upstream": 1, "coalesced": 2}
+
+
+async def test_signature_params_do_not_split_the_key() -> None:
+    first = request_key("o", "get", URL, {"mid": 1, "wts": 1, "w_rid": "x"})
+    second = request_key("o", "GET", URL, {"w_rid": "y", "wts": 2, "mid": 1})
+    assert first == second
+    assert request_key("other", "GET", URL, {"mid": 1}) != first
+
+
+async def test_different_owners_and_writes_are_not_coalesced() -> None:
+    alice = BiliApiClient(sessdata="alice")
+    bob = BiliApiClient(sessdata="bob")
+    with respx.mock() as router:
+        get_route = router.get(URL).mock(side_effect=lambda _: _slow({"code": 0}))
+        post_route = router.post(URL).mock(side_effect=lambda _: _slow({"code": 0}))
+        await asyncio.gather(alice.get(URL), bob.get(URL))
+        await asyncio.gather(alice.post(URL), alice.post(URL))
+    assert get_route.call_count == 2
+    assert post_route.call_count == 2
+
+
+async def test_errors_reach_every_waiter() -> None:
+    clients = [BiliApiClient(sessdata="sess", max_retries=0) for _ in range(2)]
+    with respx.mock() as router:
+        router.get(URL).mock(side_effect=lambda _: _slow({"code": -404, "message": "gone"}))
+        results = await asyncio.gather(*(c.get(URL) for c in clients), return_exceptions=True)
+    assert all(isinstance(r, BiliApiError) and r.code == -404 for r in results)
+
+
+async def test_a_cancelled_waiter_does_not_cancel_the_others() -> None:
+    coalescer = RequestCoalescer()
+    calls = 0
+
+    async def call() -> str:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.02)
+        return "done"
+
+    key = request_key("o", "GET", URL, None)
+    leader = asyncio.create_task(coalescer.run(key, call))
+    follower = asyncio.create_task(coalescer.run(key, call))
+    await asyncio.sleep(0)
+    leader.cancel()
+    assert await follower == "done"
+    assert calls == 1
+
+
+async def test_the_call_is_cancelled_once_nobody_waits() -> None:
+    coalescer = RequestCoalescer()
+    started = asyncio.Event()
+    cancelled = asyncio.Event()
+
+    async def call() -> None:
+        started.set()
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    waiter = asyncio.create_task(coalescer.run(request_key("o", "GET", URL, None), call))
+    await started.wait()
+    waiter.cancel()
+    await asyncio.wait_for(cancelled.wait(), timeout=1)
+    assert coalescer.in_flight() == 0
@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+from urllib.parse import parse_qs
+
+import httpx
+import pytest
+import respx
+
+from backend.api import cursor_index
+from backend.api.client import BiliApiClient
+from backend.api.cursor_index import CursorIndex, get_cursor_index
+from backend.api.history import DELETE_HISTORY_URL, HISTORY_CURSOR_URL
+from backend.services.history import HistoryService
+
+pytestmark = pytest.mark.asyncio
+
+# Entries 100, 99, ..., 1, newest first; ``max`` is the last entry's oid.
+HISTORY_SIZE = 100
+
+
+@pytest.fixture
+async def client() -> BiliApiClient:
+    c = BiliApiClient(sessdata="sess", bili_jct="csrf")
+    yield c
+    await c.close()
+
+
+def _history_page(request: httpx.Request) -> httpx.Response:
+    params = request.url.params
+    start = int(params["max"]) or HISTORY_SIZE + 1
+    size = int(params["ps"])
+    oids = list(range(start - 1, max(start - 1 - size, 0), -1))
+    items = [{"kid": f"archive_{oid}", "view_at": oid * 10} for oid in oids]
+    last = oids[-1] if oids else 0
+    cursor = {"max": last, "view_at": last * 10, "business": "archive"}
+    return httpx.Response(
+        200, json={"code": 0, "data": {"cursor": cursor, "list": items}}
+    )
+
+
+async def test_nearest_falls_back_to_the_closest_earlier_page() -> None:
+    index = CursorIndex()
+    index.record("me", ("history", "all", 20), 2, {"max": 80})
+    index.record("me", ("history", "all", 20), 5, {"max": 20})
+
+    assert index.nearest("me", ("history", "all", 20), 4) == (2, {"max": 80})
+    assert index.nearest("me", ("history", "all", 20), 9) == (5, {"max": 20})
+    assert index.nearest("me", ("history", "all", 30), 9) == (1, None)
+    assert index.nearest("you", ("history", "all", 20), 9) == (1, None)
+    assert index.stats.hits == 2
+    assert index.stats.misses == 2
+
+
+async def test_feeds_expire_and_invalidate_per_owner_and_kind(monkeypatch) -> None:
+    index = CursorIndex(ttl=60)
+    index.record("me", ("history", "all", 20), 3, "h")
+    index.record("me", ("dynamics", 7), 3, "d")
+    index.record("you", ("history", "all", 20), 3, "h")
+
+    assert index.invalidate("me", "history") == 1
+    assert index.nearest("me", ("history", "all", 20), 3) == (1, None)
+    assert index.nearest("me", ("dynamics", 7), 3) == (3, "d")
+    assert index.nearest("you", ("history", "all", 20), 3) == (3, "h")
+
+    later = cursor_index.time.monotonic() + 61
+    monkeypatch.setattr(cursor_index.time, "monotonic", lambda: later)
+    assert index.nearest("me", ("dynamics", 7), 3) == (1, None)
+
+
+async def test_page_jumps_resume_from_the_nearest_recorded_page(
+    client: BiliApiClient,
+) -> None:
+    service = HistoryService(client)
+    with respx.mock() as router:
+        listing = router.get(HISTORY_CURSOR_URL).mock(side_effect=_history_page)
+        fifth = await service.get_page(5, page_size=10)
+        assert listing.call_count == 5
+        again = await service.get_page(5, page_size=10)
+        seventh = await service.get_page(7, page_size=10)
+        past_end = await service.get_page(12, page_size=10)
+
+    assert [item["kid"] for item in fifth["list"]][:2] == ["archive_60", "archive_59"]
+    assert again == fifth
+    assert seventh["list"][0]["kid"] == "archive_40"
+    # 5 to reach page 5, 1 to repeat it, 6 and 7, then 8..11 (empty).
+    assert listing.call_count == 5 + 1 + 2 + 4
+    assert past_end is None
+    assert get_cursor_index().stats.replayed == 4 + 0 + 1 + 3
+
+
+async def test_deletes_invalidate_recorded_pages(client: BiliApiClient) -> None:
+    service = HistoryService(client)
+    with respx.mock() as router:
+        listing = router.get(HISTORY_CURSOR_URL).mock(side_effect=_history_page)
+        router.post(DELETE_HISTORY_URL).mock(
+            return_value=httpx.Response(200, json={"code": 0, "data": {}})
+        )
+        warmed = await service.warm_index(4, page_size=10)
+        await service.delete("archive_95")
+        await service.get_page(3, page_size=10)
+
+    assert warmed == {"pages": 5, "ended": False}
+    assert listing.call_count == 4 + 3
+    assert parse_qs(listing.calls[-1].request.url.query.decode())["max"] == ["81"]
@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import asyncio
+
 import httpx
 import pytest
 import respx
@@ -56,6 +58,84 @@ async def test_iter_all_stops_on_empty(client: BiliApiClient) -> None:
         assert result == []
 
 
+def _paged_followings(total: int, *, delays: dict[int, float] | None = None):
+    """A followings endpoint serving ``total`` mids, optionally slow per page."""
+    state = {"in_flight": 0, "peak": 0}
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        pn, ps = int(request.url.params["pn"]), int(request.url.params["ps"])
+        state["in_flight"] += 1
+        state["peak"] = max(state["peak"], state["in_flight"])
+        await asyncio.sleep((delays or {}).get(pn, 0.005))
+        state["in_flight"] -= 1
+        mids = range((pn - 1) * ps, min(pn * ps, total))
+        return _followings_page([{"mid": m} for m in mids], total=total)
+
+    return handler, state
+
+
+async def test_iter_all_fans_out_pages_after_the_first(client: BiliApiClient) -> None:
+    service = FollowingService(client)
+    handler, state = _paged_followings(180)
+    with respx.mock() as router:
+        route = router.get(FOLLOWINGS_URL).mock(side_effect=handler)
+        result = [item["mid"] async for item in service.iter_all(1, concurrency=3)]
+
+    assert result == list(range(180))
+    assert route.call_count == 4
+    assert state["peak"] == 3
+
+
+async def test_iter_all_unordered_yields_pages_as_they_land(client: BiliApiClient) -> None:
+    service = FollowingService(client)
+    handler, _ = _paged_followings(150, delays={2: 0.05})
+    with respx.mock() as router:
+        router.get(FOLLOWINGS_URL).mock(side_effect=handler)
+        result = [
+            item["mid"] async for item in service.iter_all(1, concurrency=3, ordered=False)
+        ]
+
+    assert sorted(result) == list(range(150))
+    assert result[50:100] == list(range(100, 150))
+
+
+async def test_iter_all_retries_a_dropped_page(client: BiliApiClient, monkeypatch) -> None:
+    monkeypatch.setattr("backend.services.following.PAGE_RETRY_DELAY", 0.0)
+    service = FollowingService(client)
+    handler, _ = _paged_followings(120)
+    dropped: list[int] = []
+
+    async def flaky(request: httpx.Request) -> httpx.Response:
+        if request.url.params["pn"] == "2" and not dropped:
+            dropped.append(2)
+            raise httpx.ConnectError("reset", request=request)
+        return await handler(request)
+
+    with respx.mock() as router:
+        route = router.get(FOLLOWINGS_URL).mock(side_effect=flaky)
+        result = [item["mid"] async for item in service.iter_all(1)]
+
+    assert result == list(range(120))
+    assert route.call_count == 4
+
+
+async def test_iter_all_continues_past_a_stale_total(client: BiliApiClient) -> None:
+    service = FollowingService(client)
+    handler, _ = _paged_followings(130)
+
+    async def understated(request: httpx.Request) -> httpx.Response:
+        response = await handler(request)
+        body = response.json()
+        body["data"]["total"] = 100
+        return httpx.Response(200, json=body)
+
+    with respx.mock() as router:
+        router.get(FOLLOWINGS_URL).mock(side_effect=understated)
+        result = [item["mid"] async for item in service.iter_all(1)]
+
+    assert result == list(range(130))
+
+
 async def test_get_detail_combines_endpoints(client: BiliApiClient) -> None:
     service = FollowingService(client)
     with respx.mock() as router:
@@ -112,6 +192,90 @@ async def test_get_detail_records_partial_failures(client: BiliApiClient) -> Non
         assert detail["latest_video"].get("_error")
 
 
+async def test_get_detail_issues_its_calls_concurrently(client: BiliApiClient) -> None:
+    service = FollowingService(client)
+    in_flight = 0
+    peak = 0
+
+    def slow(payload: dict):
+        async def handler(request: httpx.Request) -> httpx.Response:
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return httpx.Response(200, json={"code": 0, "data": payload})
+
+        return handler
+
+    with respx.mock() as router:
+        router.get(NAV_URL).mock(return_value=httpx.Response(200, json=NAV_PAYLOAD))
+        router.get(ACC_INFO_URL).mock(side_effect=slow({"name": "alice"}))
+        router.get(RELATION_STAT_URL).mock(side_effect=slow({"follower": 1}))
+        router.get(ARC_SEARCH_URL).mock(
+            side_effect=slow({"list": {"vlist": []}, "page": {"count": 0}})
+        )
+        detail = await service.get_detail(7)
+
+    assert list(detail) == ["mid", "info", "stat", "latest_video", "video_count"]
+    assert peak == 3
+
+
+async def test_get_detail_skips_calls_for_unrequested_fields(client: BiliApiClient) -> None:
+    service = FollowingService(client)
+    with respx.mock() as router:
+        router.get(NAV_URL).mock(return_value=httpx.Response(200, json=NAV_PAYLOAD))
+        videos = router.get(ARC_SEARCH_URL).mock(
+            return_value=httpx.Response(
+                200, json={"code": 0, "data": {"list": {"vlist": []}, "page": {"count": 9}}}
+            )
+        )
+        detail = await service.get_detail(7, fields=["video_count"])
+
+    assert detail == {"mid": 7, "video_count": 9}
+    assert videos.call_count == 1
+    with pytest.raises(ValueError):
+        await service.get_detail(7, fields=["fans"])
+
+
+async def test_iter_details_streams_in_completion_order(
+    client: BiliApiClient, monkeypatch
+) -> None:
+    service = FollowingService(client)
+    delays = {1: 0.05, 2: 0.0, 3: 0.02}
+
+    async def fake_detail(target: int, **_: object) -> dict:
+        await asyncio.sleep(delays[target])
+        return {"mid": target}
+
+    monkeypatch.setattr(service, "get_detail", fake_detail)
+    unordered = [d["mid"] async for d in service.iter_details([1, 2, 3], ordered=False)]
+    ordered = [d["mid"] async for d in service.iter_details([1, 2, 3])]
+
+    assert unordered == [2, 3, 1]
+    assert ordered == [1, 2, 3]
+
+
+async def test_iter_details_bounds_the_work_in_flight(
+    client: BiliApiClient, monkeypatch
+) -> None:
+    service = FollowingService(client)
+    started: list[int] = []
+
+    async def fake_detail(target: int, **_: object) -> dict:
+        started.append(target)
+        await asyncio.sleep(0)
+        return {"mid": target}
+
+    monkeypatch.setattr(service, "get_detail", fake_detail)
+    stream = service.iter_details(range(1, 101), concurrency=2)
+    first = await stream.__anext__()
+    await stream.aclose()
+
+    assert first == {"mid": 1}
+    assert len(started) <= 3
+
+
 async def test_unfollow_many_records_errors(client: BiliApiClient) -> None:
     service = FollowingService(client)
     with respx.mock() as router:
@@ -171,3 +335,79 @@ async def test_clear_all_stops_when_page_makes_no_progress(client: BiliApiClient
         assert progress == [(1, False), (2, False)]
         assert followings_route.call_count == 1
         assert modify_route.call_count == 2
+
+
+async def test_unfollow_many_keeps_several_requests_in_flight(client: BiliApiClient) -> None:
+    service = FollowingService(client)
+    in_flight = 0
+    peak = 0
+
+    async def slow_modify(request: httpx.Request) -> httpx.Response:
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.02)
+        in_flight -= 1
+        return httpx.Response(200, json={"code": 0, "data": {}})
+
+    with respx.mock() as router:
+        router.post(MODIFY_URL).mock(side_effect=slow_modify)
+        done: list[int] = []
+        result = await service.unfollow_many(
+            list(range(1, 11)),
+            concurrency=3,
+            on_item=lambda mid, ok, err: done.append(mid),
+        )
+
+    assert result == {"ok": 10, "errors": [], "total": 10}
+    assert sorted(done) == list(range(1, 11))
+    assert peak == 3
+
+
+async def test_unfollow_many_concurrency_one_is_sequential(client: BiliApiClient) -> None:
+    service = FollowingService(client)
+    order: list[str] = []
+
+    async def modify(request: httpx.Request) -> httpx.Response:
+        order.append(dict(httpx.QueryParams(request.content.decode()))["fid"])
+        await asyncio.sleep(0)
+        return httpx.Response(200, json={"code": 0, "data": {}})
+
+    with respx.mock() as router:
+        router.post(MODIFY_URL).mock(side_effect=modify)
+        await service.unfollow_many([3, 1, 2], concurrency=1)
+
+    assert order == ["3", "1", "2"]
+
+
+async def test_clear_all_lists_the_next_page_while_unfollowing(client: BiliApiClient) -> None:
+    service = FollowingService(client)
+    followed = list(range(1, 131))
+    deleting = 0
+    overlapped: list[int] = []
+
+    def list_page(request: httpx.Request) -> httpx.Response:
+        if deleting:
+            overlapped.append(int(request.url.params["pn"]))
+        pn, ps = int(request.url.params["pn"]), int(request.url.params["ps"])
+        page = [{"mid": m} for m in followed[(pn - 1) * ps : pn * ps]]
+        return _followings_page(page, total=len(followed))
+
+    async def modify(request: httpx.Request) -> httpx.Response:
+        nonlocal deleting
+        deleting += 1
+        await asyncio.sleep(0.001)
+        deleting -= 1
+        followed.remove(int(dict(httpx.QueryParams(request.content.decode()))["fid"]))
+        return httpx.Response(200, json={"code": 0, "data": {}})
+
+    with respx.mock() as router:
+        router.get(FOLLOWINGS_URL).mock(side_effect=list_page)
+        router.post(MODIFY_URL).mock(side_effect=modify)
+        done: list[int] = []
+        result = await service.clear_all(999, on_item=lambda mid, ok, err: done.append(mid))
+
+    assert result == {"ok": 130, "errors": []}
+    assert followed == []
+    assert sorted(done) == list(range(1, 131))
+    assert overlapped
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import httpx
+import pytest
+import respx
+
+from backend.api import nav
+from backend.api.client import owner_key
+from backend.api.relation import FOLLOWINGS_URL
+from backend.api.user import ACC_INFO_URL
+
+pytestmark = pytest.mark.asyncio
+
+WBI_IMG = {
+    "img_url": "https://i0.hdslb.com/bfs/wbi/aaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaa.png",
+    "sub_url": "https://i0.hdslb.com/bfs/wbi/bbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbb.png",
+}
+LOGGED_IN = {
+    "code": 0,
+    "data": {"isLogin": True, "mid": 42, "uname": "tester", "wbi_img": WBI_IMG},
+}
+LOGGED_OUT = {"code": -101, "message": "账号未登录", "data": {"isLogin": False, "wbi_img": WBI_IMG}}
+
+
+@pytest.fixture
+def headers() -> dict[str, str]:
+    return {"SESSDATA": "sess", "bili_jct": "csrf"}
+
+
+async def test_me_feeds_the_wbi_keys(async_client: httpx.AsyncClient, headers) -> None:
+    with respx.mock() as router:
+        nav_route = router.get(nav.NAV_URL).mock(return_value=httpx.Response(200, json=LOGGED_IN))
+        router.get(ACC_INFO_URL).mock(
+            return_value=httpx.Response(200, json={"code": 0, "data": {"mid": 7}})
+        )
+        me = await async_client.get("/api/v2/me", headers=headers)
+        again = await async_client.get("/api/v2/me", headers=headers)
+        info = await async_client.get("/api/v2/users/7", headers=headers)
+
+    assert me.json()["mid"] == 42
+    assert again.json()["uname"] == "tester"
+    assert info.status_code == 200
+    assert nav_route.call_count == 1
+
+
+async def test_expired_session_fails_fast(async_client: httpx.AsyncClient, headers) -> None:
+    with respx.mock(assert_all_called=False) as router:
+        nav_route = router.get(nav.NAV_URL).mock(return_value=httpx.Response(200, json=LOGGED_OUT))
+        followings = router.get(FOLLOWINGS_URL).mock(
+            return_value=httpx.Response(200, json={"code": 0, "data": {"list": []}})
+        )
+        me = await async_client.get("/api/v2/me", headers=headers)
+        listing = await async_client.get("/api/v2/followings?mid=42", headers=headers)
+        task = await async_client.post(
+            "/api/v2/followings/unfollow-task", headers=headers, json={"mids": [1]}
+        )
+
+    assert me.status_code == 401
+    assert me.json()["code"] == -101
+    assert listing.status_code == 401
+    assert task.status_code == 401
+    assert nav_route.call_count == 1
+    assert followings.call_count == 0
+
+
+async def test_identity_expires_after_the_ttl(monkeypatch) -> None:
+    nav._remember(owner_key("sess"), {"isLogin": False})
+    assert nav.known_expired(owner_key("sess"))
+    monkeypatch.setattr(nav, "_IDENTITY_TTL", -1.0)
+    assert not nav.known_expired(owner_key("sess"))
+    assert nav.cached_identity(owner_key("sess")) is None
+
+
+async def test_anonymous_clients_are_not_cached() -> None:
+    nav._remember("", {"isLogin": False})
+    assert not nav.known_expired("")
@@ -6,6 +6,7 @@ from __future__ import annotations
 import asyncio
 import json
 from pathlib import Path
+from urllib.parse import parse_qs
 
 import httpx
 import pytest
@@ -16,6 +17,7 @@ from backend.api import wbi
 from backend.api.client import BiliApiClient
 from backend.api.relation import FOLLOWINGS_URL, MODIFY_URL
 from backend.api.wbi import NAV_URL
+from backend.services._workers import STALL_LIMIT
 from backend.services.dynamic import DynamicService
 from backend.services.favorite import FavoriteService
 from backend.services.following import FollowingService
@@ -439,6 +441,110 @@ async def test_favorite_clear_all_stops_when_a_folder_makes_no_progress(
     assert delete_route.call_count == 1
 
 
+async def test_favorite_clear_all_can_delete_whole_folders(bili_client: BiliApiClient) -> None:
+    from backend.api.favorite import (
+        BATCH_DELETE_URL,
+        FOLDER_DELETE_URL,
+        FOLDERS_URL,
+        RESOURCE_IDS_URL,
+    )
+
+    folders = [
+        {"id": 1, "attr": 0, "media_count": 2},
+        {"id": 2, "attr": 2, "media_count": 30},
+        {"id": 3, "attr": 3, "media_count": 0},
+    ]
+    with respx.mock() as router:
+        router.get(FOLDERS_URL).mock(
+            return_value=httpx.Response(200, json={"code": 0, "data": {"list": folders}})
+        )
+        ids_route = router.get(RESOURCE_IDS_URL).mock(
+            return_value=httpx.Response(200, json={"code": 0, "data": {"ids": [10, 11]}})
+        )
+        batch_route = router.post(BATCH_DELETE_URL).mock(
+            return_value=httpx.Response(200, json={"code": 0, "data": {}})
+        )
+        folder_route = router.post(FOLDER_DELETE_URL).mock(
+            return_value=httpx.Response(200, json={"code": 0, "data": 0})
+        )
+        result = await FavoriteService(bili_client).clear_all(1, delete_folders=True)
+
+    assert result == {"ok": 32, "errors": [], "folders_deleted": 2}
+    # Only the default folder was listed and emptied item by item.
+    assert [call.request.url.params["media_id"] for call in ids_route.calls] == ["1"]
+    assert batch_route.call_count == 1
+    deleted = [parse_qs(call.request.content.decode()) for call in folder_route.calls]
+    assert [form["media_ids"] for form in deleted] == [["2"], ["3"]]
+    assert all(form["csrf"] == ["csrf-token"] for form in deleted)
+    entries = [e for e in _audit_entries() if e["action"] == "favorite.delete_folder"]
+    assert [(e["target"], e["media_count"], e["ok"]) for e in entries] == [
+        (2, 30, True),
+        (3, 0, True),
+    ]
+
+
+async def test_favorite_folder_delete_failures_in_a_row_stop_the_clear(
+    bili_client: BiliApiClient,
+) -> None:
+    from backend.api.favorite import FOLDER_DELETE_URL, FOLDERS_URL
+
+    folders = [{"id": 1, "attr": 0}] + [{"id": i, "attr": 2} for i in range(2, 7)]
+    with respx.mock() as router:
+        router.get(FOLDERS_URL).mock(
+            return_value=httpx.Response(200, json={"code": 0, "data": {"list": folders}})
+        )
+        folder_route = router.post(FOLDER_DELETE_URL).mock(
+            return_value=httpx.Response(200, json={"code": -101, "message": "expired"})
+        )
+        result = await FavoriteService(bili_client).clear_all(1, delete_folders=True)
+
+    assert result["stopped_reason"] == "no_progress"
+    assert result["folders_deleted"] == 0
+    assert folder_route.call_count == STALL_LIMIT
+    assert len(result["errors"]) == STALL_LIMIT
+
+
+async def test_favorite_one_failed_folder_delete_does_not_stop_the_clear(
+    bili_client: BiliApiClient,
+) -> None:
+    from backend.api.favorite import (
+        BATCH_DELETE_URL,
+        FOLDER_DELETE_URL,
+        FOLDERS_URL,
+        RESOURCE_IDS_URL,
+    )
+
+    folders = [
+        {"id": 1, "attr": 0, "media_count": 1},
+        {"id": 2, "attr": 2, "media_count": 5},
+        {"id": 3, "attr": 2, "media_count": 7},
+    ]
+    with respx.mock() as router:
+        router.get(FOLDERS_URL).mock(
+            return_value=httpx.Response(200, json={"code": 0, "data": {"list": folders}})
+        )
+        router.get(RESOURCE_IDS_URL).mock(
+            return_value=httpx.Response(200, json={"code": 0, "data": {"ids": [10]}})
+        )
+        batch_route = router.post(BATCH_DELETE_URL).mock(
+            return_value=httpx.Response(200, json={"code": 0, "data": {}})
+        )
+        router.post(FOLDER_DELETE_URL).mock(
+            side_effect=[
+                httpx.Response(200, json={"code": 11010, "message": "busy folder"}),
+                httpx.Response(200, json={"code": 0, "data": 0}),
+            ]
+        )
+        result = await FavoriteService(bili_client).clear_all(1, delete_folders=True)
+
+    assert "stopped_reason" not in result
+    assert result["folders_deleted"] == 1
+    assert result["ok"] == 7 + 1
+    assert [err["media_id"] for err in result["errors"]] == [2]
+    # The default folder was still emptied.
+    assert batch_route.call_count == 1
+
+
 # --- partial clean surfaced through the task result ------------------------
 
 
@@ -1,16 +1,22 @@
 from __future__ import annotations
 
+import asyncio
+from urllib.parse import parse_qs
+
 import httpx
 import pytest
 import respx
 
-from backend.api.client import BiliApiClient
+from backend.api.client import BiliApiClient, BiliApiError
 from backend.api.dynamic import DELETE_DYNAMIC_URL, DYNAMICS_URL
 from backend.api.favorite import BATCH_DELETE_URL, FOLDERS_URL, RESOURCE_IDS_URL, RESOURCE_LIST_URL
+from backend.api.history import DELETE_HISTORY_URL, HISTORY_CURSOR_URL
 from backend.api.relation_tag import COPY_USERS_URL, CREATE_TAG_URL, LIST_TAGS_URL, MOVE_USERS_URL
 from backend.api.wbi import NAV_URL
-from backend.services.dynamic import DynamicService
-from backend.services.favorite import FavoriteService
+from backend.services._batching import BatchSizer
+from backend.services.dynamic import DynamicFilter, DynamicService
+from backend.services.favorite import FavoriteFilter, FavoriteService
+from backend.services.history import HistoryFilter, HistoryService
 from backend.services.tag import TagService
 
 pytestmark = pytest.mark.asyncio
@@ -104,6 +110,178 @@ async def test_dynamic_clear_all_records_errors(client: BiliApiClient) -> None:
         assert len(result["errors"]) == 1
 
 
+async def test_dynamic_clear_all_lists_ahead_of_deletes(client: BiliApiClient) -> None:
+    service = DynamicService(client)
+    events: list[str] = []
+
+    def page(request: httpx.Request) -> httpx.Response:
+        offset = request.url.params["offset"]
+        events.append(f"list:{offset}")
+        if not offset:
+            data = {"items": [{"id_str": "1"}, {"id_str": "2"}], "has_more": True, "offset": "2"}
+        else:
+            data = {"items": [{"id_str": "3"}], "has_more": False}
+        return httpx.Response(200, json={"code": 0, "data": data})
+
+    async def delete(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(0.01)
+        events.append("delete")
+        return httpx.Response(200, json={"code": 0, "data": {}})
+
+    with respx.mock() as router:
+        router.get(NAV_URL).mock(return_value=httpx.Response(200, json=NAV_PAYLOAD))
+        router.get(DYNAMICS_URL).mock(side_effect=page)
+        router.post(DELETE_DYNAMIC_URL).mock(side_effect=delete)
+        result = await service.clear_all(42)
+
+    assert result == {"ok": 3, "errors": []}
+    # The second page was listed before the first page's deletes returned.
+    assert events.index("list:2") < events.index("delete")
+
+
+def _dynamic(dynamic_id: int, pub_ts: int, kind: str = "forward", **modules) -> dict:
+    return {
+        "id_str": str(dynamic_id),
+        "type": f"DYNAMIC_TYPE_{kind.upper()}",
+        "modules": {"module_author": {"pub_ts": pub_ts}, **modules},
+    }
+
+
+async def test_dynamic_clean_stops_scanning_past_the_window(client: BiliApiClient) -> None:
+    service = DynamicService(client)
+    pages = {
+        "": {
+            "items": [
+                _dynamic(1, 50, module_tag={"text": "置顶"}),
+                _dynamic(2, 300),
+                _dynamic(3, 250, "av"),
+            ],
+            "has_more": True,
+            "offset": "3",
+        },
+        "3": {
+            "items": [_dynamic(4, 200), _dynamic(5, 100), _dynamic(6, 90)],
+            "has_more": True,
+            "offset": "6",
+        },
+    }
+    with respx.mock() as router:
+        router.get(NAV_URL).mock(return_value=httpx.Response(200, json=NAV_PAYLOAD))
+        listing = router.get(DYNAMICS_URL).mock(
+            side_effect=lambda request: httpx.Response(
+                200, json={"code": 0, "data": pages[request.url.params["offset"]]}
+            )
+        )
+        delete = router.post(DELETE_DYNAMIC_URL).mock(
+            return_value=httpx.Response(200, json={"code": 0, "data": {}})
+        )
+        result = await service.clean_matching(42, DynamicFilter(after=150, reposts=True))
+
+    assert result == {
+        "ok": 2,
+        "errors": [],
+        "scanned": 4,
+        "matched": 2,
+        "ended_early": True,
+    }
+    forms = [parse_qs(call.request.content.decode()) for call in delete.calls]
+    assert sorted(form["dynamic_id"][0] for form in forms) == ["2", "4"]
+    # The old pinned dynamic did not end the scan; the first old unpinned one did.
+    assert listing.call_count == 2
+
+
+async def test_dynamic_clean_gives_up_after_a_run_of_failures(client: BiliApiClient) -> None:
+    service = DynamicService(client)
+    items = [_dynamic(i, 1000 - i, "word") for i in range(1, 31)]
+    with respx.mock() as router:
+        router.get(NAV_URL).mock(return_value=httpx.Response(200, json=NAV_PAYLOAD))
+        router.get(DYNAMICS_URL).mock(
+            return_value=httpx.Response(
+                200, json={"code": 0, "data": {"items": items, "has_more": False}}
+            )
+        )
+        delete = router.post(DELETE_DYNAMIC_URL).mock(
+            return_value=httpx.Response(200, json={"code": -101, "message": "expired"})
+        )
+        words = DynamicFilter(types=frozenset({"DYNAMIC_TYPE_WORD"}))
+        result = await service.clean_matching(42, words)
+
+    assert result["stopped_reason"] == "no_progress"
+    assert delete.call_count < len(items)
+
+
+def _viewed(oid: int, view_at: int, business: str = "archive", author: int = 1) -> dict:
+    return {
+        "kid": f"{business}_{oid}",
+        "view_at": view_at,
+        "author_mid": author,
+        "history": {"oid": oid, "business": business},
+    }
+
+
+def _history_pages(pages: dict[str, dict]):
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json={"code": 0, "data": pages[request.url.params["max"]]})
+
+    return handler
+
+
+async def test_history_iter_all_follows_the_cursor(client: BiliApiClient) -> None:
+    service = HistoryService(client)
+    pages = {
+        "0": {
+            "cursor": {"max": 2, "view_at": 900, "business": "archive"},
+            "list": [_viewed(1, 1000), _viewed(2, 900)],
+        },
+        "2": {"cursor": {"max": 3, "view_at": 800, "business": "pgc"}, "list": [_viewed(3, 800)]},
+        "3": {"cursor": {"max": 0, "view_at": 0}, "list": []},
+    }
+    with respx.mock() as router:
+        route = router.get(HISTORY_CURSOR_URL).mock(side_effect=_history_pages(pages))
+        items = [item["kid"] async for item in service.iter_all()]
+
+    assert items == ["archive_1", "archive_2", "archive_3"]
+    second = route.calls[1].request.url.params
+    assert (second["max"], second["view_at"], second["business"]) == ("2", "900", "archive")
+    assert route.call_count == 3
+
+
+async def test_history_delete_matching_batches_and_stops_past_the_window(
+    client: BiliApiClient,
+) -> None:
+    service = HistoryService(client)
+    pages = {
+        "0": {
+            "cursor": {"max": 3, "view_at": 700},
+            "list": [_viewed(1, 900, "live"), _viewed(2, 800, "live"), _viewed(3, 700, "live")],
+        },
+        "3": {
+            "cursor": {"max": 5, "view_at": 400},
+            "list": [_viewed(4, 600, "live"), _viewed(5, 400, "live")],
+        },
+    }
+    with respx.mock() as router:
+        listing = router.get(HISTORY_CURSOR_URL).mock(side_effect=_history_pages(pages))
+        delete = router.post(DELETE_HISTORY_URL).mock(
+            return_value=httpx.Response(200, json={"code": 0, "data": {}})
+        )
+        result = await service.delete_matching(
+            HistoryFilter(businesses=frozenset({"live"}), after=500, before=850), batch_size=2
+        )
+
+    assert result == {
+        "ok": 3,
+        "errors": [],
+        "scanned": 4,
+        "matched": 3,
+        "ended_early": True,
+    }
+    # One business the endpoint knows is filtered upstream.
+    assert listing.calls[0].request.url.params["type"] == "live"
+    kids = sorted(parse_qs(call.request.content.decode())["kid"][0] for call in delete.calls)
+    assert kids == ["live_2,live_3", "live_4"]
+
+
 async def test_favorite_delete_resources_mixed_inputs(client: BiliApiClient) -> None:
     service = FavoriteService(client)
     with respx.mock() as router:
@@ -117,6 +295,249 @@ async def test_favorite_delete_resources_mixed_inputs(client: BiliApiClient) ->
         assert result["total"] == 3
 
 
+def _refusing(*bad: str):
+    """batch-del stand-in that refuses any request containing a ``bad`` item."""
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        resources = parse_qs(request.content.decode())["resources"][0].split(",")
+        if any(item in bad for item in resources):
+            return httpx.Response(200, json={"code": 11010, "message": "内容不存在"})
+        return httpx.Response(200, json={"code": 0, "data": {}})
+
+    return handler
+
+
+async def test_favorite_delete_bisects_a_refused_batch(client: BiliApiClient) -> None:
+    service = FavoriteService(client)
+    with respx.mock() as router:
+        route = router.post(BATCH_DELETE_URL).mock(side_effect=_refusing("5:2"))
+        result = await service.delete_resources(9, list(range(1, 9)))
+
+    assert result["ok"] == 7
+    assert [e["resource"] for e in result["errors"]] == ["5:2"]
+    # 8 -> 4 + 4 -> 2 + 2 -> 1 + 1, without retrying the halves that landed.
+    assert route.call_count == 7
+
+
+async def test_favorite_clear_all_goes_on_past_a_folder_of_refused_items(
+    client: BiliApiClient,
+) -> None:
+    service = FavoriteService(client)
+    folders = [{"id": 1}, {"id": 2}]
+    ids = {"1": [5, 6], "2": [7]}
+    with respx.mock() as router:
+        router.get(FOLDERS_URL).mock(
+            return_value=httpx.Response(200, json={"code": 0, "data": {"list": folders}})
+        )
+        router.get(RESOURCE_IDS_URL).mock(
+            side_effect=lambda request: httpx.Response(
+                200,
+                json={"code": 0, "data": {"ids": ids[request.url.params["media_id"]]}},
+            )
+        )
+        router.post(BATCH_DELETE_URL).mock(side_effect=_refusing("5:2", "6:2"))
+        result = await service.clear_all(123)
+
+    assert result["ok"] == 1
+    assert "stopped_reason" not in result
+    assert len(result["errors"]) == 2
+
+
+async def test_favorite_filter_needs_every_criterion_that_is_set() -> None:
+    item = {
+        "title": "Rust 入门",
+        "attr": 0,
+        "fav_time": 1_600_000_000,
+        "upper": {"mid": 7},
+    }
+    assert FavoriteFilter(uploaders=frozenset({7}), keywords=("rust",))(item)
+    assert not FavoriteFilter(uploaders=frozenset({7}), favorited_before=1_500_000_000)(item)
+    assert not FavoriteFilter(invalid=True)(item)
+    assert FavoriteFilter(invalid=True)({"title": "已失效视频", "attr": 9})
+    # Nothing set must never mean "everything".
+    assert not FavoriteFilter()(item)
+
+
+async def test_favorite_clean_matching_scans_folders_concurrently(
+    client: BiliApiClient,
+) -> None:
+    service = FavoriteService(client)
+    folders = [{"id": 1}, {"id": 2}, {"id": 3, "media_count": 0}]
+    medias = {
+        "1": [{"id": 10, "type": 2, "upper": {"mid": 7}}, {"id": 11, "type": 2}],
+        "2": [{"id": 20, "type": 12, "upper": {"mid": 7}}],
+    }
+    scanning = 0
+    overlap = 0
+
+    async def page(request: httpx.Request) -> httpx.Response:
+        nonlocal scanning, overlap
+        scanning += 1
+        overlap = max(overlap, scanning)
+        await asyncio.sleep(0.01)
+        scanning -= 1
+        data = {"medias": medias[request.url.params["media_id"]]}
+        return httpx.Response(200, json={"code": 0, "data": data})
+
+    with respx.mock() as router:
+        router.get(FOLDERS_URL).mock(
+            return_value=httpx.Response(200, json={"code": 0, "data": {"list": folders}})
+        )
+        router.get(RESOURCE_LIST_URL).mock(side_effect=page)
+        delete = router.post(BATCH_DELETE_URL).mock(
+            return_value=httpx.Response(200, json={"code": 0, "data": {}})
+        )
+        result = await service.clean_matching(123, FavoriteFilter(uploaders=frozenset({7})))
+        dry = await service.clean_matching(
+            123, FavoriteFilter(uploaders=frozenset({7})), media_ids=[2], dry_run=True
+        )
+
+    assert result == {"ok": 2, "errors": [], "scanned": 3, "matched": 2}
+    assert overlap == 2
+    sent = sorted(parse_qs(call.request.content.decode())["resources"][0] for call in delete.calls)
+    assert sent == ["10:2", "20:12"]
+    assert delete.call_count == 2
+    assert dry["ok"] == 0
+    assert dry["matches"] == [{"media_id": 2, "id": 20, "type": 12, "title": None}]
+
+
+async def test_favorite_clean_matching_fails_fast_on_a_dead_session(
+    client: BiliApiClient,
+) -> None:
+    service = FavoriteService(client)
+    folders = [{"id": i} for i in range(1, 6)]
+    with respx.mock() as router:
+        router.get(FOLDERS_URL).mock(
+            return_value=httpx.Response(200, json={"code": 0, "data": {"list": folders}})
+        )
+        listing = router.get(RESOURCE_LIST_URL).mock(
+            return_value=httpx.Response(200, json={"code": -101, "message": "账号未登录"})
+        )
+        with pytest.raises(BiliApiError):
+            await service.clean_matching(
+                123, FavoriteFilter(invalid=True), scan_concurrency=1
+            )
+
+    # The remaining folders were not each charged a listing request.
+    assert listing.call_count == 1
+
+
+async def test_favorite_find_duplicates_keeps_the_first_copy(client: BiliApiClient) -> None:
+    service = FavoriteService(client)
+    folders = [{"id": 1}, {"id": 2}, {"id": 3}]
+    ids = {"1": [10, 11], "2": [11, 12, 10], "3": [10]}
+    with respx.mock() as router:
+        router.get(FOLDERS_URL).mock(
+            return_value=httpx.Response(200, json={"code": 0, "data": {"list": folders}})
+        )
+        listing = router.get(RESOURCE_IDS_URL).mock(
+            side_effect=lambda request: httpx.Response(
+                200,
+                json={"code": 0, "data": {"ids": ids[request.url.params["media_id"]]}},
+            )
+        )
+        delete = router.post(BATCH_DELETE_URL).mock(
+            return_value=httpx.Response(200, json={"code": 0, "data": {}})
+        )
+        report = await service.find_duplicates(123)
+        assert delete.call_count == 0
+        result = await service.find_duplicates(123, delete=True)
+
+    assert report["duplicates"] == [
+        {"id": 10, "media_ids": [1, 2, 3]},
+        {"id": 11, "media_ids": [1, 2]},
+    ]
+    assert report["removable"] == 3
+    assert result["ok"] == 3
+    assert listing.call_count == 6
+    sent = {
+        form["media_id"][0]: form["resources"][0]
+        for form in (parse_qs(call.request.content.decode()) for call in delete.calls)
+    }
+    assert sent == {"2": "10:2,11:2", "3": "10:2"}
+
+
+async def test_favorite_search_merges_folders_as_they_finish(client: BiliApiClient) -> None:
+    service = FavoriteService(client)
+    folders = [{"id": 1}, {"id": 2}, {"id": 3, "media_count": 0}]
+    medias = {
+        "1": [{"id": 10, "type": 2, "title": "猫 A"}, {"id": 11, "type": 2, "title": "猫 B"}],
+        "2": [{"id": 10, "type": 2, "title": "猫 A"}],
+    }
+    delays = {"1": 0.03, "2": 0.0}
+
+    async def page(request: httpx.Request) -> httpx.Response:
+        media_id = request.url.params["media_id"]
+        assert request.url.params["keyword"] == "猫"
+        await asyncio.sleep(delays[media_id])
+        return httpx.Response(200, json={"code": 0, "data": {"medias": medias[media_id]}})
+
+    with respx.mock() as router:
+        router.get(FOLDERS_URL).mock(
+            return_value=httpx.Response(200, json={"code": 0, "data": {"list": folders}})
+        )
+        listing = router.get(RESOURCE_LIST_URL).mock(side_effect=page)
+        hits = [hit async for hit in service.search(123, "猫")]
+        first = [hit async for hit in service.search(123, "猫", limit=1)]
+
+    # Folder 2 answered first; the copy of 10 in folder 1 is dropped.
+    assert [(hit["id"], hit["media_id"]) for hit in hits] == [(10, 2), (11, 1)]
+    assert [hit["id"] for hit in first] == [10]
+    assert listing.call_count >= 3
+
+
+async def test_favorite_search_ends_with_the_folders_it_could_not_search(
+    client: BiliApiClient,
+) -> None:
+    service = FavoriteService(client)
+    folders = [{"id": 1}, {"id": 2}]
+
+    def page(request: httpx.Request) -> httpx.Response:
+        if request.url.params["media_id"] == "1":
+            return httpx.Response(200, json={"code": -404, "message": "啥都木有"})
+        return httpx.Response(
+            200, json={"code": 0, "data": {"medias": [{"id": 10, "type": 2}]}}
+        )
+
+    with respx.mock() as router:
+        router.get(FOLDERS_URL).mock(
+            return_value=httpx.Response(200, json={"code": 0, "data": {"list": folders}})
+        )
+        router.get(RESOURCE_LIST_URL).mock(side_effect=page)
+        hits = [hit async for hit in service.search(123, "猫", concurrency=1)]
+
+    assert hits[0] == {"id": 10, "type": 2, "media_id": 2}
+    assert hits[1]["media_id"] == 1
+    assert "啥都木有" in hits[1]["error"]
+    assert len(hits) == 2
+
+
+async def test_favorite_search_fails_on_a_dead_session(client: BiliApiClient) -> None:
+    service = FavoriteService(client)
+    with respx.mock() as router:
+        router.get(RESOURCE_LIST_URL).mock(
+            return_value=httpx.Response(200, json={"code": -101, "message": "账号未登录"})
+        )
+        with pytest.raises(BiliApiError):
+            [hit async for hit in service.search(123, "猫", media_ids=[1, 2])]
+
+
+async def test_batch_sizer_shrinks_on_failure_and_slowness_and_grows_back() -> None:
+    sizer = BatchSizer(maximum=100, minimum=5)
+    sizer.record(False, 0.1)
+    assert sizer.size == 50
+    sizer.record(True, 0.1)
+    assert sizer.size == 60
+    sizer.record(True, 1.0)  # ten times the running average
+    assert sizer.size == 30
+    for _ in range(10):
+        sizer.record(False, 0.1)
+    assert sizer.size == 5
+    for _ in range(20):
+        sizer.record(True, 0.1)
+    assert sizer.size == 100
+
+
 async def test_favorite_iter_items_pages_until_short(client: BiliApiClient) -> None:
     service = FavoriteService(client)
     with respx.mock() as router:
@@ -159,6 +580,50 @@ async def test_favorite_clear_all_records_per_batch_errors(client: BiliApiClient
         assert len(result["errors"]) == 1
 
 
+async def test_favorite_clear_all_overlaps_folders_and_skips_empty_ones(
+    client: BiliApiClient,
+) -> None:
+    service = FavoriteService(client)
+    events: list[str] = []
+    folders = [
+        {"id": 1, "media_count": 150},
+        {"id": 2, "media_count": 0},
+        {"id": 3, "media_count": 1},
+    ]
+    ids = {"1": list(range(150)), "3": [7]}
+
+    def listed(request: httpx.Request) -> httpx.Response:
+        media_id = request.url.params["media_id"]
+        events.append(f"ids:{media_id}")
+        return httpx.Response(200, json={"code": 0, "data": {"ids": ids[media_id]}})
+
+    async def delete(request: httpx.Request) -> httpx.Response:
+        media_id = dict(httpx.QueryParams(request.content.decode()))["media_id"]
+        events.append(f"start:{media_id}")
+        await asyncio.sleep(0.01)
+        events.append(f"end:{media_id}")
+        return httpx.Response(200, json={"code": 0, "data": {}})
+
+    batches: list[tuple[int, int]] = []
+    with respx.mock() as router:
+        router.get(FOLDERS_URL).mock(
+            return_value=httpx.Response(200, json={"code": 0, "data": {"list": folders}})
+        )
+        router.get(RESOURCE_IDS_URL).mock(side_effect=listed)
+        router.post(BATCH_DELETE_URL).mock(side_effect=delete)
+        result = await service.clear_all(
+            123, on_batch=lambda media_id, batch, err: batches.append((media_id, len(batch)))
+        )
+
+    assert result == {"ok": 151, "errors": []}
+    assert "ids:2" not in events
+    # Folder 3 was listed while folder 1 was still deleting, and its batch
+    # went out before folder 1's last batch came back.
+    assert events.index("ids:3") < events.index("end:1")
+    assert events.index("start:3") < len(events) - 1 - events[::-1].index("end:1")
+    assert sorted(batches) == [(1, 50), (1, 100), (3, 1)]
+
+
 async def test_tag_users_finds_existing_by_name(client: BiliApiClient) -> None:
     service = TagService(client)
     with respx.mock() as router:
@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+import asyncio
+import sqlite3
+import time
+
+import httpx
+import pytest
+import respx
+
+from backend.api.client import BiliApiClient
+from backend.api.user import ACC_INFO_URL, ARC_SEARCH_URL, RELATION_STAT_URL
+from backend.api.wbi import NAV_URL
+from backend.services import profile_cache
+from backend.services.following import FollowingService
+from backend.services.profile_cache import ProfileCache, ProfileTTLs
+
+pytestmark = pytest.mark.asyncio
+
+NAV_PAYLOAD = {
+    "code": 0,
+    "data": {
+        "wbi_img": {
+            "img_url": "https://i0.hdslb.com/bfs/wbi/aaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaa.png",
+            "sub_url": "https://i0.hdslb.com/bfs/wbi/bbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbb.png",
+        }
+    },
+}
+VIDEOS = {"list": {"vlist": [{"bvid": "BV1"}]}, "page": {"count": 4}}
+
+
+@pytest.fixture
+async def client() -> BiliApiClient:
+    c = BiliApiClient(sessdata="sess", bili_jct="csrf")
+    yield c
+    await c.close()
+
+
+def _mock_profile(router: respx.MockRouter, info: httpx.Response | None = None):
+    router.get(NAV_URL).mock(return_value=httpx.Response(200, json=NAV_PAYLOAD))
+    return (
+        router.get(ACC_INFO_URL).mock(
+            return_value=info or httpx.Response(200, json={"code": 0, "data": {"name": "a"}})
+        ),
+        router.get(RELATION_STAT_URL).mock(
+            return_value=httpx.Response(200, json={"code": 0, "data": {"follower": 3}})
+        ),
+        router.get(ARC_SEARCH_URL).mock(
+            return_value=httpx.Response(200, json={"code": 0, "data": VIDEOS})
+        ),
+    )
+
+
+async def test_details_are_served_from_disk_across_processes(
+    client: BiliApiClient, tmp_path
+) -> None:
+    path = tmp_path / "profiles.sqlite3"
+    profile_cache.configure(path)
+    with respx.mock(assert_all_called=False) as router:
+        routes = _mock_profile(router)
+        first = await FollowingService(client).get_detail(7)
+        # A new cache on the same file stands in for a restart or a CLI run.
+        profile_cache.configure(path)
+        second = await FollowingService(client).get_detail(7)
+
+    assert second == first
+    assert [route.call_count for route in routes] == [1, 1, 1]
+    stats = await profile_cache.get_profile_cache().to_dict()
+    assert stats["hits"] == 3
+    assert stats["entries"] == 3
+
+
+async def test_missing_users_are_not_asked_about_again(
+    client: BiliApiClient, tmp_path
+) -> None:
+    profile_cache.configure(tmp_path / "profiles.sqlite3")
+    gone = httpx.Response(200, json={"code": -404, "message": "啥都木有"})
+    with respx.mock(assert_all_called=False) as router:
+        routes = _mock_profile(router, info=gone)
+        await FollowingService(client).get_detail(7)
+        again = await FollowingService(client).get_detail(7, fields=["info", "video_count"])
+
+    assert again["info"]["_code"] == -404
+    assert again["video_count"] is None
+    assert routes[0].call_count == 1
+    assert routes[2].call_count == 1
+    assert profile_cache.get_profile_cache().stats.missing_hits == 1
+
+
+async def test_ttls_are_per_part_and_errors_are_not_cached(
+    client: BiliApiClient, tmp_path
+) -> None:
+    profile_cache.configure(tmp_path / "profiles.sqlite3", ProfileTTLs(stat=0))
+    with respx.mock(assert_all_called=False) as router:
+        router.get(NAV_URL).mock(return_value=httpx.Response(200, json=NAV_PAYLOAD))
+        info = router.get(ACC_INFO_URL).mock(
+            return_value=httpx.Response(200, json={"code": 0, "data": {"name": "a"}})
+        )
+        stat = router.get(RELATION_STAT_URL).mock(
+            return_value=httpx.Response(200, json={"code": 0, "data": {"follower": 3}})
+        )
+        videos = router.get(ARC_SEARCH_URL).mock(
+            return_value=httpx.Response(200, json={"code": -500, "message": "busy"})
+        )
+        for _ in range(2):
+            await FollowingService(client).get_detail(7)
+
+    assert info.call_count == 1
+    assert stat.call_count == 2
+    assert videos.call_count == 2
+
+
+async def test_unusable_database_disables_the_cache(client: BiliApiClient, tmp_path) -> None:
+    blocker = tmp_path / "not-a-dir"
+    blocker.write_text("")
+    profile_cache.configure(blocker / "profiles.sqlite3")
+    with respx.mock(assert_all_called=False) as router:
+        _mock_profile(router)
+        detail = await FollowingService(client).get_detail(7)
+
+    assert detail["info"] == {"name": "a"}
+    assert (await profile_cache.get_profile_cache().to_dict())["entries"] is None
+
+
+async def test_expired_parts_are_refetched(tmp_path, monkeypatch) -> None:
+    cache = ProfileCache(tmp_path / "profiles.sqlite3", ProfileTTLs(info=60))
+    await cache.put(7, "info", {"info": {"name": "a"}})
+    assert await cache.get(7, "info") == {"info": {"name": "a"}}
+    later = profile_cache.time.time() + 61
+    monkeypatch.setattr(profile_cache.time, "time", lambda: later)
+    assert await cache.get(7, "info") is None
+    await cache.close()
+
+
+async def test_a_locked_database_does_not_stall_the_event_loop(tmp_path) -> None:
+    path = tmp_path / "profiles.sqlite3"
+    cache = ProfileCache(path, busy_timeout=0.3)
+    assert await cache.get(7, "info") is None  # creates the table
+    # A CLI run (another connection) holds the write lock.
+    holder = sqlite3.connect(path)
+    holder.execute("BEGIN EXCLUSIVE")
+    ticks = 0
+
+    async def ticker() -> None:
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    running = asyncio.create_task(ticker())
+    started = time.monotonic()
+    await cache.put(7, "info", {"info": {"name": "a"}})
+    waited = time.monotonic() - started
+    running.cancel()
+    holder.rollback()
+    holder.close()
+    await cache.close()
+
+    assert waited >= 0.25  # the write did wait out the lock...
+    assert ticks >= 10  # ...but the loop kept running meanwhile
+    assert cache.stats.writes == 0
+
+
+async def test_closing_drains_queued_work_without_stalling_the_event_loop(tmp_path) -> None:
+    path = tmp_path / "profiles.sqlite3"
+    cache = ProfileCache(path, busy_timeout=0.3)
+    assert await cache.get(7, "info") is None
+    holder = sqlite3.connect(path)
+    holder.execute("BEGIN EXCLUSIVE")
+    ticks = 0
+
+    async def ticker() -> None:
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    write = asyncio.create_task(cache.put(7, "info", {"info": {"name": "a"}}))
+    await asyncio.sleep(0)  # queued behind the lock
+    running = asyncio.create_task(ticker())
+    await cache.close()
+    running.cancel()
+    holder.rollback()
+    holder.close()
+
+    assert write.done()  # close waited for the queued write...
+    assert ticks >= 10  # ...while the loop kept running
@@ -3,10 +3,22 @@ from __future__ import annotations
 import asyncio
 import time
 
+import httpx
 import pytest
+import respx
 
 from backend.api.client import BiliApiClient
-from backend.api.ratelimit import AsyncTokenBucket
+from backend.api.ratelimit import (
+    BACKGROUND,
+    DESTRUCTIVE,
+    INTERACTIVE,
+    AdaptiveBounds,
+    AsyncTokenBucket,
+    RateLimiter,
+    background_requests,
+    fair_shares,
+    request_priority,
+)
 
 pytestmark = pytest.mark.asyncio
 
@@ -86,3 +98,254 @@ async def test_bili_api_clients_share_qps_bucket() -> None:
 
     expected = 3 / qps
     assert elapsed >= expected * 0.8, f"elapsed={elapsed:.3f} expected>={expected:.3f}"
+
+
+async def test_fair_shares_redistributes_unused_capacity() -> None:
+    assert fair_shares({"a": 1.5, "b": 1.5}, 6.0) == {"a": 1.5, "b": 1.5}
+    assert fair_shares({"a": 1.5, "b": 1.5, "c": 1.5, "d": 1.5}, 3.0) == {
+        "a": 0.75,
+        "b": 0.75,
+        "c": 0.75,
+        "d": 0.75,
+    }
+    shares = fair_shares({"slow": 0.5, "x": 3.0, "y": 3.0}, 4.5)
+    assert shares == {"slow": 0.5, "x": 2.0, "y": 2.0}
+
+
+async def test_owners_do_not_share_one_budget() -> None:
+    """Two accounts each get the full per-account rate when the ceiling allows."""
+    qps = 20.0
+    limiter = RateLimiter(qps, global_qps=100.0)
+    start = time.monotonic()
+    await asyncio.gather(*(limiter.acquire(owner) for owner in ("a", "b") for _ in range(3)))
+    elapsed = time.monotonic() - start
+    # 3 per owner at 20 r/s ≈ 0.1s; one shared bucket would need 0.25s.
+    assert elapsed < 0.2, f"elapsed={elapsed:.3f}"
+
+
+async def test_global_ceiling_is_split_between_active_owners() -> None:
+    limiter = RateLimiter(20.0, global_qps=20.0)
+    await asyncio.gather(limiter.acquire("a"), limiter.acquire("b"))
+    snapshot = limiter.snapshot()
+    assert snapshot["active_owners"] == 2
+    assert snapshot["effective_qps"] == [10.0, 10.0]
+
+    start = time.monotonic()
+    await asyncio.gather(*(limiter.acquire(owner) for owner in ("a", "b") for _ in range(3)))
+    elapsed = time.monotonic() - start
+    assert elapsed >= 5 / 20.0 * 0.9, f"elapsed={elapsed:.3f}"
+
+
+async def test_idle_owners_give_back_their_share() -> None:
+    limiter = RateLimiter(20.0, global_qps=20.0, active_window=0.05)
+    await asyncio.gather(limiter.acquire("a"), limiter.acquire("b"))
+    await asyncio.sleep(0.1)
+    await limiter.acquire("a")
+    assert limiter.snapshot()["effective_qps"] == [20.0]
+
+
+async def test_readyz_reports_the_rate_limit(async_client) -> None:
+    body = (await async_client.get("/readyz")).json()
+    assert body["rate_limit"]["per_owner_qps"] > 0
+    assert body["rate_limit"]["global_qps"] >= body["rate_limit"]["per_owner_qps"]
+
+
+# --- adaptive (AIMD) --------------------------------------------------------
+
+
+def _adaptive(**overrides) -> AdaptiveBounds:
+    params = {"min_qps": 0.5, "max_qps": 4.0, "increase": 0.5, "window": 3, "hold": 60.0}
+    params.update(overrides)
+    return AdaptiveBounds(**params)
+
+
+async def test_adaptive_rate_grows_after_a_clean_streak() -> None:
+    limiter = RateLimiter(1.0, adaptive=_adaptive())
+    await limiter.acquire("a")
+    for _ in range(3):
+        limiter.record_success("a")
+    assert limiter.snapshot()["effective_qps"] == [1.5]
+
+
+async def test_adaptive_rate_is_cut_once_per_burst_of_risk_errors() -> None:
+    limiter = RateLimiter(2.0, adaptive=_adaptive())
+    await limiter.acquire("a")
+    limiter.record_risk("a")
+    limiter.record_risk("a")  # same burst: ignored within ``hold``
+    assert limiter.snapshot()["effective_qps"] == [1.0]
+
+
+async def test_adaptive_rate_stays_within_bounds() -> None:
+    limiter = RateLimiter(1.0, adaptive=_adaptive(hold=0.0, max_qps=1.2))
+    await limiter.acquire("a")
+    for _ in range(30):
+        limiter.record_success("a")
+    assert limiter.snapshot()["effective_qps"] == [1.2]
+    for _ in range(10):
+        limiter.record_risk("a")
+    assert limiter.snapshot()["effective_qps"] == [0.5]
+
+
+async def test_learned_rate_survives_an_idle_owner() -> None:
+    limiter = RateLimiter(2.0, adaptive=_adaptive(), active_window=0.01)
+    await limiter.acquire("a")
+    limiter.record_risk("a")
+    await asyncio.sleep(0.05)
+    await limiter.acquire("b")  # prunes idle "a"
+    await limiter.acquire("a")
+    assert 1.0 in limiter.snapshot()["effective_qps"]
+
+
+async def test_fixed_rate_ignores_feedback() -> None:
+    limiter = RateLimiter(2.0)
+    await limiter.acquire("a")
+    limiter.record_risk("a")
+    assert limiter.snapshot()["effective_qps"] == [2.0]
+
+
+async def test_client_feeds_risk_control_into_the_limiter() -> None:
+    bounds = _adaptive()
+    client = BiliApiClient(
+        sessdata="sess", qps=50.0, adaptive=bounds, max_retries=1, retry_base_delay=0.001
+    )
+    try:
+        with respx.mock() as router:
+            router.get("https://api.bilibili.com/x").mock(
+                side_effect=[
+                    httpx.Response(200, json={"code": -352, "message": "risk"}),
+                    httpx.Response(200, json={"code": 0, "data": {}}),
+                ]
+            )
+            await client.get("https://api.bilibili.com/x")
+        # Starts clamped to max_qps=4.0, halved by the -352.
+        assert client._limiter().snapshot()["effective_qps"] == [2.0]
+    finally:
+        await client.close()
+
+
+async def _serve_order(bucket: AsyncTokenBucket, lanes: list[str]) -> list[str]:
+    order: list[str] = []
+
+    async def take(lane: str) -> None:
+        await bucket.acquire(lane)
+        order.append(lane)
+
+    await bucket.acquire()  # drain the burst so everyone queues
+    await asyncio.gather(*(take(lane) for lane in lanes))
+    return order
+
+
+async def test_interactive_requests_overtake_a_queued_clean() -> None:
+    bucket = AsyncTokenBucket(qps=200)
+    order = await _serve_order(bucket, [DESTRUCTIVE] * 4 + [INTERACTIVE])
+    assert order.index(INTERACTIVE) == 0
+
+
+async def test_lanes_share_tokens_by_weight() -> None:
+    bucket = AsyncTokenBucket(
+        qps=500, weights={INTERACTIVE: 3, BACKGROUND: 1, DESTRUCTIVE: 1}
+    )
+    order = await _serve_order(bucket, [INTERACTIVE] * 6 + [DESTRUCTIVE] * 6)
+    # Lower lanes keep moving instead of waiting for the top lane to drain.
+    assert order[:4].count(DESTRUCTIVE) == 1
+    assert order[:8].count(DESTRUCTIVE) == 2
+
+
+async def test_starved_waiters_go_first() -> None:
+    bucket = AsyncTokenBucket(qps=200, starvation_after=0.0)
+    order = await _serve_order(bucket, [DESTRUCTIVE, INTERACTIVE])
+    assert order == [DESTRUCTIVE, INTERACTIVE]
+
+
+async def test_cancelled_waiters_are_skipped() -> None:
+    bucket = AsyncTokenBucket(qps=50)
+    await bucket.acquire()
+    doomed = asyncio.create_task(bucket.acquire(DESTRUCTIVE))
+    await asyncio.sleep(0)
+    doomed.cancel()
+    start = time.monotonic()
+    await bucket.acquire(DESTRUCTIVE)
+    assert time.monotonic() - start < 0.035  # one interval, not two
+
+
+async def test_request_priority_follows_method_and_context() -> None:
+    assert request_priority("GET") == INTERACTIVE
+    assert request_priority("POST") == DESTRUCTIVE
+    with background_requests():
+        assert request_priority("GET") == BACKGROUND
+        assert request_priority("POST") == DESTRUCTIVE
+    assert request_priority("get") == INTERACTIVE
+
+
+async def test_task_requests_run_in_the_background_lane() -> None:
+    from backend.services.tasks import task_registry
+
+    seen: list[str] = []
+
+    async def builder(_state) -> dict:  # type: ignore[no-untyped-def]
+        seen.append(request_priority("GET"))
+        return {}
+
+    task_registry.create("test", builder)
+    await asyncio.sleep(0.01)
+    assert seen == [BACKGROUND]
+    assert request_priority("GET") == INTERACTIVE
+
+
+async def test_snapshot_reports_queued_requests_per_lane() -> None:
+    limiter = RateLimiter(qps=5)
+    await limiter.acquire("a")
+    waiter = asyncio.create_task(limiter.acquire("a", priority=BACKGROUND))
+    await asyncio.sleep(0)
+    assert limiter.snapshot()["queued"] == {INTERACTIVE: 0, BACKGROUND: 1, DESTRUCTIVE: 0}
+    await waiter
+
+
+async def test_try_acquire_never_waits_or_jumps_the_queue() -> None:
+    bucket = AsyncTokenBucket(qps=100)
+    assert bucket.try_acquire()
+    assert not bucket.try_acquire()
+    waiter = asyncio.create_task(bucket.acquire())
+    await asyncio.sleep(0)
+    bucket.refund()  # a token is back, but the queued waiter gets it first
+    assert not bucket.try_acquire()
+    await waiter
+
+
+async def test_acquire_many_reserves_future_tokens() -> None:
+    qps = 50.0
+    bucket = AsyncTokenBucket(qps=qps, burst=2)
+    start = time.monotonic()
+    await bucket.acquire_many(4)  # full bucket plus two borrowed
+    assert time.monotonic() - start < 0.02
+    await bucket.acquire()  # waits out the debt first
+    assert time.monotonic() - start >= 3 / qps * 0.9
+    with pytest.raises(ValueError):
+        await bucket.acquire_many(0)
+
+
+async def test_cancelled_grant_is_refunded() -> None:
+    bucket = AsyncTokenBucket(qps=1)
+    await bucket.acquire()
+    granted = asyncio.create_task(bucket.acquire())
+    await asyncio.sleep(0)
+    # Hand out the grant the way the dispatcher does, then cancel the task
+    # before it gets to resume.
+    waiter = bucket._lanes[INTERACTIVE].popleft()
+    bucket._tokens -= 1.0
+    waiter.future.set_result(None)
+    granted.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await granted
+    assert bucket._tokens == pytest.approx(0.0, abs=0.05)  # the token came back
+
+
+async def test_limiter_refunds_the_owner_token_when_cancelled_on_the_ceiling() -> None:
+    limiter = RateLimiter(qps=100, global_qps=1)
+    await limiter.acquire("a")
+    blocked = asyncio.create_task(limiter.acquire("b"))
+    await asyncio.sleep(0.01)
+    blocked.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await blocked
+    assert limiter._owners["b"].bucket.try_acquire()
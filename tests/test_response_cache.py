@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import asyncio
+
+import httpx
+import pytest
+import respx
+
+from backend.api.cache import CachePolicy, ResponseCache
+from backend.api.client import BiliApiClient, BiliApiError
+from backend.api.favorite import BATCH_DELETE_URL, RESOURCE_LIST_URL, FavoriteApi
+from backend.api.relation import FOLLOWINGS_URL, MODIFY_URL, RelationApi
+
+pytestmark = pytest.mark.asyncio
+
+PAGE = {"code": 0, "data": {"list": [{"mid": 1}], "total": 1}}
+
+
+def _client(cache: ResponseCache, sessdata: str = "sess") -> BiliApiClient:
+    return BiliApiClient(sessdata=sessdata, bili_jct="csrf", response_cache=cache)
+
+
+async def test_repeated_pages_are_served_from_cache() -> None:
+    cache = ResponseCache()
+    api = RelationApi(_client(cache))
+    with respx.mock() as router:
+        route = router.get(FOLLOWINGS_URL).mock(return_value=httpx.Response(200, json=PAGE))
+        first = await api.get_followings(1)
+        second = await api.get_followings(1)
+        await api.get_followings(1, pn=2)
+
+    assert first == second
+    assert route.call_count == 2  # page 2 is a different key
+    assert cache.stats.hits == 1
+
+
+async def test_cached_values_cannot_be_mutated_by_callers() -> None:
+    cache = ResponseCache()
+    api = RelationApi(_client(cache))
+    with respx.mock() as router:
+        router.get(FOLLOWINGS_URL).mock(return_value=httpx.Response(200, json=PAGE))
+        (await api.get_followings(1))["list"].clear()
+        assert (await api.get_followings(1))["list"] == [{"mid": 1}]
+
+
+async def test_entries_are_scoped_to_the_owner() -> None:
+    cache = ResponseCache()
+    with respx.mock() as router:
+        route = router.get(FOLLOWINGS_URL).mock(return_value=httpx.Response(200, json=PAGE))
+        await RelationApi(_client(cache, "alice")).get_followings(1)
+        await RelationApi(_client(cache, "bob")).get_followings(1)
+    assert route.call_count == 2
+
+
+async def test_unfollow_invalidates_followings() -> None:
+    cache = ResponseCache()
+    api = RelationApi(_client(cache))
+    with respx.mock() as router:
+        route = router.get(FOLLOWINGS_URL).mock(return_value=httpx.Response(200, json=PAGE))
+        router.post(MODIFY_URL).mock(return_value=httpx.Response(200, json={"code": 0}))
+        await api.get_followings(1)
+        await api.unfollow(1)
+        await api.get_followings(1)
+    assert route.call_count == 2
+
+
+async def test_batch_delete_invalidates_only_that_folder() -> None:
+    cache = ResponseCache()
+    api = FavoriteApi(_client(cache))
+    with respx.mock() as router:
+        route = router.get(RESOURCE_LIST_URL).mock(
+            return_value=httpx.Response(200, json={"code": 0, "data": {"medias": []}})
+        )
+        router.post(BATCH_DELETE_URL).mock(
+            return_value=httpx.Response(200, json={"code": -1, "message": "failed"})
+        )
+        await api.list_resources(10)
+        await api.list_resources(20)
+        with pytest.raises(BiliApiError):
+            await api.batch_delete(10, ["1:2"])
+        await api.list_resources(10)
+        await api.list_resources(20)
+    assert route.call_count == 3
+
+
+async def test_stale_entries_are_served_while_revalidating() -> None:
+    cache = ResponseCache()
+    policy = CachePolicy(ttl=0.0, stale=60.0)
+    calls = 0
+
+    async def fetch() -> int:
+        nonlocal calls
+        calls += 1
+        return calls
+
+    assert await cache.get_or_fetch("o", "u", {}, policy, fetch) == 1
+    await asyncio.sleep(0.001)
+    assert await cache.get_or_fetch("o", "u", {}, policy, fetch) == 1  # stale
+    await asyncio.sleep(0.01)
+    assert calls == 2
+    assert await cache.get_or_fetch("o", "u", {}, policy, fetch) == 2
+    assert cache.stats.stale_hits == 2
+
+
+async def test_fetch_racing_an_invalidation_is_not_stored() -> None:
+    cache = ResponseCache()
+    policy = CachePolicy(ttl=60.0)
+    release = asyncio.Event()
+
+    async def slow() -> str:
+        await release.wait()
+        return "before-write"
+
+    reader = asyncio.create_task(cache.get_or_fetch("o", "u", {}, policy, slow))
+    await asyncio.sleep(0)
+    cache.invalidate("o", "u")
+    release.set()
+    assert await reader == "before-write"
+    assert cache.to_dict()["entries"] == 0
+
+
+async def test_least_recently_used_entries_are_evicted() -> None:
+    cache = ResponseCache(max_entries=2)
+    policy = CachePolicy(ttl=60.0)
+
+    async def fetch() -> str:
+        return "v"
+
+    for page in (1, 2, 1, 3):
+        await cache.get_or_fetch("o", "u", {"pn": page}, policy, fetch)
+    assert cache.stats.evictions == 1
+    await cache.get_or_fetch("o", "u", {"pn": 1}, policy, fetch)
+    assert cache.stats.misses == 3  # page 2 went, page 1 stayed
+
+
+async def test_routes_share_the_cache(async_client: httpx.AsyncClient) -> None:
+    headers = {"SESSDATA": "sess", "bili_jct": "csrf"}
+    with respx.mock() as router:
+        route = router.get(FOLLOWINGS_URL).mock(return_value=httpx.Response(200, json=PAGE))
+        for _ in range(3):
+            resp = await async_client.get("/api/v2/followings?mid=1", headers=headers)
+            assert resp.status_code == 200
+    assert route.call_count == 1
+    ready = (await async_client.get("/readyz")).json()
+    assert ready["response_cache"]["hits"] == 2
@@ -1,16 +1,25 @@
 from __future__ import annotations
 
+import json
+
 import httpx
 import pytest
 import respx
+from pydantic import ValidationError
 
 from backend.api.dynamic import DELETE_DYNAMIC_URL, DYNAMICS_URL
-from backend.api.favorite import FOLDERS_URL, RESOURCE_IDS_URL
-from backend.api.history import CLEAR_HISTORY_URL
+from backend.api.favorite import (
+    BATCH_DELETE_URL,
+    FOLDERS_URL,
+    RESOURCE_IDS_URL,
+    RESOURCE_LIST_URL,
+)
+from backend.api.history import CLEAR_HISTORY_URL, DELETE_HISTORY_URL, HISTORY_CURSOR_URL
 from backend.api.relation import FOLLOWINGS_URL
 from backend.api.relation_tag import CREATE_TAG_URL, DELETE_TAG_URL, TAG_USERS_URL, UPDATE_TAG_URL
 from backend.api.user import RELATION_STAT_URL
 from backend.api.wbi import NAV_URL
+from backend.schemas import DynamicCleanRequest, FavoriteCleanRequest, HistoryDeleteRequest
 from backend.services.tasks import task_registry
 
 pytestmark = pytest.mark.asyncio
@@ -70,6 +79,32 @@ async def test_following_detail(async_client: httpx.AsyncClient, headers: dict[s
         assert body["mid"] == 7
 
 
+async def test_following_detail_fetches_only_requested_fields(
+    async_client: httpx.AsyncClient, headers: dict[str, str]
+) -> None:
+    with respx.mock(assert_all_called=False) as router:
+        info = router.get("https://api.bilibili.com/x/space/wbi/acc/info").mock(
+            return_value=httpx.Response(200, json={"code": 0, "data": {"mid": 7}})
+        )
+        stat = router.get(RELATION_STAT_URL).mock(
+            return_value=httpx.Response(200, json={"code": 0, "data": {"follower": 5}})
+        )
+        resp = await async_client.get("/api/v2/followings/7?fields=stat", headers=headers)
+
+    assert resp.status_code == 200
+    assert resp.json() == {"mid": 7, "stat": {"follower": 5}}
+    assert stat.call_count == 1
+    assert info.call_count == 0
+
+
+async def test_following_detail_rejects_unknown_fields(
+    async_client: httpx.AsyncClient, headers: dict[str, str]
+) -> None:
+    resp = await async_client.get("/api/v2/followings/7?fields=stat,fans", headers=headers)
+    assert resp.status_code == 422
+    assert "fans" in resp.json()["error"]
+
+
 async def test_dynamics_list_and_delete(
     async_client: httpx.AsyncClient, headers: dict[str, str]
 ) -> None:
@@ -108,6 +143,69 @@ async def test_dynamics_clear_task(
         assert info.json()["status"] == "completed"
 
 
+async def test_dynamics_clean_task_dry_run(
+    async_client: httpx.AsyncClient, headers: dict[str, str]
+) -> None:
+    item = {
+        "id_str": "5",
+        "type": "DYNAMIC_TYPE_FORWARD",
+        "modules": {"module_author": {"pub_ts": 100}},
+    }
+    with respx.mock() as router:
+        router.get(NAV_URL).mock(return_value=httpx.Response(200, json=NAV_PAYLOAD))
+        router.get(DYNAMICS_URL).mock(
+            return_value=httpx.Response(
+                200, json={"code": 0, "data": {"items": [item], "has_more": False}}
+            )
+        )
+        resp = await async_client.post(
+            "/api/v2/dynamics/clean?mid=10",
+            json={"types": ["forward"], "dry_run": True},
+            headers=headers,
+        )
+        task_id = resp.json()["task_id"]
+        await task_registry.wait(task_id, timeout=5)
+        info = (await async_client.get(f"/api/v2/tasks/{task_id}", headers=headers)).json()
+
+    assert info["result"]["matches"] == [
+        {"id": 5, "type": "DYNAMIC_TYPE_FORWARD", "pub_ts": 100, "text": ""}
+    ]
+    for blank in ({"keywords": [""]}, {"types": [" "]}, {"keywords": ["  "], "types": [""]}):
+        empty = await async_client.post(
+            "/api/v2/dynamics/clean?mid=10", json=blank, headers=headers
+        )
+        assert empty.status_code == 422, blank
+
+
+async def test_dynamics_index_warm_then_page_jump(
+    async_client: httpx.AsyncClient, headers: dict[str, str]
+) -> None:
+    def page(request: httpx.Request) -> httpx.Response:
+        offset = int(request.url.params["offset"] or 0)
+        data = {"items": [{"id_str": str(offset)}], "has_more": offset < 5, "offset": offset + 1}
+        return httpx.Response(200, json={"code": 0, "data": data})
+
+    with respx.mock() as router:
+        router.get(NAV_URL).mock(return_value=httpx.Response(200, json=NAV_PAYLOAD))
+        listing = router.get(DYNAMICS_URL).mock(side_effect=page)
+        resp = await async_client.post(
+            "/api/v2/dynamics/index/warm?mid=10&pages=3", headers=headers
+        )
+        task_id = resp.json()["task_id"]
+        await task_registry.wait(task_id, timeout=5)
+        info = (await async_client.get(f"/api/v2/tasks/{task_id}", headers=headers)).json()
+        third = await async_client.get("/api/v2/dynamics?mid=10&page=3", headers=headers)
+        past_end = await async_client.get("/api/v2/dynamics?mid=10&page=9", headers=headers)
+
+    assert info["status"] == "completed"
+    assert info["processed"] == 3
+    assert info["result"] == {"pages": 4, "ended": False}
+    assert third.json()["items"] == [{"id_str": "2"}]
+    assert past_end.json() == {"items": [], "has_more": False, "offset": ""}
+    # 3 to warm, 1 for page 3, then pages 4..6 to find the end.
+    assert listing.call_count == 3 + 1 + 3
+
+
 async def test_favorites_clear_task(
     async_client: httpx.AsyncClient, headers: dict[str, str]
 ) -> None:
@@ -130,6 +228,115 @@ async def test_favorites_clear_task(
         ).json()["status"] == "completed"
 
 
+async def test_favorites_duplicates_task_fails_on_an_expired_session(
+    async_client: httpx.AsyncClient, headers: dict[str, str]
+) -> None:
+    with respx.mock() as router:
+        router.get(FOLDERS_URL).mock(
+            return_value=httpx.Response(
+                200, json={"code": 0, "data": {"list": [{"id": 9}, {"id": 8}]}}
+            )
+        )
+        router.get(RESOURCE_IDS_URL).mock(
+            return_value=httpx.Response(200, json={"code": -101, "message": "账号未登录"})
+        )
+        resp = await async_client.post(
+            "/api/v2/favorites/duplicates?mid=10", headers=headers
+        )
+        task_id = resp.json()["task_id"]
+        await task_registry.wait(task_id, timeout=5)
+        task = (await async_client.get(f"/api/v2/tasks/{task_id}", headers=headers)).json()
+
+    assert task["status"] == "failed"
+    assert task.get("result") is None
+
+
+async def test_favorites_clean_task_deletes_matches(
+    async_client: httpx.AsyncClient, headers: dict[str, str]
+) -> None:
+    medias = [
+        {"id": 1, "type": 2, "title": "已失效视频", "attr": 9},
+        {"id": 2, "type": 2, "title": "keep", "attr": 0},
+    ]
+    with respx.mock() as router:
+        router.get(FOLDERS_URL).mock(
+            return_value=httpx.Response(200, json={"code": 0, "data": {"list": [{"id": 9}]}})
+        )
+        router.get(RESOURCE_LIST_URL).mock(
+            return_value=httpx.Response(200, json={"code": 0, "data": {"medias": medias}})
+        )
+        delete = router.post(BATCH_DELETE_URL).mock(
+            return_value=httpx.Response(200, json={"code": 0, "data": {}})
+        )
+        resp = await async_client.post(
+            "/api/v2/favorites/clean?mid=10", json={"invalid": True}, headers=headers
+        )
+        task_id = resp.json()["task_id"]
+        await task_registry.wait(task_id, timeout=5)
+        info = (await async_client.get(f"/api/v2/tasks/{task_id}", headers=headers)).json()
+
+    assert info["status"] == "completed"
+    assert info["processed"] == 1
+    assert info["result"]["scanned"] == 2
+    assert b"resources=1%3A2" in delete.calls[0].request.content
+
+
+async def test_favorites_clean_requires_a_criterion(
+    async_client: httpx.AsyncClient, headers: dict[str, str]
+) -> None:
+    resp = await async_client.post(
+        "/api/v2/favorites/clean?mid=10", json={"dry_run": True}, headers=headers
+    )
+    assert resp.status_code == 422
+
+
+async def test_clean_requests_count_only_criteria_that_narrow_the_match() -> None:
+    # ``favorited_before: 0`` and ``reposts: false`` (originals only) narrow;
+    # blank keywords and ``invalid: false`` do not.
+    assert FavoriteCleanRequest(favorited_before=0).favorited_before == 0
+    assert DynamicCleanRequest(reposts=False).reposts is False
+    assert DynamicCleanRequest(keywords=[" ", "猫"]).keywords == ["猫"]
+    for model, body in [
+        (DynamicCleanRequest, {"keywords": [""], "dry_run": True}),
+        (HistoryDeleteRequest, {"businesses": [""], "dry_run": True}),
+        (FavoriteCleanRequest, {"title_keywords": [""], "dry_run": True}),
+        (FavoriteCleanRequest, {"invalid": False, "media_ids": [1]}),
+    ]:
+        with pytest.raises(ValidationError, match="set at least one criterion"):
+            model.model_validate(body)
+
+
+async def test_favorites_search_streams_ndjson(
+    async_client: httpx.AsyncClient, headers: dict[str, str]
+) -> None:
+    medias = [{"id": 1, "type": 2, "title": "猫"}]
+    with respx.mock() as router:
+        router.get(FOLDERS_URL).mock(
+            return_value=httpx.Response(
+                200, json={"code": 0, "data": {"list": [{"id": 9}, {"id": 8}]}}
+            )
+        )
+        listing = router.get(RESOURCE_LIST_URL).mock(
+            return_value=httpx.Response(200, json={"code": 0, "data": {"medias": medias}})
+        )
+        resp = await async_client.get(
+            "/api/v2/favorites/search?mid=10&keyword=猫", headers=headers
+        )
+        again = await async_client.get(
+            "/api/v2/favorites/search?mid=10&keyword=猫", headers=headers
+        )
+
+    assert resp.status_code == 200
+    assert resp.headers["content-type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in resp.text.splitlines()]
+    # Both folders hold item 1; it is streamed once.
+    assert [hit["id"] for hit in lines] == [1]
+    assert lines[0]["media_id"] in (8, 9)
+    assert [json.loads(line)["id"] for line in again.text.splitlines()] == [1]
+    # The repeat was served from the response cache.
+    assert listing.call_count == 2
+
+
 async def test_followings_clear_task(
     async_client: httpx.AsyncClient, headers: dict[str, str]
 ) -> None:
@@ -161,6 +368,38 @@ async def test_history_clear(
         assert resp.json()["success"] is True
 
 
+async def test_history_delete_task(
+    async_client: httpx.AsyncClient, headers: dict[str, str]
+) -> None:
+    entries = [
+        {"kid": "live_1", "view_at": 900, "author_mid": 7, "history": {"business": "live"}},
+        {"kid": "archive_2", "view_at": 800, "author_mid": 7, "history": {"business": "archive"}},
+    ]
+    with respx.mock() as router:
+        router.get(HISTORY_CURSOR_URL).mock(
+            return_value=httpx.Response(
+                200, json={"code": 0, "data": {"cursor": {"max": 0}, "list": entries}}
+            )
+        )
+        delete = router.post(DELETE_HISTORY_URL).mock(
+            return_value=httpx.Response(200, json={"code": 0, "data": {}})
+        )
+        resp = await async_client.post(
+            "/api/v2/history/delete-task",
+            json={"businesses": ["live"], "author_mids": [7]},
+            headers=headers,
+        )
+        task_id = resp.json()["task_id"]
+        await task_registry.wait(task_id, timeout=5)
+        info = (await async_client.get(f"/api/v2/tasks/{task_id}", headers=headers)).json()
+
+    assert info["status"] == "completed"
+    assert info["processed"] == 1
+    assert b"kid=live_1" in delete.calls[0].request.content
+    empty = await async_client.post("/api/v2/history/delete-task", json={}, headers=headers)
+    assert empty.status_code == 422
+
+
 async def test_tag_create_delete_rename_list_users(
     async_client: httpx.AsyncClient, headers: dict[str, str]
 ) -> None:
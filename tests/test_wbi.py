@@ -1,9 +1,16 @@
 from __future__ import annotations
 
+import asyncio
+import json
+import time
+from contextlib import asynccontextmanager
+from dataclasses import replace
+
 import httpx
 import pytest
 import respx
 
+from backend.api import wbi
 from backend.api.client import BiliApiClient, BiliApiError
 from backend.api.wbi import NAV_URL, signed_get
 
@@ -84,3 +91,133 @@ async def test_signed_get_propagates_other_errors(client: BiliApiClient) -> None
         with pytest.raises(BiliApiError) as exc:
             await signed_get(client, TEST_URL, {"mid": 1})
         assert exc.value.code == -500
+
+
+async def test_concurrent_clients_share_one_nav_request() -> None:
+    clients = [BiliApiClient() for _ in range(5)]
+    with respx.mock() as router:
+        nav = router.get(NAV_URL).mock(return_value=httpx.Response(200, json=NAV_PAYLOAD))
+        keys = await asyncio.gather(*(c.get_wbi_keys() for c in clients))
+    assert len(set(keys)) == 1
+    assert nav.call_count == 1
+
+
+async def test_keys_persist_on_disk_across_processes(tmp_path) -> None:
+    path = tmp_path / "wbi.json"
+    wbi.configure_disk_cache(path)
+    wbi.store_keys(("img", "sub"))
+    await asyncio.gather(*wbi._disk_writes)
+    wbi.configure_disk_cache(path)  # what a fresh process starts with
+    wbi._cached = None
+    assert wbi.cached_keys() is None  # the signing path never reads the file
+    with respx.mock(assert_all_called=False) as router:
+        nav = router.get(NAV_URL).mock(return_value=httpx.Response(200, json=NAV_PAYLOAD))
+        assert await wbi.get_keys() == ("img", "sub")
+    assert nav.call_count == 0
+
+    wbi.invalidate_cache()
+    assert path.exists()  # removed by the refresh, not on the caller's path
+    with respx.mock() as router:
+        router.get(NAV_URL).mock(return_value=httpx.Response(200, json=NAV_PAYLOAD))
+        await wbi.get_keys()
+        await asyncio.gather(*wbi._disk_writes)
+    assert json.loads(path.read_text(encoding="utf-8"))["img_key"] != "img"
+
+
+async def test_corrupt_disk_cache_is_ignored(tmp_path) -> None:
+    path = tmp_path / "wbi.json"
+    path.write_text("{not json", encoding="utf-8")
+    wbi.configure_disk_cache(path)
+    with respx.mock() as router:
+        nav = router.get(NAV_URL).mock(return_value=httpx.Response(200, json=NAV_PAYLOAD))
+        await wbi.get_keys()
+    assert nav.call_count == 1
+
+
+async def test_stale_keys_do_not_reread_the_disk_on_every_call(
+    tmp_path, monkeypatch
+) -> None:
+    wbi.configure_disk_cache(tmp_path / "wbi.json")
+    wbi.store_keys(("old-img", "old-sub"))
+    await asyncio.gather(*wbi._disk_writes)
+    wbi._cached = replace(wbi._cached, fetched_at=time.time() - 2 * wbi._WBI_CACHE_TTL)
+    reads = 0
+    load = wbi._load_from_disk
+
+    def counting_load():  # type: ignore[no-untyped-def]
+        nonlocal reads
+        reads += 1
+        return load()
+
+    monkeypatch.setattr(wbi, "_load_from_disk", counting_load)
+    with respx.mock() as router:
+        router.get(NAV_URL).mock(return_value=httpx.Response(200, json=NAV_PAYLOAD))
+        for _ in range(5):
+            assert await wbi.get_keys() == ("old-img", "old-sub")
+        await wbi._refreshing[asyncio.get_running_loop()]
+    # One shared refresh read the file once, off the loop; the callers never did.
+    assert reads == 1
+
+
+async def test_expired_keys_are_served_while_refreshing(client: BiliApiClient) -> None:
+    wbi.store_keys(("old-img", "old-sub"))
+    wbi._cached = replace(wbi._cached, fetched_at=time.time() - 2 * wbi._WBI_CACHE_TTL)
+    with respx.mock() as router:
+        nav = router.get(NAV_URL).mock(return_value=httpx.Response(200, json=NAV_PAYLOAD))
+        assert await client.get_wbi_keys() == ("old-img", "old-sub")
+        # The refresh owns its client, so the caller closing is harmless.
+        await client.close()
+        await wbi._refreshing[asyncio.get_running_loop()]
+    assert nav.call_count == 1
+    assert wbi.cached_keys() == (
+        "7cd084941338484aae1ad9425b84077c",
+        "4932caff0ff746eab6f01bf08b70ac45",
+    )
+
+
+async def test_logged_out_nav_still_yields_keys(client: BiliApiClient) -> None:
+    logged_out = {**NAV_PAYLOAD, "code": -101, "message": "账号未登录"}
+    with respx.mock() as router:
+        router.get(NAV_URL).mock(return_value=httpx.Response(200, json=logged_out))
+        img_key, _ = await client.get_wbi_keys()
+    assert img_key == "7cd084941338484aae1ad9425b84077c"
+
+
+async def test_keep_fresh_refreshes_before_expiry(monkeypatch) -> None:
+    wbi.store_keys(("old-img", "old-sub"))
+    wbi._cached = replace(
+        wbi._cached, fetched_at=time.time() - wbi._WBI_CACHE_TTL + wbi._REFRESH_MARGIN
+    )
+    with respx.mock() as router:
+        nav = router.get(NAV_URL).mock(return_value=httpx.Response(200, json=NAV_PAYLOAD))
+
+        @asynccontextmanager
+        async def open_client():  # type: ignore[no-untyped-def]
+            async with BiliApiClient() as c:
+                yield c
+
+        refresher = asyncio.create_task(wbi.keep_fresh(open_client))
+        await asyncio.sleep(0.05)
+        refresher.cancel()
+    assert nav.call_count == 1
+    assert wbi.cached_keys() != ("old-img", "old-sub")
+
+
+async def test_keep_fresh_survives_unexpected_errors(monkeypatch, caplog) -> None:
+    calls = 0
+
+    async def flaky(_open_client):  # type: ignore[no-untyped-def]
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            raise OSError("disk full")
+        return ("img", "sub")
+
+    monkeypatch.setattr(wbi, "refresh_keys", flaky)
+    monkeypatch.setattr(wbi, "_RETRY_DELAY", 0.0)
+    refresher = asyncio.create_task(wbi.keep_fresh(BiliApiClient))
+    await asyncio.sleep(0.01)
+    refresher.cancel()
+
+    assert calls >= 2
+    assert "WBI key refresh crashed" in caplog.text